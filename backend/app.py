@@ -1,15 +1,18 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Blueprint, Response, request, jsonify, send_file, current_app
 from flask_cors import CORS
 import os
+import random
 import secrets
+import tempfile
+import time
 import uuid
 from datetime import datetime
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, undefer
+from sqlalchemy.orm.exc import StaleDataError
 from werkzeug.utils import secure_filename
-import base64
 from io import BytesIO
-from PIL import Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,30 +20,75 @@ load_dotenv()
 
 # Import database and models
 from database import init_db, SessionLocal, engine
-from models import User, Document, SignatureRequest, Base
+from models import (User, Document, SignatureRequest, TemplateSnapshot, signing_progress, document_status,
+                    page_hashes_of)
 import task_queue
-
-app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"]}})
+import metrics
+import profiling
+import tracing
+import search_index
+import events
+import delivery_log
+import rate_limit
+import page_render
+import pdf_writer
+import thumbnails
+import archive
+import reminders
+import bulk_export
+import cold_store
+import signatures
+import signing_cache
+import tickets
 
 UPLOAD_FOLDER = 'uploads'
 DATA_FOLDER = 'data'
 TEMPLATES_FOLDER = 'data/templates'
 
-for folder in [UPLOAD_FOLDER, DATA_FOLDER, TEMPLATES_FOLDER]:
-    os.makedirs(folder, exist_ok=True)
+api = Blueprint('api', __name__)
+
+def create_app(start_queue=True):
+    """Application factory.
+
+    Schema creation and demo-user seeding happen here, once per process that
+    builds the app. Under a pre-fork server with ``preload_app`` that is the
+    master process only, before any worker is forked.
+    """
+    started = time.perf_counter()
+    app = Flask(__name__)
+    CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"]}})
+
+    for folder in [UPLOAD_FOLDER, DATA_FOLDER, TEMPLATES_FOLDER]:
+        os.makedirs(folder, exist_ok=True)
+
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+
+    app.register_blueprint(api)
+    app.teardown_appcontext(shutdown_session)
+    metrics.init_app(app)
+    metrics.instrument_engine(engine, SessionLocal)
+    profiling.init_app(app)
+    profiling.instrument_engine(engine)
+    tracing.init_app(app)
+    tracing.instrument_engine(engine)
+
+    init_db()
+    search_index.init(engine)
+    seed_demo_user()
+    if start_queue:
+        task_queue.start()
+        archive.start()
+        reminders.start()
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    app.config['BOOT_SECONDS'] = time.perf_counter() - started
+    print(f"✅ App ready in {app.config['BOOT_SECONDS'] * 1000:.0f} ms")
+    return app
 
-# Initialize database and task queue
-@app.before_request
-def startup():
-    """Initialize database on first request"""
-    if not hasattr(app, '_db_initialized'):
-        init_db()
-        # Ensure demo user exists
-        db = SessionLocal()
+def seed_demo_user():
+    """Ensure demo user exists"""
+    db = SessionLocal()
+    try:
         if not db.query(User).filter(User.email == 'demo@example.com').first():
             demo_user = User(
                 email='demo@example.com',
@@ -49,11 +97,12 @@ def startup():
             )
             db.add(demo_user)
             db.commit()
+    except Exception:
+        # Another process seeded it first
+        db.rollback()
+    finally:
         db.close()
-        task_queue.start()
-        app._db_initialized = True
 
-@app.teardown_appcontext
 def shutdown_session(exception=None):
     """Cleanup on shutdown"""
     if exception:
@@ -65,6 +114,9 @@ def get_db():
     """Get database session"""
     return SessionLocal()
 
+# Query options loading the deferred page/field payloads with the document row
+WITH_CONTENT = (undefer(Document.pages), undefer(Document.fields))
+
 def get_user_from_token(token):
     """Get user from token - optimized with single query"""
     db = get_db()
@@ -72,10 +124,12 @@ def get_user_from_token(token):
     db.close()
     return user
 
+@tracing.traced('db.create_signature_request')
 def create_signature_request_db(doc_id, signer_email, signer_name, order):
     """Create signature request in database"""
     db = get_db()
     access_token = str(uuid.uuid4())
+    expires_at, next_action_at = reminders.new_request_schedule()
     sig_req = SignatureRequest(
         id=str(uuid.uuid4())[:12],
         document_id=doc_id,
@@ -83,36 +137,112 @@ def create_signature_request_db(doc_id, signer_email, signer_name, order):
         signer_name=signer_name,
         access_token=access_token,
         status='pending',
-        order=order
+        order=order,
+        expires_at=expires_at,
+        next_action_at=next_action_at
     )
     db.add(sig_req)
+    db.execute(
+        update(Document)
+        .where(Document.id == doc_id)
+        .values(signer_count=Document.signer_count + 1)
+    )
     db.commit()
     result = sig_req.to_dict()
     db.close()
     return result
 
 def get_signature_request_by_token_db(access_token):
-    """Get signature request by access token"""
+    """Get signature request by access token; None if unknown or expired.
+
+    Expiry is checked on the row the unique token lookup already returns,
+    so links past ``expires_at`` stop working even before the reminder
+    scheduler marks them expired. Signed requests stay readable.
+    """
     db = get_db()
     sig_req = db.query(SignatureRequest).filter(SignatureRequest.access_token == access_token).first()
+    if sig_req and sig_req.status != 'signed' and (
+            sig_req.status == 'expired' or (sig_req.expires_at and sig_req.expires_at <= datetime.utcnow())):
+        sig_req = None
     result = sig_req.to_dict() if sig_req else None
     db.close()
     return result
 
-def update_signature_request_status_db(access_token, status, signed_at=None):
-    """Update signature request status in database"""
-    db = get_db()
-    sig_req = db.query(SignatureRequest).filter(SignatureRequest.access_token == access_token).first()
-    if sig_req:
-        sig_req.status = status
-        if signed_at:
-            sig_req.signed_at = datetime.fromisoformat(signed_at)
+# Allowed status transitions and the document counter changes they imply
+_STATUS_TRANSITIONS = {
+    'viewed': [('pending', {'viewed_count': 1})],
+    'signed': [('viewed', {'viewed_count': -1, 'signed_count': 1}), ('pending', {'signed_count': 1})],
+}
+
+def update_signature_request_status_db(access_token, status, signed_at=None, db=None):
+    """Update signature request status and the document's progress counters.
+
+    The status change is a conditional UPDATE from a known previous status,
+    and the counter deltas are applied in the same transaction, so repeated
+    or concurrent calls can never double-count. Pass ``db`` to join the
+    caller's transaction (the caller commits and invalidates signing_cache).
+    Returns True if the status actually changed.
+    """
+    own_session = db is None
+    if own_session:
+        db = get_db()
+
+    values = {'status': status}
+    if signed_at:
+        values['signed_at'] = datetime.fromisoformat(signed_at)
+    if status == 'signed':
+        values['next_action_at'] = None  # No more reminders or expiry
+
+    changed = None
+    for previous, deltas in _STATUS_TRANSITIONS.get(status, []):
+        result = db.execute(
+            update(SignatureRequest)
+            .where(SignatureRequest.access_token == access_token, SignatureRequest.status == previous,
+                   or_(SignatureRequest.expires_at.is_(None), SignatureRequest.expires_at > datetime.utcnow()))
+            .values(**values)
+            .returning(SignatureRequest.document_id)
+        )
+        doc_id = result.scalar()
+        if doc_id is not None:
+            db.execute(
+                update(Document)
+                .where(Document.id == doc_id)
+                .values({getattr(Document, col): getattr(Document, col) + delta for col, delta in deltas.items()})
+            )
+            changed = doc_id
+            break
+
+    if own_session:
         db.commit()
-    db.close()
+        db.close()
+        if changed:
+            signing_cache.invalidate(changed)
+    return changed is not None
+
+def send_backpressure(user_id, count):
+    """Error response if ``count`` more emails may not be queued now, else None.
+
+    Refuses with 429 + Retry-After when the email queue is past its high-water
+    mark or the user's send rate limit is spent. A request of any size is
+    admitted once there is room: a blast larger than the burst or the
+    high-water mark waits for a full bucket or an empty queue, and its excess
+    then delays the user's next send (see rate_limit.take).
+    """
+    retry_after = task_queue.retry_after_for(count)
+    reason = 'queue_full'
+    if not retry_after:
+        retry_after = rate_limit.take(f'send:{user_id}', count)
+        reason = 'rate_limit'
+    if not retry_after:
+        return None
+
+    metrics.inc('send_rejected_total', reason=reason)
+    message = 'Email queue is full' if reason == 'queue_full' else 'Send rate limit exceeded'
+    return jsonify({'error': message, 'retryAfter': retry_after}), 429, {'Retry-After': str(retry_after)}
 
 # ============ AUTHENTICATION ENDPOINTS ============
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
     """Login user"""
     data = request.json
@@ -130,7 +260,7 @@ def login():
     db.close()
     return jsonify({'error': 'Invalid credentials'}), 401
 
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
 def register():
     """Register new user"""
     data = request.json
@@ -157,29 +287,216 @@ def register():
 
 # ============ DOCUMENT ENDPOINTS ============
 
-@app.route('/api/documents', methods=['GET'])
+@api.route('/api/documents', methods=['GET'])
 def get_documents():
-    """Get all documents for authenticated user"""
+    """Get all documents for authenticated user
+
+    ``?summary=1`` returns list-view data only: page images and fields are
+    left out in favour of ``pageCount``; previews come from the thumbnail
+    endpoint.
+    """
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     user = get_user_from_token(token)
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
 
     db = get_db()
-    docs = db.query(Document).filter(Document.user_id == user.id).all()
-    result = [doc.to_dict(include_requests=True) for doc in docs]
+    if request.args.get('summary'):
+        page_count = func.coalesce(func.nullif(Document.page_count, 0), TemplateSnapshot.page_count, 0)
+        rows = db.query(Document, page_count) \
+            .outerjoin(TemplateSnapshot, TemplateSnapshot.id == Document.snapshot_id) \
+            .options(selectinload(Document.signature_requests)) \
+            .filter(Document.user_id == user.id).all()
+        result = [doc.to_summary_dict(page_count) for doc, page_count in rows]
+    else:
+        docs = db.query(Document).options(*WITH_CONTENT).filter(Document.user_id == user.id).all()
+        result = [doc.to_dict(include_requests=True) for doc in docs]
     db.close()
 
     return jsonify(result)
 
-@app.route('/api/documents/<doc_id>', methods=['GET'])
+@api.route('/api/documents/stats', methods=['GET'])
+def get_document_stats():
+    """Dashboard counters computed with GROUP BY over the status indexes.
+
+    Only indexed columns and small signature_request rows are read, never the
+    pages/fields payloads, so the response size and cost do not grow with
+    document size.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user = get_user_from_token(token)
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    db = get_db()
+
+    # Covered by idx_user_id_status
+    by_status = dict(
+        db.query(Document.status, func.count())
+        .filter(Document.user_id == user.id)
+        .group_by(Document.status)
+        .all()
+    )
+    # Covered by idx_user_id_template_status
+    templates_by_status = dict(
+        db.query(Document.status, func.count())
+        .filter(Document.user_id == user.id, Document.is_template == True)  # noqa: E712
+        .group_by(Document.status)
+        .all()
+    )
+    documents = {
+        status: by_status.get(status, 0) - templates_by_status.get(status, 0)
+        for status in ('draft', 'sent', 'completed')
+    }
+    documents['total'] = sum(by_status.values()) - sum(templates_by_status.values())
+
+    # idx_document_id_status on the signature_requests side of the join
+    user_doc_ids = db.query(Document.id).filter(Document.user_id == user.id)
+    requests_by_status = dict(
+        db.query(SignatureRequest.status, func.count())
+        .filter(SignatureRequest.document_id.in_(user_doc_ids))
+        .group_by(SignatureRequest.status)
+        .all()
+    )
+    signature_requests = {
+        status: requests_by_status.get(status, 0) for status in ('pending', 'viewed', 'signed', 'expired')
+    }
+    signature_requests['total'] = sum(requests_by_status.values())
+
+    last_event = func.coalesce(SignatureRequest.signed_at, SignatureRequest.created_at)
+    recent = (
+        db.query(
+            SignatureRequest.document_id, Document.name, SignatureRequest.signer_name,
+            SignatureRequest.signer_email, SignatureRequest.status, last_event
+        )
+        .join(Document, Document.id == SignatureRequest.document_id)
+        .filter(Document.user_id == user.id)
+        .order_by(last_event.desc())
+        .limit(10)
+        .all()
+    )
+    db.close()
+
+    return jsonify({
+        'documents': documents,
+        'templates': sum(templates_by_status.values()),
+        'signatureRequests': signature_requests,
+        'recentActivity': [
+            {
+                'documentId': doc_id,
+                'documentName': name,
+                'signerName': signer_name,
+                'signerEmail': signer_email,
+                'status': status,
+                'at': at.isoformat() if at else None,
+            }
+            for doc_id, name, signer_name, signer_email, status, at in recent
+        ],
+    })
+
+@api.route('/api/documents/search', methods=['GET'])
+def search_documents():
+    """Full-text search over name, recipients and field values (ranked, paginated)"""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user = get_user_from_token(token)
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if not search_index.is_enabled():
+        return jsonify({'error': 'Search unavailable'}), 503
+
+    query = request.args.get('q', '')
+    page = max(1, request.args.get('page', 1, type=int))
+    page_size = min(100, max(1, request.args.get('pageSize', 20, type=int)))
+
+    db = get_db()
+    total, hits = search_index.search(db, user.id, query, limit=page_size, offset=(page - 1) * page_size)
+
+    # Summary columns only for the hits on this page
+    summaries = {}
+    if hits:
+        rows = db.query(Document.id, Document.name, Document.status, Document.is_template) \
+            .filter(Document.id.in_([doc_id for doc_id, _, _ in hits])).all()
+        summaries = {row.id: row for row in rows}
+    db.close()
+
+    results = []
+    for doc_id, rank, snippet in hits:
+        row = summaries.get(doc_id)
+        if row:
+            results.append({
+                'id': row.id,
+                'name': row.name,
+                'status': row.status,
+                'isTemplate': row.is_template,
+                'rank': rank,
+                'snippet': snippet,
+            })
+
+    return jsonify({'query': query, 'page': page, 'pageSize': page_size, 'total': total, 'results': results})
+
+@api.route('/api/downloads/ticket', methods=['POST'])
+def create_download_ticket():
+    """Single-use ticket for one download link ({"path": "/api/documents/export"})
+
+    Plain links cannot send the Authorization header, so the link carries
+    ?ticket= instead of the bearer token.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user = get_user_from_token(token)
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    path = (request.json or {}).get('path')
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return jsonify({'error': 'path must be an API path'}), 400
+    return jsonify({'ticket': tickets.issue(user.id, 'download', path), 'expiresIn': tickets.TICKET_TTL})
+
+def _download_user():
+    """Owner of a download: Authorization header, or a single-use ?ticket= for this path"""
+    ticket = request.args.get('ticket')
+    if ticket:
+        user_id = tickets.redeem(ticket, 'download', request.path, once=True)
+        if user_id is None:
+            return None
+        db = get_db()
+        user = db.query(User).filter(User.id == user_id).first()
+        db.close()
+        return user
+    return get_user_from_token(request.headers.get('Authorization', '').replace('Bearer ', ''))
+
+@api.route('/api/documents/export', methods=['GET'])
+def export_documents():
+    """ZIP of the user's completed documents plus manifest.json, streamed
+
+    ``?from=`` and ``?to=`` (ISO dates) filter on completion time. Plain
+    download links authenticate with ?ticket= from POST /api/downloads/ticket.
+    """
+    user = _download_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        date_from = bulk_export.parse_date(request.args.get('from'))
+        date_to = bulk_export.parse_date(request.args.get('to'))
+    except ValueError:
+        return jsonify({'error': 'from/to must be ISO dates'}), 400
+
+    db = get_db()
+    doc_ids = bulk_export.select_document_ids(db, user.id, date_from, date_to)
+    db.close()
+
+    filters = {'user': user.email, 'from': request.args.get('from'), 'to': request.args.get('to')}
+    name = f"signed-documents-{datetime.utcnow():%Y%m%d}.zip"
+    return Response(bulk_export.stream_zip(doc_ids, filters=filters), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{name}"'})
+
+@api.route('/api/documents/<doc_id>', methods=['GET'])
 def get_document(doc_id):
     """Get single document by ID - must be authenticated and own it"""
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     user = get_user_from_token(token)
 
     db = get_db()
-    doc = db.query(Document).filter(Document.id == doc_id).first()
+    doc = db.query(Document).options(*WITH_CONTENT).filter(Document.id == doc_id).first()
 
     if not doc:
         db.close()
@@ -194,7 +511,7 @@ def get_document(doc_id):
     db.close()
     return jsonify(result)
 
-@app.route('/api/documents', methods=['POST'])
+@api.route('/api/documents', methods=['POST'])
 def create_document():
     """Create new document"""
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -223,17 +540,110 @@ def create_document():
 
     return jsonify(result)
 
-@app.route('/api/documents/<doc_id>', methods=['PUT'])
+@api.route('/api/documents/<doc_id>/pages/<int:page_number>/thumbnail', methods=['GET'])
+def get_page_thumbnail(doc_id, page_number):
+    """Small JPEG preview of one page (?w= width in px, default 200)
+
+    Clients fetch it with the Authorization header and add ?v=<document
+    version> to the URL; with the content-hash ETag the response can then be
+    cached for a year. The ETag and the disk cache key come from the stored
+    per-page hashes, so page images are only read on a real cache miss.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user = get_user_from_token(token)
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    db = get_db()
+    row = db.query(Document.user_id, Document.page_hashes, Document.snapshot_id) \
+        .filter(Document.id == doc_id).first()
+    if not row:
+        db.close()
+        return jsonify({'error': 'Not found'}), 404
+    if row.user_id != user.id:
+        db.close()
+        return jsonify({'error': 'Forbidden'}), 403
+    hashes = row.page_hashes
+    if not hashes and row.snapshot_id is not None:
+        hashes = db.query(TemplateSnapshot.page_hashes).filter(TemplateSnapshot.id == row.snapshot_id).scalar()
+    if hashes is None:
+        hashes = _backfill_page_hashes(db, doc_id, row.snapshot_id)
+    db.close()
+
+    digest = hashes.get(str(page_number))
+    if digest is None:
+        return jsonify({'error': 'Page not found'}), 404
+
+    width = thumbnails.clamp_width(request.args.get('w', type=int))
+    etag = f'{digest}-{width}'
+    headers = {'Cache-Control': 'private, max-age=31536000, immutable'}
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+    else:
+        data = thumbnails.get_thumbnail(digest, width, lambda: _page_image_url(doc_id, page_number))
+        if data is None:
+            return jsonify({'error': 'Page not found'}), 404
+        response = Response(data, mimetype='image/jpeg', headers=headers)
+    response.set_etag(etag)
+    return response
+
+def _document_pages(db, doc_id):
+    """Content pages of a document (cold store and template snapshot resolved)"""
+    doc = db.query(Document).options(undefer(Document.pages)).filter(Document.id == doc_id).first()
+    return doc.content_pages if doc else []
+
+def _page_image_url(doc_id, page_number):
+    """Image data URL of one page, read on a thumbnail cache miss only"""
+    db = get_db()
+    try:
+        page = next((p for p in _document_pages(db, doc_id) if p.get('pageNumber') == page_number), None)
+    finally:
+        db.close()
+    return page['imageUrl'] if page and str(page.get('imageUrl', '')).startswith('data:') else None
+
+def _backfill_page_hashes(db, doc_id, snapshot_id):
+    """Compute and store page_hashes of a row written before the column existed"""
+    hashes = page_hashes_of(_document_pages(db, doc_id))
+    # Core UPDATEs: no version bump, so editors and signers see no conflict
+    if snapshot_id is not None and not db.query(Document.page_count).filter(Document.id == doc_id).scalar():
+        db.execute(update(TemplateSnapshot).where(TemplateSnapshot.id == snapshot_id).values(page_hashes=hashes))
+    else:
+        db.execute(update(Document).where(Document.id == doc_id).values(page_hashes=hashes))
+    db.commit()
+    return hashes
+
+@api.route('/api/signatures/<digest>.png', methods=['GET'])
+def get_signature_image(digest):
+    """Stored signature image (public: the URL is the SHA-256 of the image itself)"""
+    if signatures.parse_reference(signatures.reference(digest)) is None:
+        return jsonify({'error': 'Not found'}), 404
+    headers = {'Cache-Control': 'private, max-age=31536000, immutable'}
+    if request.if_none_match.contains(digest):
+        response = Response(status=304, headers=headers)
+    else:
+        db = get_db()
+        data = signatures.load(db, digest)
+        db.close()
+        if data is None:
+            return jsonify({'error': 'Not found'}), 404
+        response = Response(data, mimetype='image/png', headers=headers)
+    response.set_etag(digest)
+    return response
+
+@api.route('/api/documents/<doc_id>', methods=['PUT'])
 def update_document(doc_id):
     """Update document"""
     data = request.json
     db = get_db()
 
-    doc = db.query(Document).filter(Document.id == doc_id).first()
+    doc = db.query(Document).options(*WITH_CONTENT).filter(Document.id == doc_id).first()
     if not doc:
         db.close()
         return jsonify({'error': 'Not found'}), 404
 
+    if 'pages' in data or 'fields' in data:
+        doc.rehydrate()
+        doc.materialize()
     doc.name = data.get('name', doc.name)
     doc.pages = data.get('pages', doc.pages)
     doc.fields = data.get('fields', doc.fields)
@@ -241,13 +651,20 @@ def update_document(doc_id):
     doc.status = data.get('status', doc.status)
     doc.updated_at = datetime.utcnow()
 
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        # A signer (or another editor tab) committed since we loaded the row
+        db.rollback()
+        db.close()
+        return jsonify({'error': 'Document was modified concurrently, reload and retry'}), 409
+    signing_cache.invalidate(doc_id)
     result = doc.to_dict()
     db.close()
 
     return jsonify(result)
 
-@app.route('/api/documents/<doc_id>', methods=['DELETE'])
+@api.route('/api/documents/<doc_id>', methods=['DELETE'])
 def delete_document(doc_id):
     """Delete document"""
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -266,15 +683,19 @@ def delete_document(doc_id):
         db.close()
         return jsonify({'error': 'Forbidden'}), 403
 
+    archived = doc.archived_at is not None
     db.delete(doc)
     db.commit()
     db.close()
+    signing_cache.invalidate(doc_id)
+    if archived:
+        cold_store.delete(doc_id)
 
     return jsonify({'success': True})
 
 # ============ SIGNATURE ENDPOINTS ============
 
-@app.route('/api/documents/<doc_id>/send-for-signature', methods=['POST'])
+@api.route('/api/documents/<doc_id>/send-for-signature', methods=['POST'])
 def send_for_signature(doc_id):
     """Send document for signatures - ASYNC EMAIL"""
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -296,6 +717,11 @@ def send_for_signature(doc_id):
         db.close()
         return jsonify({'error': 'Forbidden'}), 403
 
+    refused = send_backpressure(user.id, len(recipients))
+    if refused:
+        db.close()
+        return refused
+
     # Create signature requests and queue emails
     signature_requests = []
     frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:4200')
@@ -316,7 +742,9 @@ def send_for_signature(doc_id):
             recipient['name'],
             signing_link,
             doc.name,
-            user.email
+            user.email,
+            user_id=user.id,
+            document_id=doc_id
         )
 
         signature_requests.append(sig_req)
@@ -326,26 +754,188 @@ def send_for_signature(doc_id):
     doc.sent_at = datetime.utcnow()
     db.commit()
     db.close()
+    signing_cache.invalidate(doc_id)
 
     return jsonify({'success': True, 'signatureRequests': signature_requests})
 
-@app.route('/api/sign/<access_token>', methods=['GET'])
+@api.route('/api/documents/<doc_id>/signing-progress', methods=['GET'])
+def get_signing_progress(doc_id):
+    """Signing progress from the document's counters (never loads signature rows)"""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user = get_user_from_token(token)
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    db = get_db()
+    row = db.query(
+        Document.id, Document.user_id, Document.status,
+        Document.signer_count, Document.viewed_count, Document.signed_count, Document.expired_count
+    ).filter(Document.id == doc_id).first()
+    db.close()
+
+    if not row:
+        return jsonify({'error': 'Not found'}), 404
+    if row.user_id != user.id:
+        return jsonify({'error': 'Forbidden'}), 403
+
+    return jsonify(signing_progress(row))
+
+# Most document ids plus access tokens one status request may ask for
+STATUS_BATCH_MAX = int(os.getenv('STATUS_BATCH_MAX', '500'))
+
+@api.route('/api/documents/status', methods=['POST'])
+def get_document_statuses():
+    """Compact status of many documents in one request, for integrations that poll.
+
+    Body: ``{"ids": [document ids], "tokens": [signing access tokens]}``.
+    Returns a status record per document (see models.document_status), in
+    request order. ``tokens`` maps each token to its document and signer.
+    Ids and tokens that are unknown, or belong to another user's documents,
+    are listed in ``notFound``. Only two queries run whatever the batch size:
+    one over documents and one over their signature requests.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user = get_user_from_token(token)
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    ids, tokens = data.get('ids') or [], data.get('tokens') or []
+    if not isinstance(ids, list) or not isinstance(tokens, list) \
+            or not all(isinstance(v, str) for v in ids + tokens):
+        return jsonify({'error': 'ids and tokens must be lists of strings'}), 400
+    ids, tokens = list(dict.fromkeys(ids)), list(dict.fromkeys(tokens))
+    if len(ids) + len(tokens) > STATUS_BATCH_MAX:
+        return jsonify({'error': f'At most {STATUS_BATCH_MAX} ids and tokens per request'}), 400
+
+    docs, signers = {}, {}
+    if ids or tokens:
+        db = get_db()
+        token_docs = select(SignatureRequest.document_id).where(SignatureRequest.access_token.in_(tokens))
+        # Primary-key lookups only; filtering on user_id in SQL would make the
+        # planner walk every document the caller owns
+        rows = db.query(
+            Document.id, Document.user_id, Document.name, Document.status, Document.version,
+            Document.created_at, Document.updated_at, Document.sent_at, Document.completed_at,
+            Document.archived_at, Document.signed_count, Document.signer_count, Document.expired_count
+        ).filter(or_(Document.id.in_(ids), Document.id.in_(token_docs))).all()
+        docs = {row.id: row for row in rows if row.user_id == user.id}
+        if docs:
+            for r in db.query(
+                SignatureRequest.id, SignatureRequest.document_id, SignatureRequest.signer_email,
+                SignatureRequest.signer_name, SignatureRequest.order, SignatureRequest.status,
+                SignatureRequest.signed_at, SignatureRequest.expires_at, SignatureRequest.access_token
+            ).filter(SignatureRequest.document_id.in_(list(docs))):
+                signers.setdefault(r.document_id, []).append(r)
+        db.close()
+
+    by_token = {r.access_token: r for rows in signers.values() for r in rows}
+    order = dict.fromkeys([doc_id for doc_id in ids if doc_id in docs] +
+                          [by_token[t].document_id for t in tokens if t in by_token])
+    return jsonify({
+        'documents': [document_status(docs[doc_id], signers.get(doc_id, [])) for doc_id in order],
+        'tokens': {t: {'documentId': by_token[t].document_id, 'signerId': by_token[t].id,
+                       'status': by_token[t].status} for t in tokens if t in by_token},
+        'notFound': [doc_id for doc_id in ids if doc_id not in docs] + [t for t in tokens if t not in by_token],
+    })
+
+@api.route('/api/email-status/<doc_id>', methods=['GET'])
+def get_email_status(doc_id):
+    """Email delivery log of a document; optional recipient, status and limit filters"""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user = get_user_from_token(token)
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+
+    db = get_db()
+    owner_id = db.query(Document.user_id).filter(Document.id == doc_id).scalar()
+    if owner_id is None:
+        db.close()
+        return jsonify({'error': 'Not found'}), 404
+    if owner_id != user.id:
+        db.close()
+        return jsonify({'error': 'Forbidden'}), 403
+
+    entries = delivery_log.query(
+        db, doc_id,
+        recipient=request.args.get('recipient'),
+        status=request.args.get('status'),
+        limit=limit
+    )
+    result = {
+        'documentId': doc_id,
+        'recipients': delivery_log.latest_by_recipient(db, doc_id),
+        'entries': [entry.to_dict() for entry in entries],
+    }
+    db.close()
+    return jsonify(result)
+
+@api.route('/api/events/ticket', methods=['POST'])
+def create_event_ticket():
+    """Short-lived ticket for opening /api/events (EventSource cannot set headers)"""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user = get_user_from_token(token)
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify({'ticket': tickets.issue(user.id, 'events'), 'expiresIn': tickets.TICKET_TTL})
+
+@api.route('/api/events', methods=['GET'])
+def event_stream():
+    """Server-Sent Events stream of the user's document/signing status changes
+
+    Authenticated by ?ticket= from POST /api/events/ticket, so the bearer
+    token never appears in a URL. Each stream holds a server thread; past
+    EVENTS_MAX_STREAMS per process the request gets 503 + Retry-After.
+    """
+    user_id = tickets.redeem(request.args.get('ticket'), 'events')
+    if user_id is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    sub = events.subscribe(user_id)
+    if sub is None:
+        metrics.inc('event_streams_rejected_total')
+        return jsonify({'error': 'Too many open event streams, retry shortly'}), 503, {'Retry-After': '10'}
+    response = Response(events.stream(sub), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # Disable proxy buffering (nginx)
+    })
+    # Frees the slot even if the client leaves before the stream starts
+    response.call_on_close(lambda: events.unsubscribe(sub))
+    return response
+
+@api.route('/api/sign/<access_token>', methods=['GET'])
 def get_document_by_token(access_token):
-    """Get document for signing (public, no auth required)"""
+    """Get document for signing (public, no auth required).
+
+    Repeat opens are answered from signing_cache when the link's status and
+    the document's version still match the cached view.
+    """
+    if signing_cache.enabled():
+        state = _signing_view_state(access_token)
+        cached = signing_cache.get(access_token, state) if state else None
+        if cached is not None:
+            return Response(cached, mimetype='application/json')
+
     sig_req = get_signature_request_by_token_db(access_token)
     if not sig_req:
         return jsonify({'error': 'Invalid or expired token'}), 401
 
+    # Mark as viewed, before the cache generation is taken: this open's own
+    # transition must not keep its view from being cached
+    viewed_now = sig_req['status'] == 'pending' and update_signature_request_status_db(access_token, 'viewed')
+    generation = signing_cache.generation(sig_req['documentId'], sig_req['signerEmail'])
+
     db = get_db()
-    doc = db.query(Document).filter(Document.id == sig_req['documentId']).first()
+    doc = db.query(Document).options(*WITH_CONTENT).filter(Document.id == sig_req['documentId']).first()
 
     if not doc:
         db.close()
         return jsonify({'error': 'Document not found'}), 404
 
-    # Mark as viewed
-    if sig_req['status'] == 'pending':
-        update_signature_request_status_db(access_token, 'viewed')
+    if viewed_now:
+        events.publish(doc.user_id, 'signature.viewed', _signer_event(sig_req))
 
     # Filter fields for this signer
     signer_recipient = next(
@@ -355,99 +945,238 @@ def get_document_by_token(access_token):
 
     result = doc.to_dict()
     if signer_recipient:
-        result['filteredFields'] = [f for f in doc.fields if f.get('recipientId') == signer_recipient['id']]
+        result['filteredFields'] = [f for f in doc.content_fields if f.get('recipientId') == signer_recipient['id']]
         result['currentSigner'] = {
             'email': sig_req['signerEmail'],
             'name': sig_req['signerName'],
             'recipientId': signer_recipient['id']
         }
+    # Offered by the signature modal; submitted back as references
+    result['savedSignatures'] = signatures.saved_for_signer(db, sig_req['signerEmail'])
 
+    version = doc.version
     db.close()
-    return jsonify(result)
+    response = jsonify(result)
+    # Signed requests stay readable after the link's expiry
+    expires_at = sig_req['expiresAt'] if sig_req['status'] != 'signed' else None
+    status = 'viewed' if viewed_now else sig_req['status']
+    signing_cache.store(access_token, response.get_data(), doc.id, sig_req['signerEmail'],
+                        datetime.fromisoformat(expires_at) if expires_at else None, (status, version), generation)
+    return response
+
+def _signing_view_state(access_token):
+    """(request status, document version) of a signing link, or None if unknown.
+
+    One lookup on the unique token index joined to the documents primary key;
+    both values change on every write that changes the view, in any process.
+    """
+    db = get_db()
+    row = db.query(SignatureRequest.status, Document.version) \
+        .join(Document, Document.id == SignatureRequest.document_id) \
+        .filter(SignatureRequest.access_token == access_token).first()
+    db.close()
+    return (row.status, row.version) if row else None
 
-@app.route('/api/sign/<access_token>/submit', methods=['POST'])
+# Attempts before a submission that keeps losing version races gives up
+SUBMIT_MAX_ATTEMPTS = 25
+
+@api.route('/api/sign/<access_token>/submit', methods=['POST'])
 def submit_signature(access_token):
-    """Submit signature - ASYNC PDF AND EMAIL"""
+    """Submit signature - ASYNC PDF AND EMAIL
+
+    Concurrent signers of one document never lose each other's values: the
+    signer's fields are merged one by one into the current field list, and
+    the document row is written under its optimistic version check. When
+    another signer commits first, the whole transaction (field merge, request
+    status and progress counters) is retried against the fresh row. Since
+    completion is decided inside that versioned transaction, exactly one
+    submission completes the document. Each token is signed once: a repeat
+    or concurrent submit of a signed token gets 409, an expired one 401.
+    """
     sig_req = get_signature_request_by_token_db(access_token)
     if not sig_req:
         return jsonify({'error': 'Invalid token'}), 401
+    if sig_req['status'] == 'signed':
+        return jsonify({'error': 'Already signed'}), 409
 
     data = request.json
     fields = data.get('fields', [])
     pages = data.get('pages', [])
-
-    db = get_db()
-    doc = db.query(Document).filter(Document.id == sig_req['documentId']).first()
-
-    if not doc:
-        db.close()
-        return jsonify({'error': 'Document not found'}), 404
-
-    # Update fields with signature
-    for field in doc.fields:
-        matching = next((f for f in fields if f['id'] == field['id']), None)
-        if matching:
-            field['value'] = matching.get('value')
-
-    # Update pages
-    doc.pages = pages
-
-    # Mark signature request as signed
-    update_signature_request_status_db(access_token, 'signed', datetime.utcnow().isoformat())
-
-    # Check if all signed
-    all_sig_reqs = db.query(SignatureRequest).filter(SignatureRequest.document_id == doc.id).all()
-    all_signed = all(r.status == 'signed' for r in all_sig_reqs)
-
-    if all_signed:
-        doc.status = 'completed'
-        doc.completed_at = datetime.utcnow()
-
+    # Document version the signer's pages were rendered from (older clients omit it)
+    base_version = data.get('version')
+    # Image work happens once, outside the transaction that may be retried
+    images = signatures.normalize_submitted(fields)
+
+    for attempt in range(SUBMIT_MAX_ATTEMPTS):
+        db = get_db()
+        try:
+            outcome = _apply_submission(db, sig_req, access_token, fields, pages, base_version, images)
+            if outcome is None:
+                return jsonify({'error': 'Document not found'}), 404
+            db.commit()
+            break
+        except SubmissionRefused as e:
+            db.rollback()
+            return jsonify({'error': e.error}), e.status_code
+        except signatures.ForeignReference:
+            db.rollback()
+            return jsonify({'error': 'Signature image not found for this signer'}), 400
+        except (StaleDataError, IntegrityError):
+            # IntegrityError: the same signer stored the same image concurrently
+            db.rollback()
+            # Exponential backoff with full jitter spreads out competing signers
+            time.sleep(random.uniform(0, min(0.25, 0.005 * 2 ** attempt)))
+        finally:
+            db.close()
+    else:
+        return jsonify({'error': 'Document is busy, please retry'}), 409
+
+    # Every signer's view shows the new values; the signer's other views offer the new saved signature
+    signing_cache.invalidate(sig_req['documentId'], sig_req['signerEmail'])
+    all_signed, completed_now, completion, owner_id = outcome
+    events.publish(owner_id, 'signature.signed', _signer_event(sig_req))
+    if completed_now:
+        events.publish(owner_id, 'document.completed', {'documentId': sig_req['documentId']})
         # Queue PDF generation and email (ASYNC FIX - remove from critical path)
-        pdf_data = generate_pdf_from_pages(pages)
-
-        all_emails = [r.signer_email for r in all_sig_reqs] + [doc.user.email]
+        doc_name, final_pages, all_emails, owner_email = completion
+        pdf_data = generate_pdf_from_pages(final_pages)
         task_queue.enqueue_final_pdf(
             all_emails,
-            doc.name,
+            doc_name,
             pdf_data,
-            doc.user.email
+            owner_email,
+            user_id=owner_id,
+            document_id=sig_req['documentId']
         )
 
-    db.commit()
-    db.close()
-
     return jsonify({'success': True, 'allSigned': all_signed})
 
-def generate_pdf_from_pages(pages):
-    """Generate PDF from pages - helper function"""
-    pdf_buffer = BytesIO()
-    c = canvas.Canvas(pdf_buffer)
-
-    for page in pages:
-        img_data = page['imageUrl'].split(',')[1]
-        img_bytes = base64.b64decode(img_data)
-        img = Image.open(BytesIO(img_bytes))
-
-        width, height = img.size
-        c.setPageSize((width, height))
-
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-            img.save(tmp, format='PNG')
-            tmp_path = tmp.name
+class SubmissionRefused(Exception):
+    """The signing request can no longer be signed (already signed or expired)"""
+    def __init__(self, error, status_code):
+        super().__init__(error)
+        self.error = error
+        self.status_code = status_code
+
+def _apply_submission(db, sig_req, access_token, fields, pages, base_version, images):
+    """One attempt of submit_signature inside the caller's transaction.
+
+    Returns None if the document is gone, else
+    ``(all_signed, completed_now, completion, owner_id)`` where ``completion``
+    holds what the final-PDF email needs. Raises StaleDataError on a version
+    race, and SubmissionRefused if the request was signed or expired since
+    the token lookup.
+    """
+    # The conditional status transition comes first: it is the one check in
+    # this transaction that the request is still unsigned and unexpired, and
+    # it takes the write lock, so a concurrent submit of the same token waits
+    # here and then finds the request signed
+    if not update_signature_request_status_db(access_token, 'signed', datetime.utcnow().isoformat(), db=db):
+        status = db.query(SignatureRequest.status).filter(SignatureRequest.access_token == access_token).scalar()
+        if status == 'signed':
+            raise SubmissionRefused('Already signed', 409)
+        raise SubmissionRefused('Invalid or expired token', 401)
+
+    doc = db.query(Document).options(*WITH_CONTENT).filter(Document.id == sig_req['documentId']).first()
+    if not doc:
+        return None
+    doc.rehydrate()
 
-        c.drawImage(tmp_path, 0, 0, width=width, height=height)
-        os.unlink(tmp_path)
-        c.showPage()
+    # Signers may only fill their own fields. On legacy documents whose
+    # recipients cannot be matched, a signer may fill any field that is still
+    # empty; the client sends back every field, so values it was served (or a
+    # blank) for fields another signer has since filled must not be merged.
+    signer_recipient = next(
+        (r for r in doc.recipients if r.get('email') == sig_req['signerEmail']),
+        None
+    )
+    submitted = {f['id']: f.get('value') for f in fields if 'id' in f}
+    merged_fields = []
+    mine = []
+    for field in doc.content_fields:
+        field = dict(field)
+        if signer_recipient is not None:
+            allowed = field.get('recipientId') == signer_recipient['id']
+        else:
+            allowed = field.get('value') in (None, '') and submitted.get(field['id']) not in (None, '')
+        if allowed and field['id'] in submitted:
+            field['value'] = signatures.resolve_submitted(db, sig_req['signerEmail'], field,
+                                                          submitted[field['id']], images)
+            mine.append(field)
+        merged_fields.append(field)
+    # Assign new containers so the JSON columns are marked dirty
+    if doc.snapshot_id is None:
+        doc.fields = merged_fields
+    else:
+        # Copy-on-write instance: only the values go into the overlay
+        doc.field_values = {**(doc.field_values or {}), **{f['id']: f['value'] for f in mine}}
+
+    if pages:
+        if base_version is None or base_version == doc.version:
+            doc.pages = pages
+        else:
+            # Pages were rendered before another signer committed: draw this
+            # signer's values onto the current pages instead of replacing them
+            doc.pages = page_render.burn_fields_into_pages(
+                doc.content_pages, mine, load_image=lambda value: signatures.image_bytes(db, value))
+
+    # Check if all signed - O(1) from the counters, no signature rows loaded
+    signed_count, signer_count = db.query(Document.signed_count, Document.signer_count) \
+        .filter(Document.id == doc.id).one()
+    all_signed = signer_count > 0 and signed_count >= signer_count
+
+    completed_now = all_signed and doc.status != 'completed'
+    completion = None
+    if completed_now:
+        doc.status = 'completed'
+        doc.completed_at = datetime.utcnow()
+        signer_emails = [email for (email,) in db.query(SignatureRequest.signer_email)
+                         .filter(SignatureRequest.document_id == doc.id)]
+        completion = (doc.name, doc.content_pages, signer_emails + [doc.user.email], doc.user.email)
+
+    # Flush now so a version conflict surfaces inside the retry loop
+    db.flush()
+    return all_signed, completed_now, completion, doc.user_id
+
+def _signer_event(sig_req):
+    return {
+        'documentId': sig_req['documentId'],
+        'signatureRequestId': sig_req['id'],
+        'signerEmail': sig_req['signerEmail'],
+        'signerName': sig_req['signerName'],
+    }
 
-    c.save()
-    pdf_buffer.seek(0)
-    return pdf_buffer.getvalue()
+def generate_pdf_from_pages(pages):
+    """Generate PDF from pages - helper function"""
+    metrics.observe('pdf_generation_pages', len(pages))
+    with metrics.timed('pdf_generation_seconds'), tracing.span('pdf.generate', attributes={'pdf.pages': len(pages)}):
+        pdf_buffer = BytesIO()
+        pdf_writer.write_pdf(pages, pdf_buffer)
+        return pdf_buffer.getvalue()
 
 # ============ TEMPLATE ENDPOINTS ============
 
-@app.route('/api/templates/<template_id>/send', methods=['POST'])
+def get_template_snapshot(db, template):
+    """The shared snapshot of the template's current version, created on first send"""
+    snapshot = db.query(TemplateSnapshot).filter(
+        TemplateSnapshot.template_id == template.id,
+        TemplateSnapshot.template_version == template.version
+    ).first()
+    if snapshot is None:
+        snapshot = TemplateSnapshot(
+            template_id=template.id,
+            template_version=template.version,
+            pages=template.pages,
+            # Template fields are role-based; recipientId is bound per document on read
+            fields=[{k: v for k, v in field.items() if k != 'role'} for field in template.fields],
+            page_count=len(template.pages or []),
+            page_hashes=page_hashes_of(template.pages)
+        )
+        db.add(snapshot)
+        db.commit()
+    return snapshot
+
+@api.route('/api/templates/<template_id>/send', methods=['POST'])
 def send_template_to_recipients(template_id):
     """Send template to multiple recipients - ASYNC EMAIL"""
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -469,22 +1198,21 @@ def send_template_to_recipients(template_id):
         db.close()
         return jsonify({'error': 'Forbidden'}), 403
 
+    refused = send_backpressure(user.id, len(recipients))
+    if refused:
+        db.close()
+        return refused
+
     frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:4200')
     sent_list = []
 
+    snapshot = get_template_snapshot(db, template)
+
     for recipient in recipients:
-        # Create new document from template
-        import copy
+        # Create new copy-on-write document from the template snapshot
         new_doc_id = str(uuid.uuid4())[:12]
         recipient_id = str(uuid.uuid4())
 
-        new_fields = copy.deepcopy(template.fields)
-
-        # Convert template fields (role-based) to document fields (recipientId-based)
-        for field in new_fields:
-            field['recipientId'] = recipient_id
-            field.pop('role', None)
-
         new_recipient = {
             'id': recipient_id,
             'name': recipient['name'],
@@ -497,12 +1225,13 @@ def send_template_to_recipients(template_id):
             id=new_doc_id,
             user_id=user.id,
             name=f"{template.name} - {recipient['name']}",
-            pages=template.pages,
-            fields=new_fields,
+            pages=[],
+            fields=[],
             recipients=[new_recipient],
             status='sent',
             is_template=False,
-            template_id=template_id
+            template_id=template_id,
+            snapshot_id=snapshot.id
         )
 
         db.add(new_doc)
@@ -524,7 +1253,9 @@ def send_template_to_recipients(template_id):
             recipient['name'],
             signing_link,
             new_doc.name,
-            user.email
+            user.email,
+            user_id=user.id,
+            document_id=new_doc_id
         )
 
         sent_list.append({'email': recipient['email'], 'status': 'sent', 'documentId': new_doc_id})
@@ -534,7 +1265,7 @@ def send_template_to_recipients(template_id):
 
 # ============ FILE ENDPOINTS ============
 
-@app.route('/api/upload', methods=['POST'])
+@api.route('/api/upload', methods=['POST'])
 def upload_file():
     """Upload file"""
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -552,12 +1283,15 @@ def upload_file():
     filename = secure_filename(file.filename)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'{timestamp}_{filename}'
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
     file.save(filepath)
 
     return jsonify({'filename': filename, 'path': filepath})
 
-@app.route('/api/documents/<doc_id>/download', methods=['POST'])
+# Bytes of a PDF download kept in memory before spilling to a temp file
+PDF_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+@api.route('/api/documents/<doc_id>/download', methods=['POST'])
 def download_document(doc_id):
     """Download document as PDF"""
     data = request.json
@@ -566,15 +1300,57 @@ def download_document(doc_id):
 
     if not pages:
         return jsonify({'error': 'No pages'}), 400
+    return _pdf_response(pages, doc_name)
+
+@api.route('/api/documents/<doc_id>/pdf', methods=['GET'])
+def get_document_pdf(doc_id):
+    """The stored document as PDF (owner only)
+
+    Archived documents are served from the PDF rendered at archival time.
+    Plain download links authenticate with ?ticket= from POST /api/downloads/ticket.
+    """
+    user = _download_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
 
-    pdf_data = generate_pdf_from_pages(pages)
+    db = get_db()
+    doc = db.query(Document).filter(Document.id == doc_id).first()
+    if not doc:
+        db.close()
+        return jsonify({'error': 'Not found'}), 404
+    if doc.user_id != user.id:
+        db.close()
+        return jsonify({'error': 'Forbidden'}), 403
 
-    return send_file(
-        BytesIO(pdf_data),
+    download_name = f"{doc.name.replace('.pdf', '')}_signed.pdf"
+    if doc.archived_at is not None and os.path.exists(cold_store.pdf_path(doc.id)):
+        db.close()
+        return send_file(cold_store.pdf_path(doc_id), mimetype='application/pdf',
+                         as_attachment=True, download_name=download_name)
+    pages, doc_name = doc.content_pages, doc.name
+    db.close()
+    if not pages:
+        return jsonify({'error': 'No pages'}), 400
+    return _pdf_response(pages, doc_name)
+
+def _pdf_response(pages, doc_name):
+    # Built page by page into a spooled file: small PDFs stay in memory,
+    # large ones spill to disk instead of being held (and copied) in RAM
+    pdf_file = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_MEMORY)
+    metrics.observe('pdf_generation_pages', len(pages))
+    with metrics.timed('pdf_generation_seconds'), tracing.span('pdf.generate', attributes={'pdf.pages': len(pages)}):
+        pdf_writer.write_pdf(pages, pdf_file)
+    size = pdf_file.tell()
+    pdf_file.seek(0)
+
+    response = send_file(
+        pdf_file,
         mimetype='application/pdf',
         as_attachment=True,
         download_name=f"{doc_name.replace('.pdf', '')}_signed.pdf"
     )
+    response.content_length = size
+    return response
 
 # ============ SHUTDOWN HANDLER ============
 
@@ -586,4 +1362,5 @@ def shutdown_handler():
 if __name__ == '__main__':
     import atexit
     atexit.register(shutdown_handler)
+    app = create_app()
     app.run(debug=True, port=5000)
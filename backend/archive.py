@@ -0,0 +1,190 @@
+"""Tiered archival of completed documents
+
+Completed documents are never edited again, yet their page images and
+fields used to stay in the ``documents`` table next to the drafts being
+worked on. Once a document has been completed for ARCHIVE_AFTER_DAYS, this
+job moves that payload to the cold store (see cold_store.py). It also
+renders the final PDF there. The row keeps its metadata, counters and
+page_count and page_hashes, so lists, stats, search, thumbnail
+revalidation and signing progress are unchanged.
+The hot table then holds only live documents.
+
+Archived documents stay readable: ``Document.content_pages`` and
+``content_fields`` read the cold store on access, and ``rehydrate()``
+moves the payload back into the row before an edit.
+
+Each pass ends with an incremental VACUUM that returns freed pages to the
+filesystem in small steps, so writers are never blocked for long. SQLite
+only supports this with ``auto_vacuum=INCREMENTAL``. New databases get it
+from init_db(); existing ones need a one-time full VACUUM::
+
+    python archive.py --convert-vacuum   # once, while the app is stopped
+    python archive.py                    # one archival pass
+
+The job runs every ARCHIVE_INTERVAL seconds next to the email queue
+(worker.py, or the in-process queue in development); 0 disables it.
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy.orm import undefer
+from sqlalchemy.orm.exc import StaleDataError
+from database import SessionLocal, engine, init_db
+from models import Document
+import cold_store
+import metrics
+import signing_cache
+
+AFTER_DAYS = float(os.getenv('ARCHIVE_AFTER_DAYS', '30'))
+INTERVAL = float(os.getenv('ARCHIVE_INTERVAL', '3600'))
+BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '50'))
+# Pages freed per incremental_vacuum step (4 KB each); one short write lock per step
+VACUUM_STEP_PAGES = 1000
+# Cold-store files younger than this are never swept (their commit may be in flight)
+SWEEP_GRACE_SECONDS = 3600
+
+_thread = None
+_stop = threading.Event()
+
+def run_once(after_days=None):
+    """Archive every eligible document, sweep orphaned files, then vacuum"""
+    cutoff = datetime.utcnow() - timedelta(days=AFTER_DAYS if after_days is None else after_days)
+    archived = 0
+    while True:
+        db = SessionLocal()
+        try:
+            ids = [doc_id for (doc_id,) in db.query(Document.id).filter(
+                Document.status == 'completed',
+                Document.archived_at.is_(None),
+                Document.completed_at < cutoff,
+            ).order_by(Document.completed_at).limit(BATCH_SIZE)]
+        finally:
+            db.close()
+        done = sum(archive_document(doc_id) for doc_id in ids)
+        archived += done
+        if len(ids) < BATCH_SIZE or not done:
+            break
+    if archived:
+        print(f"🧊 Archived {archived} completed documents")
+    sweep()
+    freed = incremental_vacuum()
+    return archived, freed
+
+def archive_document(doc_id):
+    """Move one completed document's payload to the cold store; True if archived"""
+    db = SessionLocal()
+    try:
+        doc = db.query(Document).options(undefer(Document.pages), undefer(Document.fields)) \
+            .filter(Document.id == doc_id).first()
+        if not doc or doc.status != 'completed' or doc.archived_at is not None:
+            return False
+        payload = {'pages': doc.pages or [], 'fields': doc.fields or []}
+        # Files first: if the commit below fails they are only orphans for sweep()
+        cold_store.write_payload(doc.id, payload)
+        cold_store.write_pdf(doc.id, doc.content_pages)
+
+        page_count, page_hashes = doc.page_count, doc.page_hashes
+        doc.pages, doc.fields = [], []
+        doc.page_count, doc.page_hashes = page_count, page_hashes
+        doc.archived_at = datetime.utcnow()
+        doc._archived_payload = payload  # Re-indexing reads the fields from here
+        db.commit()
+        signing_cache.invalidate(doc.id)
+        metrics.inc('archive_documents_total')
+        return True
+    except StaleDataError:
+        # Edited or signed concurrently; the next pass looks at it again
+        db.rollback()
+        return False
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️  Archiving document {doc_id} failed: {e}")
+        return False
+    finally:
+        db.close()
+
+def sweep():
+    """Delete cold-store files whose document was rehydrated or deleted"""
+    db = SessionLocal()
+    try:
+        keep = {cold_store.file_key(doc_id) for (doc_id,) in
+                db.query(Document.id).filter(Document.archived_at.isnot(None))}
+    finally:
+        db.close()
+    cutoff = time.time() - SWEEP_GRACE_SECONDS
+    for key, path, mtime in cold_store.list_files():
+        if key not in keep and mtime < cutoff:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def auto_vacuum_mode():
+    """SQLite auto_vacuum setting: 0 none, 1 full, 2 incremental"""
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+
+def incremental_vacuum():
+    """Return free pages to the filesystem a step at a time; pages freed"""
+    if engine.dialect.name != 'sqlite' or auto_vacuum_mode() != 2:
+        return 0
+    freed = 0
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        while True:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            step = min(free, VACUUM_STEP_PAGES)
+            # execute() would step the pragma once (one page); a script runs it to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({step});")
+            freed += step
+    finally:
+        raw.close()
+    return freed
+
+def convert_to_incremental_vacuum():
+    """Switch an existing database to auto_vacuum=INCREMENTAL (rewrites the whole file)"""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+
+def _loop():
+    while not _stop.wait(INTERVAL):
+        try:
+            run_once()
+        except Exception as e:
+            print(f"⚠️  Archival pass failed: {e}")
+
+def start():
+    """Run archival passes every ARCHIVE_INTERVAL seconds in a daemon thread"""
+    global _thread
+    if INTERVAL <= 0 or (_thread is not None and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, daemon=True)
+    _thread.start()
+
+def stop():
+    _stop.set()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--after-days', type=float, help='Override ARCHIVE_AFTER_DAYS')
+    parser.add_argument('--convert-vacuum', action='store_true',
+                        help='Switch the database to incremental auto-vacuum (one full VACUUM)')
+    args = parser.parse_args()
+
+    init_db()
+    if args.convert_vacuum:
+        convert_to_incremental_vacuum()
+        print("✅ Database switched to auto_vacuum=INCREMENTAL")
+    archived, freed = run_once(args.after_days)
+    print(f"Archived {archived} documents, freed {freed} database pages")
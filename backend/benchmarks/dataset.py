@@ -0,0 +1,243 @@
+"""Synthetic production-sized database for scaling and query-plan tests
+
+Fills a fresh SQLite database with the schema from models.py: users,
+documents, signature requests and the full-text index. The volumes are
+configurable, and the data is shaped like production:
+
+- a few heavy users own most documents; the demo user is the heaviest, so
+  the app can be pointed at the file and logged into;
+- documents are drafts, templates, sent or completed, with consistent
+  progress counters, timestamps and signer statuses. Requests whose link
+  has expired are ``expired``;
+- page images are PNGs of about ``--page-kb`` each, stored the way the app
+  stores them (CompressedJSON).
+
+Full page payloads for a million documents would take tens of gigabytes,
+so only ``--payload-fraction`` of the documents carry page images and
+fields. The rest keep their page_count but store empty lists, like
+archived documents. List, status and signing-progress queries read neither
+column. Rows are written with executemany in large transactions, and the
+secondary indexes are built after loading. Usage (from backend/)::
+
+    python benchmarks/dataset.py -o /tmp/synthetic.db                # 10k users, 1M documents, 5M requests
+    python benchmarks/dataset.py -o /tmp/small.db --scale 0.01       # 1% of every volume
+    DATABASE_URL=sqlite:////tmp/synthetic.db python app.py           # browse it as demo@example.com
+"""
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from io import BytesIO
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BATCH_SIZE = 20000
+PAGE_POOL_SIZE = 16
+MAX_PAGES = 12
+LINK_TTL = timedelta(days=30)
+NAME_WORDS = ('Lease', 'Agreement', 'Invoice', 'NDA', 'Offer', 'Letter', 'Contract', 'Renewal',
+              'Consent', 'Form', 'Policy', 'Addendum', 'Statement', 'Order', 'Quote', 'Release')
+FIRST_NAMES = ('Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn')
+LAST_NAMES = ('Smith', 'Garcia', 'Chen', 'Okafor', 'Müller', 'Rossi', 'Kowalski', 'Silva', 'Haddad', 'Kim')
+
+def page_image(number, kb, rng):
+    """A letter-size page with text-like strokes and a noisy (scanned) region of about ``kb`` KB"""
+    from PIL import Image, ImageDraw
+    img = Image.new('RGB', (612, 792), 'white')
+    draw = ImageDraw.Draw(img)
+    for line in range(40):
+        y = 60 + line * 17
+        draw.rectangle([50, y, 50 + rng.randint(200, 500), y + 6], fill=(60, 60, 60))
+    side = min(600, int((kb * 1024 / 3) ** 0.5))
+    if side:
+        img.paste(Image.frombytes('RGB', (side, side), rng.randbytes(side * side * 3)), (6, 6))
+    buf = BytesIO()
+    img.save(buf, format='PNG')
+    return {
+        'pageNumber': number,
+        'width': 612,
+        'height': 792,
+        'imageUrl': 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode(),
+    }
+
+class Payloads:
+    """Encoded pages/fields columns, built once per (page count, signer count)"""
+
+    def __init__(self, page_kb, rng):
+        self.pool = [page_image(n, page_kb, rng) for n in range(1, PAGE_POOL_SIZE + 1)]
+        self.cache = {}
+
+    def get(self, page_count, signers):
+        from compressed_json import encode
+        key = (page_count, signers)
+        if key not in self.cache:
+            pages = [dict(self.pool[i % PAGE_POOL_SIZE], pageNumber=i + 1) for i in range(page_count)]
+            fields = [{
+                'id': f'f{page}-{signer}-{kind}', 'type': kind, 'recipientId': f'r{signer}',
+                'pageNumber': page, 'x': 10, 'y': 10 + signer * 8, 'width': 20, 'height': 5, 'value': None,
+            } for page in range(1, page_count + 1) for signer in range(1, signers + 1) for kind in ('SIGNATURE', 'TEXT')]
+            self.cache[key] = (encode(pages), encode(fields))
+        return self.cache[key]
+
+def _ts(value):
+    """SQLAlchemy's SQLite DateTime storage format"""
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f') if value else None
+
+def _insert_sql(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+def generate(users=10000, documents=1000000, signature_requests=5000000, payload_fraction=0.02,
+             page_kb=40, mean_pages=3, seed=1, progress=print):
+    """Fill the database at DATABASE_URL (must be new); returns row counts"""
+    from compressed_json import encode
+    from database import engine, init_db
+    from models import Document, SignatureRequest
+    import search_index
+
+    rng = random.Random(seed)
+    init_db()
+    search_index.init(engine)
+    # Fixed creation order: between equally good indexes SQLite picks by it, and plans must be stable
+    secondary = sorted((ix for table in (Document.__table__, SignatureRequest.__table__) for ix in table.indexes),
+                       key=lambda ix: ix.name)
+    for index in secondary:
+        index.drop(bind=engine)
+
+    now = datetime.utcnow()
+    payloads = Payloads(page_kb, rng)
+    raw = engine.raw_connection()
+    conn = raw.driver_connection
+    conn.execute("PRAGMA synchronous=OFF")
+    started = time.perf_counter()
+    counts = {'users': 0, 'documents': 0, 'signature_requests': 0}
+
+    user_rows = [(1, 'demo@example.com', 'demo123', 'demo-token', _ts(now - timedelta(days=800)))]
+    user_rows += [(i, f'user{i}@example.com', 'password', f'token-{i}', _ts(now - timedelta(days=rng.uniform(0, 800))))
+                  for i in range(2, users + 1)]
+    conn.executemany(_insert_sql('users', ('id', 'email', 'password', 'token', 'created_at')), user_rows)
+    counts['users'] = len(user_rows)
+    raw.commit()
+
+    doc_columns = ('id', 'user_id', 'name', 'pages', 'fields', 'recipients', 'status', 'is_template',
+                   'created_at', 'updated_at', 'sent_at', 'completed_at', 'signer_count', 'viewed_count',
+                   'signed_count', 'page_count', 'version')
+    req_columns = ('id', 'document_id', 'signer_email', 'signer_name', 'access_token', 'status', '"order"',
+                   'created_at', 'signed_at', 'expires_at', 'next_action_at', 'reminders_sent')
+    fts_columns = ('rowid', 'document_id', 'owner', 'name', 'recipients', 'field_values')
+    doc_sql, req_sql = _insert_sql('documents', doc_columns), _insert_sql('signature_requests', req_columns)
+    fts_sql = _insert_sql('documents_fts', fts_columns)
+
+    # Signers per sent/completed document, so the totals land near the targets
+    signed_share = 0.83
+    mean_signers = max(1.0, signature_requests / max(1, documents * signed_share))
+    empty = encode([])
+    docs, reqs, fts = [], [], []
+    for n in range(documents):
+        user_id = 1 + int((users - 1) * rng.random() ** 2)  # Skewed: low ids own the most
+        roll = rng.random()
+        status, is_template = ('draft', True) if roll < 0.02 else ('draft', False) if roll < 0.17 else \
+            ('sent', False) if roll < 0.42 else ('completed', False)
+        page_count = max(1, min(MAX_PAGES, int(rng.expovariate(1 / mean_pages)) + 1))
+        signers = 0 if status == 'draft' else max(1, min(50, round(rng.uniform(1, 2 * mean_signers - 1))))
+        doc_id = uuid.UUID(int=rng.getrandbits(128)).hex[:16]
+        created = now - timedelta(days=rng.uniform(0, 730))
+        sent = created + timedelta(hours=rng.uniform(0.1, 48)) if signers else None
+
+        people = [(f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', f'signer{rng.randrange(users * 20)}@example.com')
+                  for _ in range(max(signers, 1))]
+        recipients = [{'id': f'r{i + 1}', 'name': name, 'email': email, 'order': i + 1}
+                      for i, (name, email) in enumerate(people)]
+        pages, fields = payloads.get(page_count, len(recipients)) if rng.random() < payload_fraction else (empty, empty)
+        name = f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {n}.pdf"
+
+        viewed = signed = 0
+        last_signed = None
+        for order, (signer_name, email) in enumerate(people[:signers], start=1):
+            expires = sent + LINK_TTL
+            if status == 'completed':
+                req_status = 'signed'
+            else:
+                req_status = rng.choice(('pending', 'viewed', 'signed'))
+                if req_status != 'signed' and expires <= now:
+                    req_status = 'expired'
+            signed_at = None
+            if req_status == 'signed':
+                signed_at = min(now, sent + timedelta(hours=rng.expovariate(1 / 30)))
+                last_signed = max(last_signed or signed_at, signed_at)
+                signed += 1
+            viewed += req_status == 'viewed'
+            pending = req_status in ('pending', 'viewed')
+            reqs.append((uuid.UUID(int=rng.getrandbits(128)).hex[:12], doc_id, email, signer_name,
+                         str(uuid.UUID(int=rng.getrandbits(128))), req_status, order, _ts(sent), _ts(signed_at),
+                         _ts(expires), _ts(expires) if pending else None, 0))
+        if status == 'sent' and signers and signed == signers:
+            status = 'completed'  # Every signer happened to sign
+        completed = last_signed if status == 'completed' else None
+
+        docs.append((doc_id, user_id, name, pages, fields, encode(recipients), status, is_template,
+                     _ts(created), _ts(completed or sent or created), _ts(sent), _ts(completed),
+                     signers, viewed, signed, page_count, 1 + signed))
+        fts.append((search_index.fts_rowid(doc_id), doc_id, search_index.owner_token(user_id), name,
+                    ' '.join(f'{p} {e}' for p, e in people), ''))
+
+        if len(docs) >= BATCH_SIZE or n == documents - 1:
+            conn.executemany(doc_sql, docs)
+            conn.executemany(req_sql, reqs)
+            conn.executemany(fts_sql, fts)
+            raw.commit()
+            counts['documents'] += len(docs)
+            counts['signature_requests'] += len(reqs)
+            docs, reqs, fts = [], [], []
+            progress(f"  {counts['documents']:>9,} documents  {counts['signature_requests']:>10,} signature requests  "
+                     f"({time.perf_counter() - started:.0f} s)")
+
+    conn.execute("PRAGMA synchronous=NORMAL")
+    raw.close()
+    progress("  building indexes...")
+    for index in secondary:
+        index.create(bind=engine)
+    engine.dispose()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--database', required=True, help='SQLite file to create (must not exist)')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--documents', type=int, default=1000000)
+    parser.add_argument('--signature-requests', type=int, default=5000000, help='Approximate total')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every volume by this factor')
+    parser.add_argument('--payload-fraction', type=float, default=0.02,
+                        help='Share of documents that store page images and fields')
+    parser.add_argument('--page-kb', type=int, default=40, help='Approximate PNG size per page')
+    parser.add_argument('--pages', type=float, default=3, help='Mean pages per document')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        sys.exit(f"{args.database} already exists")
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.abspath(args.database)}"
+    os.chdir(BACKEND_DIR)
+
+    started = time.perf_counter()
+    counts = generate(
+        users=max(2, int(args.users * args.scale)),
+        documents=max(1, int(args.documents * args.scale)),
+        signature_requests=int(args.signature_requests * args.scale),
+        payload_fraction=args.payload_fraction,
+        page_kb=args.page_kb,
+        mean_pages=args.pages,
+        seed=args.seed,
+    )
+    size = os.path.getsize(args.database) / 1024 / 1024
+    print(f"Created {args.database}: {counts['users']:,} users, {counts['documents']:,} documents, "
+          f"{counts['signature_requests']:,} signature requests, {size:,.0f} MB "
+          f"in {time.perf_counter() - started:.0f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""Endpoint micro-benchmarks on real and synthetic document fixtures
+
+Runs the hot endpoints through the Flask test client against a throwaway
+SQLite database seeded with the documents in ``backend/data/*.json`` plus
+synthetic 1/10/100-page documents. Usage (from backend/)::
+
+    python benchmarks/endpoints.py --output bench.json
+    python benchmarks/endpoints.py --baseline bench.json --tolerance 10
+
+With ``--baseline`` every case is compared on its median; the script exits
+with status 1 if any case is slower than the baseline by more than
+``--tolerance`` percent.
+"""
+import argparse
+import base64
+import contextlib
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from io import BytesIO
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYNTHETIC_PAGE_COUNTS = (1, 10, 100)
+AUTH = {'Authorization': 'Bearer demo-token'}
+
+def synthetic_page(number, width=612, height=792):
+    """A letter-size page image with some text-like strokes, as a data URL"""
+    from PIL import Image, ImageDraw
+    img = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(img)
+    for line in range(40):
+        y = 60 + line * 17
+        length = 200 + ((number * 37 + line * 53) % 300)
+        draw.rectangle([50, y, 50 + length, y + 6], fill=(60, 60, 60))
+    buf = BytesIO()
+    img.save(buf, format='PNG')
+    return {
+        'pageNumber': number,
+        'width': width,
+        'height': height,
+        'imageUrl': 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode(),
+    }
+
+def synthetic_fields(page_count, recipient_ids):
+    """One signature and one text field per page for each recipient"""
+    fields = []
+    for page in range(1, page_count + 1):
+        for rid in recipient_ids:
+            for field_type in ('SIGNATURE', 'TEXT'):
+                fields.append({
+                    'id': str(uuid.uuid4()),
+                    'type': field_type,
+                    'pageNumber': page,
+                    'x': 10, 'y': 10, 'width': 20, 'height': 5,
+                    'recipientId': rid,
+                    'value': None,
+                })
+    return fields
+
+class Fixtures:
+    """Seeds the benchmark database and hands out fresh signing tokens"""
+    def __init__(self, client):
+        from database import SessionLocal
+        from models import User
+        self.client = client
+        db = SessionLocal()
+        self.user_id = db.query(User).filter(User.email == 'demo@example.com').first().id
+        db.close()
+        self.pages = {n: [synthetic_page(i + 1) for i in range(n)] for n in SYNTHETIC_PAGE_COUNTS}
+
+    def load_data_folder(self):
+        """Insert every document JSON from backend/data under the demo user"""
+        from database import SessionLocal
+        from models import Document
+        db = SessionLocal()
+        loaded = 0
+        for path in sorted(glob.glob(os.path.join(BACKEND_DIR, 'data', '*.json'))):
+            with open(path) as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or 'id' not in data:
+                continue
+            db.add(Document(
+                id=data['id'],
+                user_id=self.user_id,
+                name=data.get('name', ''),
+                pages=data.get('pages', []),
+                fields=data.get('fields', []),
+                recipients=data.get('recipients', []),
+                status=data.get('status', 'draft'),
+                is_template=data.get('isTemplate', False),
+            ))
+            loaded += 1
+        db.commit()
+        db.close()
+        return loaded
+
+    def create_document(self, page_count, signers=1, is_template=False):
+        """Create a synthetic document and return (doc_id, recipients)"""
+        recipients = [
+            {'id': str(uuid.uuid4()), 'name': f'Signer {i}', 'email': f'signer{i}@example.com', 'color': '#3b82f6', 'order': i + 1}
+            for i in range(signers)
+        ]
+        doc_id = str(uuid.uuid4())[:12]
+        resp = self.client.post('/api/documents', headers=AUTH, json={
+            'id': doc_id,
+            'name': f'synthetic-{page_count}p.pdf',
+            'pages': self.pages[page_count],
+            'fields': synthetic_fields(page_count, [r['id'] for r in recipients]),
+            'recipients': recipients,
+            'isTemplate': is_template,
+        })
+        assert resp.status_code == 200, resp.status_code
+        return doc_id, recipients
+
+    def signing_tokens(self, page_count, signers):
+        """Send a synthetic document to ``signers`` recipients and return their tokens"""
+        doc_id, recipients = self.create_document(page_count, signers)
+        resp = self.client.post(f'/api/documents/{doc_id}/send-for-signature', headers=AUTH, json={
+            'recipients': [{'email': r['email'], 'name': r['name']} for r in recipients],
+        })
+        assert resp.status_code == 200, resp.status_code
+        return [r['accessToken'] for r in resp.get_json()['signatureRequests']]
+
+def drain_queue():
+    """Drop queued emails so memory does not grow across iterations"""
+    import task_queue
+    task_queue.discard_pending()
+
+def check_response(result):
+    """Raise AssertionError unless ``result`` is a 2xx response (non-responses pass)"""
+    status = getattr(result, 'status_code', None)
+    if status is not None and not 200 <= status < 300:
+        raise AssertionError(f"HTTP {status}: {result.get_data(as_text=True)[:200]}")
+
+def measure(func, iterations, warmup=1):
+    """Run func() repeatedly; return latency statistics in milliseconds.
+
+    Every response must be 2xx, so a failing endpoint is never timed as a success.
+    """
+    for _ in range(warmup):
+        check_response(func())
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+        check_response(result)
+        drain_queue()
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'ops_per_sec': round(1000 / statistics.fmean(samples), 2),
+    }
+
+def build_cases(fixtures, client, iterations):
+    """Return {case_name: (callable, iterations)}"""
+    import app as app_module
+    import signing_cache
+    cases = {}
+
+    cases['get_documents'] = (lambda: client.get('/api/documents', headers=AUTH), iterations)
+
+    for n in SYNTHETIC_PAGE_COUNTS:
+        # Scale iteration counts down for the big documents
+        n_iter = max(3, iterations // max(1, n // 10))
+
+        # Repeat opens are answered by signing_cache; drop the document's views
+        # before each uncached iteration so it reads the database every time
+        token = fixtures.signing_tokens(n, 1)[0]
+        doc_id = client.get(f'/api/sign/{token}').get_json()['id']
+
+        def uncached_view(token=token, doc_id=doc_id):
+            signing_cache.invalidate(doc_id)
+            return client.get(f'/api/sign/{token}')
+        cases[f'get_document_by_token[{n}p]'] = (uncached_view, n_iter)
+        cases[f'get_document_by_token_cached[{n}p]'] = (
+            lambda token=token: client.get(f'/api/sign/{token}'), n_iter
+        )
+
+        # One signer per iteration (+ warmup + 1 spare) so the document never completes.
+        # Each signer's filled-in fields are prepared outside the timed region.
+        pages = fixtures.pages[n]
+        submissions = []
+        for token in fixtures.signing_tokens(n, n_iter + 2):
+            doc = client.get(f'/api/sign/{token}').get_json()
+            fields = [dict(f, value='data:image/png;base64,iVBORw0KGgo=') for f in doc.get('filteredFields', [])]
+            submissions.append((token, fields))
+        submissions = iter(submissions)
+
+        def submit(submissions=submissions, pages=pages):
+            token, fields = next(submissions)
+            return client.post(f'/api/sign/{token}/submit', json={'fields': fields, 'pages': pages})
+        cases[f'submit_signature[{n}p]'] = (submit, n_iter)
+
+        template_id, _ = fixtures.create_document(n, 1, is_template=True)
+        blast = [{'name': f'Recipient {i}', 'email': f'r{i}@example.com'} for i in range(10)]
+        cases[f'send_template_to_recipients[{n}p,10r]'] = (
+            lambda template_id=template_id, blast=blast: client.post(
+                f'/api/templates/{template_id}/send', headers=AUTH, json={'recipients': blast}
+            ),
+            n_iter,
+        )
+
+        cases[f'generate_pdf_from_pages[{n}p]'] = (
+            lambda pages=pages: app_module.generate_pdf_from_pages(pages), n_iter
+        )
+
+    return cases
+
+def compare(results, baseline, tolerance):
+    """Annotate results with deltas against a baseline report; return regressions"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        delta = (stats['median_ms'] - base['median_ms']) / base['median_ms'] * 100
+        stats['baseline_median_ms'] = base['median_ms']
+        stats['delta_pct'] = round(delta, 1)
+        if delta > tolerance:
+            regressions.append(name)
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--filter', help='Only run cases whose name contains this string')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Compare against a previous JSON report')
+    parser.add_argument('--tolerance', type=float, default=10.0, help='Allowed median regression in percent')
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    os.environ['TASK_QUEUE_BACKEND'] = 'memory'
+    # Benchmark the handlers, not the send rate limits
+    os.environ.setdefault('SEND_RATE_PER_MINUTE', '1000000')
+    os.environ.setdefault('SEND_BURST', '1000000')
+    os.environ.setdefault('TASK_QUEUE_HIGH_WATER', '1000000')
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    # The app logs queue activity with print(); keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        import app as app_module
+        flask_app = app_module.create_app(start_queue=False)
+        client = flask_app.test_client()
+
+        fixtures = Fixtures(client)
+        loaded = fixtures.load_data_folder()
+        cases = build_cases(fixtures, client, args.iterations)
+
+        results = {}
+        for name, (func, iterations) in cases.items():
+            if args.filter and args.filter not in name:
+                continue
+            try:
+                results[name] = measure(func, iterations)
+            except AssertionError as e:
+                sys.exit(f"{name}: {e}")
+            print(f"  {name:45s} median {results[name]['median_ms']:9.2f} ms", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'fixture_documents': loaded,
+        },
+        'results': results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report['regressions'] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    tmp.cleanup()
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Storage size and read/write cost of plain vs compressed JSON columns
+
+Writes the same synthetic documents into two throwaway SQLite databases, one
+with the plain ``JSON`` column type and one with ``CompressedJSON``. It then
+reports the file size, insert time, full-row read time, and the time to
+list rows without touching the payload columns. Usage (from backend/)::
+
+    python benchmarks/json_columns.py --documents 200 --pages 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import JSON, Column, MetaData, String, Table, create_engine, select
+from compressed_json import CompressedJSON
+from endpoints import synthetic_fields, synthetic_page
+
+def build_table(column_type):
+    metadata = MetaData()
+    table = Table(
+        'documents', metadata,
+        Column('id', String, primary_key=True),
+        Column('status', String),
+        Column('pages', column_type),
+        Column('fields', column_type),
+        Column('recipients', column_type),
+    )
+    return metadata, table
+
+def run(column_type, path, rows):
+    metadata, table = build_table(column_type)
+    engine = create_engine(f'sqlite:///{path}')
+    metadata.create_all(engine)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(table.insert(), rows)
+    insert_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(select(table)).all()
+    read_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(select(table.c.id, table.c.status)).all()
+    list_s = time.perf_counter() - started
+
+    engine.dispose()
+    return {
+        'file_bytes': os.path.getsize(path),
+        'insert_ms': round(insert_s * 1000, 2),
+        'read_all_ms': round(read_s * 1000, 2),
+        'list_ms': round(list_s * 1000, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=200)
+    parser.add_argument('--pages', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = [synthetic_page(n) for n in range(1, args.pages + 1)]
+    recipient_ids = [str(uuid.uuid4()) for _ in range(2)]
+    recipients = [{'id': rid, 'name': f'Signer {i}', 'email': f'signer{i}@example.com'}
+                  for i, rid in enumerate(recipient_ids)]
+    rows = [{
+        'id': str(uuid.uuid4()),
+        'status': 'SENT',
+        'pages': pages,
+        'fields': synthetic_fields(args.pages, recipient_ids),
+        'recipients': recipients,
+    } for _ in range(args.documents)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = {
+            'documents': args.documents,
+            'pages_per_document': args.pages,
+            'json': run(JSON, os.path.join(tmp, 'plain.db'), rows),
+            'compressed_json': run(CompressedJSON, os.path.join(tmp, 'compressed.db'), rows),
+        }
+    report['size_ratio'] = round(report['compressed_json']['file_bytes'] / report['json']['file_bytes'], 3)
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
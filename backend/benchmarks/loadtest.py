@@ -0,0 +1,353 @@
+"""End-to-end load test with a local SMTP sink and an SLO report
+
+Drives a mixed workload against a running backend over HTTP: signers
+opening /api/sign/<token>, senders calling send-for-signature and template
+blasts, and dashboards listing documents. Outgoing email goes to an SMTP
+sink started by this script, which measures queue lag: the time from the
+send request to the signing-link email arriving.
+
+Spawn a production-mode stack (Gunicorn + worker.py) on a throwaway
+database, pointed at the sink::
+
+    python benchmarks/loadtest.py --spawn --users 32 --duration 60
+
+Or target a server you started yourself. It must use SMTP_SERVER=127.0.0.1,
+SMTP_PORT=<--smtp-port> and SMTP_USE_TLS=0::
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --smtp-port 2525
+"""
+import argparse
+import json
+import os
+import random
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from endpoints import synthetic_page, synthetic_fields  # noqa: E402
+
+# Operation mix (relative weights)
+WORKLOAD = {
+    'open_signing_link': 70,
+    'list_documents': 10,
+    'send_for_signature': 15,
+    'template_blast': 5,
+}
+
+# ============ SMTP SINK ============
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server that accepts everything and records arrival times"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port):
+        super().__init__(('127.0.0.1', port), _SmtpHandler)
+        self.lock = threading.Lock()
+        self.arrivals = {}  # recipient -> first arrival time
+        self.messages = 0
+
+    def record(self, recipients):
+        now = time.time()
+        with self.lock:
+            self.messages += 1
+            for rcpt in recipients:
+                self.arrivals.setdefault(rcpt.lower(), now)
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        self.reply('220 loadtest sink ready')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 loadtest')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip().strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                self.server.record(recipients)
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:  # RSET, NOOP, ...
+                self.reply('250 OK')
+
+# ============ HTTP CLIENT ============
+
+class Client:
+    """Tiny JSON-over-HTTP client that records per-operation latency"""
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, op, method, path, body=None, token=None, record=True):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        status, payload = None, None
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                status = resp.status
+                payload = json.loads(resp.read() or b'null')
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = 0
+        elapsed = time.perf_counter() - started
+        if record:
+            with self.lock:
+                self.latencies[op].append(elapsed)
+                if not 200 <= status < 300:
+                    self.errors[op] += 1
+        return status, payload
+
+# ============ WORKLOAD ============
+
+class Workload:
+    """Shared state for virtual users: senders, documents, tokens, expected emails"""
+    def __init__(self, client, senders, pages_per_doc, blast_size):
+        self.client = client
+        self.blast_size = blast_size
+        self.pages = [synthetic_page(i + 1) for i in range(pages_per_doc)]
+        self.lock = threading.Lock()
+        self.tokens = []
+        self.expected = {}  # recipient email -> time the send request was issued
+        self.senders = [self._register() for _ in range(senders)]
+        self.templates = {s: self._create_doc(s, is_template=True) for s in self.senders}
+
+    def _register(self):
+        email = f'sender-{uuid.uuid4().hex[:8]}@loadtest.local'
+        status, user = self.client.call('setup', 'POST', '/api/register',
+                                        {'email': email, 'password': 'x'}, record=False)
+        if status != 200:
+            raise SystemExit(f'Could not register load-test sender (HTTP {status})')
+        return user['token']
+
+    def _create_doc(self, sender, is_template=False):
+        recipient = {'id': str(uuid.uuid4()), 'name': 'Load Signer', 'email': 'signer@loadtest.local', 'color': '#3b82f6', 'order': 1}
+        doc_id = uuid.uuid4().hex[:12]
+        self.client.call('setup', 'POST', '/api/documents', {
+            'id': doc_id,
+            'name': 'loadtest.pdf',
+            'pages': self.pages,
+            'fields': synthetic_fields(len(self.pages), [recipient['id']]),
+            'recipients': [recipient],
+            'isTemplate': is_template,
+        }, token=sender, record=False)
+        return doc_id
+
+    def _recipients(self, count):
+        now = time.time()
+        recipients = [{'name': 'Load Signer', 'email': f'rcpt-{uuid.uuid4().hex[:10]}@loadtest.local'} for _ in range(count)]
+        with self.lock:
+            for r in recipients:
+                self.expected[r['email']] = now
+        return recipients
+
+    def send_for_signature(self, record=True):
+        sender = random.choice(self.senders)
+        doc_id = self._create_doc(sender)
+        status, payload = self.client.call('send_for_signature', 'POST', f'/api/documents/{doc_id}/send-for-signature',
+                                           {'recipients': self._recipients(1)}, token=sender, record=record)
+        if status == 200 and payload:
+            with self.lock:
+                self.tokens.extend(r['accessToken'] for r in payload.get('signatureRequests', []))
+
+    def template_blast(self):
+        sender = random.choice(self.senders)
+        self.client.call('template_blast', 'POST', f'/api/templates/{self.templates[sender]}/send',
+                         {'recipients': self._recipients(self.blast_size)}, token=sender)
+
+    def open_signing_link(self):
+        with self.lock:
+            token = random.choice(self.tokens) if self.tokens else None
+        if token:
+            self.client.call('open_signing_link', 'GET', f'/api/sign/{token}')
+
+    def list_documents(self):
+        self.client.call('list_documents', 'GET', '/api/documents', token=random.choice(self.senders))
+
+def virtual_user(workload, deadline):
+    ops = list(WORKLOAD)
+    weights = [WORKLOAD[op] for op in ops]
+    while time.time() < deadline:
+        getattr(workload, random.choices(ops, weights)[0])()
+
+# ============ REPORTING ============
+
+def percentiles(samples_seconds):
+    if not samples_seconds:
+        return {'count': 0}
+    s = sorted(samples_seconds)
+    pick = lambda q: round(s[min(len(s) - 1, int(len(s) * q))] * 1000, 2)
+    return {'count': len(s), 'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99), 'max_ms': round(s[-1] * 1000, 2)}
+
+def build_report(client, workload, sink, elapsed, args):
+    operations = {}
+    total = total_errors = 0
+    for op, samples in sorted(client.latencies.items()):
+        errors = client.errors.get(op, 0)
+        operations[op] = dict(percentiles(samples), errors=errors,
+                              error_rate=round(errors / len(samples), 4),
+                              throughput_rps=round(len(samples) / elapsed, 2))
+        total += len(samples)
+        total_errors += errors
+
+    with sink.lock:
+        arrivals = dict(sink.arrivals)
+    lags = [arrivals[e] - sent for e, sent in workload.expected.items() if e in arrivals]
+    queue_lag = dict(percentiles(lags), expected=len(workload.expected),
+                     delivered=len(lags), undelivered=len(workload.expected) - len(lags))
+
+    all_latencies = [x for samples in client.latencies.values() for x in samples]
+    overall = dict(percentiles(all_latencies), requests=total, errors=total_errors,
+                   error_rate=round(total_errors / total, 4) if total else 0,
+                   throughput_rps=round(total / elapsed, 2))
+
+    slo = {
+        'p95_ms': {'target': args.slo_p95_ms, 'actual': overall.get('p95_ms')},
+        'error_rate': {'target': args.slo_error_rate, 'actual': overall['error_rate']},
+        'queue_lag_p95_ms': {'target': args.slo_queue_lag_p95_ms, 'actual': queue_lag.get('p95_ms')},
+    }
+    for check in slo.values():
+        check['pass'] = check['actual'] is not None and check['actual'] <= check['target']
+
+    return {
+        'config': {'users': args.users, 'duration_s': args.duration, 'pages_per_doc': args.pages,
+                   'blast_size': args.blast_size, 'workload': WORKLOAD, 'url': args.url},
+        'elapsed_s': round(elapsed, 2),
+        'overall': overall,
+        'operations': operations,
+        'queue_lag': queue_lag,
+        'smtp_messages': sink.messages,
+        'slo': slo,
+        'slo_pass': all(c['pass'] for c in slo.values()),
+    }
+
+# ============ SERVER PROCESSES ============
+
+def spawn_stack(args, tmp):
+    """Start Gunicorn and the queue worker against a throwaway database"""
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'loadtest.db')}",
+        'TASK_QUEUE_BACKEND': 'database',
+        'TASK_QUEUE_POLL_INTERVAL': '0.1',
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': str(args.smtp_port),
+        'SMTP_USE_TLS': '0',
+    })
+    # Measure raw capacity unless backpressure limits are set explicitly
+    env.setdefault('SEND_RATE_PER_MINUTE', '1000000')
+    env.setdefault('SEND_BURST', '1000000')
+    env.setdefault('TASK_QUEUE_HIGH_WATER', '1000000')
+    port = args.url.rsplit(':', 1)[-1].strip('/')
+    log = open(os.path.join(tmp, 'server.log'), 'w')
+    procs = [
+        subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+                         cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT),
+        subprocess.Popen([sys.executable, 'worker.py'], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT),
+    ]
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(args.url + '/metrics', timeout=1)
+            return procs
+        except Exception:
+            time.sleep(0.2)
+    for p in procs:
+        p.terminate()
+    raise SystemExit(f'Server did not come up; see {log.name}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--spawn', action='store_true', help='Start Gunicorn + worker.py on a temp database')
+    parser.add_argument('--smtp-port', type=int, default=2525)
+    parser.add_argument('--users', type=int, default=16, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load')
+    parser.add_argument('--senders', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=3, help='Pages per synthetic document')
+    parser.add_argument('--blast-size', type=int, default=20, help='Recipients per template blast')
+    parser.add_argument('--drain-timeout', type=float, default=60, help='Seconds to wait for queued email after the run')
+    parser.add_argument('--slo-p95-ms', type=float, default=500)
+    parser.add_argument('--slo-error-rate', type=float, default=0.01)
+    parser.add_argument('--slo-queue-lag-p95-ms', type=float, default=30000)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.smtp_port)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    tmp = tempfile.mkdtemp(prefix='loadtest-')
+    procs = spawn_stack(args, tmp) if args.spawn else []
+    try:
+        client = Client(args.url)
+        workload = Workload(client, args.senders, args.pages, args.blast_size)
+        for _ in range(args.senders):
+            workload.send_for_signature(record=False)  # seed signing tokens
+
+        print(f'Running {args.users} users for {args.duration:.0f}s against {args.url}...', file=sys.stderr)
+        started = time.time()
+        deadline = started + args.duration
+        threads = [threading.Thread(target=virtual_user, args=(workload, deadline)) for _ in range(args.users)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - started
+
+        # Let the email worker catch up before measuring delivery
+        drain_deadline = time.time() + args.drain_timeout
+        while time.time() < drain_deadline:
+            with sink.lock:
+                if all(e in sink.arrivals for e in workload.expected):
+                    break
+            time.sleep(0.5)
+
+        report = build_report(client, workload, sink, elapsed, args)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait(timeout=10)
+        sink.shutdown()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    sys.exit(0 if report['slo_pass'] else 1)
+
+if __name__ == '__main__':
+    main()
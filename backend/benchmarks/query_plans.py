@@ -0,0 +1,286 @@
+"""Query-plan regression checks against a production-sized database
+
+Drives the app's endpoints (and the background jobs' queries) through the
+Flask test client against a synthetic database from dataset.py. Every SQL
+statement they issue is recorded, and ``EXPLAIN QUERY PLAN`` is run for
+each distinct statement with the parameters it was first executed with.
+The check fails (exit status 1) when:
+
+- a hot query stops searching its table through an index that leads with
+  its key column (HOT_QUERIES below; for documents by owner that is
+  ``idx_user_id_status`` and its siblings), or
+- any recorded statement falls back to a full scan of a large table.
+
+Usage (from backend/)::
+
+    python benchmarks/query_plans.py                                   # generates a 1% dataset in a temp dir
+    python benchmarks/query_plans.py --database /tmp/synthetic.db --output plans.json
+    python benchmarks/query_plans.py --database /tmp/synthetic.db --baseline plans.json
+
+``--baseline`` also lists statements whose plan changed since an earlier
+report. The run signs and sends a few documents, so point ``--database``
+at a throwaway copy.
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+AUTH = {'Authorization': 'Bearer demo-token'}
+
+# (name, pattern matched against the statement, table, key column). The plan
+# must use an index of ``table`` whose first column is the key column.
+HOT_QUERIES = [
+    ('documents by owner', re.compile(r'FROM documents\b.*\bWHERE\b.*\bdocuments\.user_id = \?'),
+     'documents', 'user_id'),
+    ('signature requests by document', re.compile(
+        r'FROM signature_requests\b.*\bWHERE\b.*\bsignature_requests\.document_id (=|IN)'),
+     'signature_requests', 'document_id'),
+    ('signature request by token', re.compile(r'\bsignature_requests\.access_token (=|IN)'),
+     'signature_requests', 'access_token'),
+    ('user by token', re.compile(r'FROM users\b.*\bWHERE users\.token = \?'), 'users', 'token'),
+    ('due reminders', re.compile(r'\bsignature_requests\.next_action_at <= \?'),
+     'signature_requests', 'next_action_at'),
+]
+# Tables that grow without bound, too large to ever scan from a request or a periodic job
+LARGE_TABLES = ('documents', 'signature_requests', 'users', 'documents_fts', 'email_jobs',
+                'email_deliveries', 'event_log', 'signature_images')
+_SCAN = re.compile(r'^SCAN (%s)(?= |$)(.*)$' % '|'.join(LARGE_TABLES))
+# FTS5 plan strings: M = MATCH, = = rowid lookup; without either every row is read
+_VIRTUAL_INDEX = re.compile(r'^ VIRTUAL TABLE INDEX \d+:(\S*)')
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+class Recorder:
+    """Collects the SQL statements issued while a case runs"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.case = None
+        self.statements = {}  # (case, statement) -> first parameters
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.case is None or not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        self.statements.setdefault((self.case, statement), parameters)
+
+    @contextlib.contextmanager
+    def recording(self, case):
+        self.case = case
+        try:
+            yield
+        finally:
+            self.case = None
+
+def explain(engine, statement, parameters):
+    """The plan's detail lines, indented by depth"""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+def leading_indexes(table, column):
+    """Names of the model's indexes on ``table`` whose first column is ``column``"""
+    from models import Base
+    return sorted(index.name for index in Base.metadata.tables[table].indexes
+                  if index.columns and list(index.columns)[0].name == column)
+
+def is_full_scan(line):
+    """True for a plan line that reads a whole large table (regular or FTS)"""
+    scan = _SCAN.match(line.strip())
+    if not scan:
+        return False
+    rest = scan.group(2)
+    virtual = _VIRTUAL_INDEX.match(rest)
+    if virtual:
+        return not any(op in virtual.group(1) for op in 'M=')
+    return not re.match(r'^ USING (COVERING )?INDEX', rest)
+
+def check(statement, plan):
+    """Rule violations of one statement's plan"""
+    from profiling import statement_shape
+    shape = statement_shape(statement)
+    text = '\n'.join(plan)
+    problems = []
+    for name, pattern, table, column in HOT_QUERIES:
+        indexes = leading_indexes(table, column)
+        if pattern.search(shape) and not any(re.search(rf'\bINDEX {index}\b', text) for index in indexes):
+            problems.append(f"{name}: expected {' or '.join(indexes)}")
+    for line in plan:
+        if is_full_scan(line):
+            problems.append(f"full scan: {line.strip()}")
+    return problems
+
+def fixtures(engine):
+    """Ids and tokens of the demo user's data for the cases"""
+    from sqlalchemy import text
+    with engine.connect() as conn:
+        one = lambda sql: conn.execute(text(sql)).scalar()
+        return {
+            'doc': one("SELECT id FROM documents WHERE user_id = 1 AND length(pages) > 16 LIMIT 1")
+                   or one("SELECT id FROM documents WHERE user_id = 1 LIMIT 1"),
+            'draft': one("SELECT id FROM documents WHERE user_id = 1 AND status = 'draft' AND NOT is_template LIMIT 1"),
+            'template': one("SELECT id FROM documents WHERE user_id = 1 AND is_template LIMIT 1"),
+            'ids': [r[0] for r in conn.execute(text("SELECT id FROM documents WHERE user_id = 1 LIMIT 200"))],
+            'tokens': [r[0] for r in conn.execute(text(
+                "SELECT r.access_token FROM signature_requests r JOIN documents d ON d.id = r.document_id "
+                "WHERE d.user_id = 1 AND r.status IN ('pending', 'viewed') LIMIT 50"))],
+        }
+
+def build_cases(client, data):
+    """[(name, callable returning a response or None)]"""
+    import archive
+    import bulk_export
+    import reminders
+    from database import SessionLocal
+
+    doc, tokens = data['doc'], data['tokens']
+    recipients = [{'name': 'Plan Check', 'email': 'plan-check@example.com'}]
+    today = datetime.utcnow().date()
+
+    def in_session(func):
+        def run():
+            db = SessionLocal()
+            try:
+                func(db)
+            finally:
+                db.close()
+        return run
+
+    cases = [
+        ('GET /api/documents?summary=1', lambda: client.get('/api/documents?summary=1', headers=AUTH)),
+        ('GET /api/documents', lambda: client.get('/api/documents', headers=AUTH)),
+        ('GET /api/documents/stats', lambda: client.get('/api/documents/stats', headers=AUTH)),
+        ('GET /api/documents/search', lambda: client.get('/api/documents/search?q=lease', headers=AUTH)),
+        ('GET /api/documents/<id>', lambda: client.get(f'/api/documents/{doc}', headers=AUTH)),
+        ('GET /api/documents/<id>/pages/1/thumbnail',
+         lambda: client.get(f'/api/documents/{doc}/pages/1/thumbnail', headers=AUTH)),
+        ('GET /api/documents/<id>/signing-progress',
+         lambda: client.get(f'/api/documents/{doc}/signing-progress', headers=AUTH)),
+        ('GET /api/email-status/<id>', lambda: client.get(f'/api/email-status/{doc}', headers=AUTH)),
+        ('POST /api/documents/status', lambda: client.post(
+            '/api/documents/status', headers=AUTH, json={'ids': data['ids'], 'tokens': tokens[:20]})),
+        ('GET /api/documents/export', lambda: client.get(
+            f'/api/documents/export?from={today}&to={today}', headers=AUTH)),
+        ('GET /api/sign/<token>', lambda: client.get(f'/api/sign/{tokens[0]}')),
+        ('POST /api/sign/<token>/submit', lambda: client.post(f'/api/sign/{tokens[1]}/submit', json={'fields': []})),
+        ('PUT /api/documents/<id>', lambda: client.put(
+            f"/api/documents/{data['draft']}", headers=AUTH, json={'name': 'Plan check.pdf'})),
+        ('POST /api/documents/<id>/send-for-signature', lambda: client.post(
+            f"/api/documents/{data['draft']}/send-for-signature", headers=AUTH, json={'recipients': recipients})),
+        ('POST /api/templates/<id>/send', lambda: client.post(
+            f"/api/templates/{data['template']}/send", headers=AUTH, json={'recipients': recipients})),
+        ('job: reminders', lambda: (reminders.run_once(), reminders.next_due_at())),
+        ('job: archive candidates', in_session(lambda db: db.query(archive.Document.id).filter(
+            archive.Document.status == 'completed', archive.Document.archived_at.is_(None),
+            archive.Document.completed_at < datetime.utcnow() - timedelta(days=30),
+        ).order_by(archive.Document.completed_at).limit(archive.BATCH_SIZE).all())),
+        ('job: bulk export selection', in_session(lambda db: bulk_export.select_document_ids(
+            db, 1, datetime.utcnow() - timedelta(days=30), datetime.utcnow()))),
+    ]
+    return [(name, func) for name, func in cases
+            if not (('draft' in name or '<id>/send' in name) and not data['draft'])]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='Synthetic SQLite database (default: generate one)')
+    parser.add_argument('--scale', type=float, default=0.01, help='dataset.py volumes when generating')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Report the plans that changed since this JSON report')
+    args = parser.parse_args()
+
+    tmp = None
+    if args.database:
+        path = os.path.abspath(args.database)
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, 'synthetic.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['TASK_QUEUE_BACKEND'] = 'memory'
+    os.environ.setdefault('SEND_BURST', '1000000')
+    os.environ.setdefault('TASK_QUEUE_HIGH_WATER', '1000000')
+    os.chdir(BACKEND_DIR)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        if tmp is not None:
+            import dataset
+            print(f"Generating a {args.scale:g}x synthetic dataset...")
+            dataset.generate(users=max(2, int(10000 * args.scale)), documents=int(1000000 * args.scale),
+                             signature_requests=int(5000000 * args.scale), page_kb=8)
+        import app as app_module
+        client = app_module.create_app(start_queue=False).test_client()
+        recorder = Recorder(app_module.engine)
+        data = fixtures(app_module.engine)
+
+        cases = {}
+        for name, func in build_cases(client, data):
+            started = time.perf_counter()
+            with recorder.recording(name):
+                response = func()
+            status = getattr(response, 'status_code', None)
+            if status is not None and status >= 500:
+                print(f"⚠️  {name} returned {status}")
+            cases[name] = {'ms': round((time.perf_counter() - started) * 1000, 1), 'status': status, 'queries': []}
+
+    failures = 0
+    for (case, statement), parameters in recorder.statements.items():
+        plan = explain(app_module.engine, statement, parameters)
+        problems = check(statement, plan)
+        failures += bool(problems)
+        cases[case]['queries'].append({'statement': statement, 'plan': plan, 'problems': problems})
+
+    changed = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            before = {(case, q['statement']): q['plan'] for case, result in json.load(f)['cases'].items()
+                      for q in result['queries']}
+        changed = [{'case': case, 'statement': q['statement'], 'before': before[(case, q['statement'])],
+                    'after': q['plan']}
+                   for case, result in cases.items() for q in result['queries']
+                   if (case, q['statement']) in before and before[(case, q['statement'])] != q['plan']]
+
+    for case, result in cases.items():
+        bad = [q for q in result['queries'] if q['problems']]
+        mark = '❌' if bad else '✅'
+        print(f"{mark} {case:45s} {len(result['queries']):3d} statements  {result['ms']:9.1f} ms", file=sys.stderr)
+        for q in bad:
+            print(f"     {' '.join(q['statement'].split())[:160]}", file=sys.stderr)
+            for line in q['plan']:
+                print(f"       {line}", file=sys.stderr)
+            for problem in q['problems']:
+                print(f"     -> {problem}", file=sys.stderr)
+    for change in changed:
+        print(f"🔀 plan changed in {change['case']}: {' '.join(change['statement'].split())[:160]}", file=sys.stderr)
+
+    report = {
+        'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'database': path},
+        'failures': failures,
+        'changed': changed,
+        'cases': cases,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    print(f"{failures} statements with plan problems, {len(changed)} plans changed", file=sys.stderr)
+    if tmp is not None:
+        tmp.cleanup()
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Cold-start measurement: module import, app factory and first request
+
+Each run happens in a fresh interpreter against an empty SQLite file, so the
+numbers match what a freshly deployed worker pays. Usage (from backend/)::
+
+    python benchmarks/startup.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in the child interpreter; prints one JSON line of timings
+_PROBE = r"""
+import json, time, sys
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+flask_app = app_module.create_app(start_queue=False)
+t2 = time.perf_counter()
+client = flask_app.test_client()
+headers = {'Authorization': 'Bearer demo-token'}
+resp = client.get('/api/documents', headers=headers)
+t3 = time.perf_counter()
+client.get('/api/documents', headers=headers)
+t4 = time.perf_counter()
+heavy = sorted(m for m in ('PIL.Image', 'email_service') if m in sys.modules)
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'warm_request_ms': (t4 - t3) * 1000,
+    'status': resp.status_code,
+    'heavy_modules_loaded': heavy,
+}))
+"""
+
+def run_once():
+    """Measure one cold start in a subprocess"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        env['TASK_QUEUE_BACKEND'] = 'memory'
+        out = subprocess.run(
+            [sys.executable, '-c', _PROBE],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        # The app prints progress lines; the probe's JSON is the last one
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    keys = ['import_ms', 'create_app_ms', 'first_request_ms', 'warm_request_ms']
+    report = {
+        'runs': args.runs,
+        'median': {k: round(statistics.median(s[k] for s in samples), 2) for k in keys},
+        'max': {k: round(max(s[k] for s in samples), 2) for k in keys},
+        'heavy_modules_loaded': samples[-1]['heavy_modules_loaded'],
+    }
+    report['median']['total_ms'] = round(
+        report['median']['import_ms'] + report['median']['create_app_ms'] + report['median']['first_request_ms'], 2
+    )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+if __name__ == '__main__':
+    main()
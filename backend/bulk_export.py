@@ -0,0 +1,204 @@
+"""Bulk export of completed documents as a streamed ZIP
+
+Selects completed documents by owner and completion date. Their PDFs are
+produced by a thread pool: archived documents use the PDF stored at
+archival time, and the rest are rendered page by page with pdf_writer. Zlib
+and Pillow release the GIL, so the threads really run in parallel. PDFs
+are written into the ZIP in the order the documents were completed. A
+``manifest.json`` at the end lists each document's signers, timestamps and
+the SHA-256 of its PDF.
+
+The ZIP is produced chunk by chunk. At most 2 x EXPORT_WORKERS PDFs are in
+memory at any time, so memory stays flat whatever the number of documents.
+Used by ``GET /api/documents/export`` and from the command line::
+
+    python bulk_export.py --user owner@example.com --from 2024-01-01 --to 2024-12-31 -o signed.zip
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy.orm import joinedload, selectinload, undefer
+from werkzeug.utils import secure_filename
+from database import SessionLocal, init_db
+from models import Document, User
+import cold_store
+import metrics
+import pdf_writer
+
+WORKERS = int(os.getenv('EXPORT_WORKERS', '4'))
+MANIFEST_NAME = 'manifest.json'
+
+def select_document_ids(db, user_id=None, date_from=None, date_to=None):
+    """Ids of completed documents, oldest completion first"""
+    q = db.query(Document.id).filter(Document.status == 'completed')
+    if user_id is not None:
+        q = q.filter(Document.user_id == user_id)
+    if date_from is not None:
+        q = q.filter(Document.completed_at >= date_from)
+    if date_to is not None:
+        q = q.filter(Document.completed_at < date_to)
+    return [doc_id for (doc_id,) in q.order_by(Document.completed_at, Document.id)]
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+def export_one(doc_id):
+    """(manifest entry, PDF bytes or None) of one document; runs in a pool thread"""
+    db = SessionLocal()
+    try:
+        doc = db.query(Document) \
+            .options(undefer(Document.pages), joinedload(Document.user), selectinload(Document.signature_requests)) \
+            .filter(Document.id == doc_id).first()
+        if doc is None:
+            return {'documentId': doc_id, 'error': 'Document was deleted during the export'}, None
+
+        stem = secure_filename(os.path.splitext(doc.name or '')[0]) or 'document'
+        entry = {
+            'documentId': doc.id,
+            'name': doc.name,
+            'file': f"{stem}_{doc.id}.pdf",
+            'owner': doc.user.email if doc.user else None,
+            'createdAt': _isoformat(doc.created_at),
+            'sentAt': _isoformat(doc.sent_at),
+            'completedAt': _isoformat(doc.completed_at),
+            'pageCount': doc.page_count,
+            'archived': doc.archived_at is not None,
+            'signers': [{
+                'email': r.signer_email,
+                'name': r.signer_name,
+                'order': r.order,
+                'status': r.status,
+                'signedAt': _isoformat(r.signed_at),
+            } for r in sorted(doc.signature_requests, key=lambda r: r.order)],
+        }
+        try:
+            pdf = _pdf_bytes(doc)
+        except Exception as e:
+            entry['error'] = f'PDF generation failed: {e}'
+            return entry, None
+        entry['sha256'] = hashlib.sha256(pdf).hexdigest()
+        entry['bytes'] = len(pdf)
+        return entry, pdf
+    finally:
+        db.close()
+
+def _pdf_bytes(doc):
+    if doc.archived_at is not None:
+        try:
+            with open(cold_store.pdf_path(doc.id), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass  # Rendered from the archived payload below
+    out = BytesIO()
+    pdf_writer.write_pdf(doc.content_pages, out)
+    return out.getvalue()
+
+def _results(doc_ids, workers):
+    """export_one() results in order, with a bounded window of work in flight"""
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+    pending = deque()
+    ids = iter(doc_ids)
+    try:
+        for doc_id in ids:
+            pending.append(pool.submit(export_one, doc_id))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            result = pending.popleft().result()
+            doc_id = next(ids, None)
+            if doc_id is not None:
+                pending.append(pool.submit(export_one, doc_id))
+            yield result
+    finally:
+        # Client gone or export done: drop queued work rather than finish it
+        pool.shutdown(wait=False, cancel_futures=True)
+
+class _Sink:
+    """Write-only, non-seekable file for ZipFile; the generator drains it"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+def stream_zip(doc_ids, workers=WORKERS, filters=None):
+    """Yield the ZIP archive of ``doc_ids`` chunk by chunk"""
+    sink = _Sink()
+    manifest = []
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for entry, pdf in _results(doc_ids, workers):
+            manifest.append(entry)
+            if pdf is not None:
+                # PDF streams are already deflated; storing avoids a second pass
+                info = zipfile.ZipInfo(entry['file'], _zip_time(entry['completedAt']))
+                zf.writestr(info, pdf)
+                metrics.inc('export_documents_total')
+            yield from sink.drain()
+        zf.writestr(MANIFEST_NAME, json.dumps({
+            'generatedAt': datetime.utcnow().isoformat(),
+            'filters': filters or {},
+            'documentCount': len(manifest),
+            'failed': sum(1 for entry in manifest if 'error' in entry),
+            'documents': manifest,
+        }, indent=2))
+    yield from sink.drain()
+
+def _zip_time(timestamp):
+    when = datetime.fromisoformat(timestamp) if timestamp else datetime.utcnow()
+    return max(when, datetime(1980, 1, 1)).timetuple()[:6]
+
+def parse_date(value):
+    """ISO date or datetime; None for empty. Raises ValueError otherwise."""
+    return datetime.fromisoformat(value) if value else None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--user', help='Owner email (default: every user)')
+    parser.add_argument('--from', dest='date_from', type=parse_date, help='Completed on or after (ISO date)')
+    parser.add_argument('--to', dest='date_to', type=parse_date, help='Completed before (ISO date)')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('-o', '--output', required=True, help='ZIP file to write')
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user_id = None
+        if args.user:
+            user_id = db.query(User.id).filter(User.email == args.user).scalar()
+            if user_id is None:
+                sys.exit(f"No user {args.user}")
+        doc_ids = select_document_ids(db, user_id, args.date_from, args.date_to)
+    finally:
+        db.close()
+
+    filters = {'user': args.user, 'from': _isoformat(args.date_from), 'to': _isoformat(args.date_to)}
+    with open(args.output, 'wb') as f:
+        for chunk in stream_zip(doc_ids, args.workers, filters):
+            f.write(chunk)
+    print(f"📦 Exported {len(doc_ids)} documents to {args.output}")
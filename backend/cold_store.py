@@ -0,0 +1,87 @@
+"""On-disk cold store for archived document payloads
+
+Each archived document has two files under ARCHIVE_DIR, named by a hash of
+the document id and fanned out over 256 subdirectories:
+
+- ``<hash>.json.xz`` holds the page images and fields moved out of the
+  ``documents`` table, as LZMA-compressed JSON. LZMA is slower than the zlib
+  used for hot columns but much smaller, a good trade for data that is
+  rarely read.
+- ``<hash>.pdf`` holds the final PDF, rendered once at archival time so
+  downloads of archived documents never touch the payload.
+
+Files are written to a temp file and renamed into place, so readers never
+see a partial file.
+"""
+import hashlib
+import json
+import lzma
+import os
+import tempfile
+import metrics
+import pdf_writer
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'data/archive')
+PAYLOAD_SUFFIX = '.json.xz'
+PDF_SUFFIX = '.pdf'
+
+def file_key(doc_id):
+    return hashlib.sha256(doc_id.encode()).hexdigest()[:40]
+
+def _path(doc_id, suffix):
+    key = file_key(doc_id)
+    return os.path.join(ARCHIVE_DIR, key[:2], key + suffix)
+
+def payload_path(doc_id):
+    return _path(doc_id, PAYLOAD_SUFFIX)
+
+def pdf_path(doc_id):
+    return _path(doc_id, PDF_SUFFIX)
+
+def _write_atomic(path, write):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def write_payload(doc_id, payload):
+    data = lzma.compress(json.dumps(payload, separators=(',', ':')).encode())
+    _write_atomic(payload_path(doc_id), lambda f: f.write(data))
+    return len(data)
+
+def read_payload(doc_id):
+    """The archived ``{'pages': [...], 'fields': [...]}`` of a document"""
+    with open(payload_path(doc_id), 'rb') as f:
+        data = f.read()
+    metrics.inc('archive_reads_total')
+    return json.loads(lzma.decompress(data))
+
+def write_pdf(doc_id, pages):
+    _write_atomic(pdf_path(doc_id), lambda f: pdf_writer.write_pdf(pages, f))
+
+def delete(doc_id):
+    for path in (payload_path(doc_id), pdf_path(doc_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def list_files():
+    """(file key, path, mtime) of every stored file, including leftover temp files"""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return
+    for shard in os.scandir(ARCHIVE_DIR):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            yield entry.name.split('.', 1)[0], entry.path, mtime
@@ -0,0 +1,77 @@
+"""Transparently compressed JSON column type
+
+Values are stored as a BLOB: the ``CJ`` magic, a codec byte, then the
+payload. ``z`` means zlib-deflated JSON and ``n`` means plain JSON, used for
+values too small to benefit. Rows written as text by the plain ``JSON``
+type are still read, and ``compress_existing_rows()`` rewrites them in
+place.
+
+Pair with ``deferred()`` on large columns: a column that is never loaded is
+never read from disk or inflated.
+"""
+import json
+import zlib
+from sqlalchemy import LargeBinary, text
+from sqlalchemy.types import TypeDecorator
+
+MAGIC = b'CJ'
+CODEC_ZLIB = b'z'
+CODEC_NONE = b'n'
+COMPRESS_MIN_BYTES = 256
+ZLIB_LEVEL = 6
+MIGRATION_BATCH = 200
+
+def encode(value):
+    raw = json.dumps(value, separators=(',', ':')).encode()
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return MAGIC + CODEC_NONE + raw
+    return MAGIC + CODEC_ZLIB + zlib.compress(raw, ZLIB_LEVEL)
+
+def decode(stored):
+    if isinstance(stored, str):
+        return json.loads(stored)  # Legacy uncompressed row
+    stored = bytes(stored)
+    if not stored.startswith(MAGIC):
+        return json.loads(stored)
+    codec, payload = stored[2:3], stored[3:]
+    if codec == CODEC_ZLIB:
+        return json.loads(zlib.decompress(payload))
+    if codec == CODEC_NONE:
+        return json.loads(payload)
+    raise ValueError(f'Unknown CompressedJSON codec {codec!r}')
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as compressed binary (see module docstring for the format)"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else encode(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decode(value)
+
+def compress_existing_rows(engine, metadata):
+    """Rewrite rows still stored as JSON text (a full scan; init_db runs it once per database)"""
+    for table in metadata.sorted_tables:
+        columns = [c.name for c in table.columns if isinstance(c.type, CompressedJSON)]
+        if not columns:
+            continue
+        legacy = ' OR '.join(f"typeof({c}) = 'text'" for c in columns)
+        assignments = ', '.join(f'{c} = :{c}' for c in columns)
+        converted = 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(text(
+                    f"SELECT rowid, {', '.join(columns)} FROM {table.name} WHERE {legacy} LIMIT {MIGRATION_BATCH}"
+                )).all()
+                for row in rows:
+                    params = {'rowid': row[0]}
+                    for name, stored in zip(columns, row[1:]):
+                        params[name] = None if stored is None else encode(decode(stored))
+                    conn.execute(text(f"UPDATE {table.name} SET {assignments} WHERE rowid = :rowid"), params)
+            converted += len(rows)
+            if len(rows) < MIGRATION_BATCH:
+                break
+        if converted:
+            print(f"🗜️  Compressed JSON columns of {converted} {table.name} rows")
@@ -1,27 +1,115 @@
 """SQLite database setup and session management"""
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from compressed_json import compress_existing_rows
 
 # Database path
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./database.db')
 
+# Seconds a connection waits on a locked database before raising
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '30'))
+
 # Create engine
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT} if "sqlite" in DATABASE_URL else {},
     echo=False  # Set to True for SQL query logging
 )
 
+if DATABASE_URL.startswith('sqlite') and ':memory:' not in DATABASE_URL:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Configure SQLite for concurrent access from several processes.
+
+        WAL lets readers proceed while one writer commits, and busy_timeout
+        makes competing writers wait for the lock instead of failing.
+        auto_vacuum only takes effect on a new, empty database (and must
+        precede the WAL switch); it enables archive.py's incremental VACUUM.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT * 1000}")
+        cursor.close()
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base class for models
 Base = declarative_base()
 
+# Indexes no longer declared: each is a prefix of a composite index that
+# serves the same lookups, so it only cost writes and split the planner's choice
+OBSOLETE_INDEXES = ('ix_documents_user_id', 'ix_signature_requests_document_id')
+
+# One-time data migrations, in order. PRAGMA user_version records how many
+# have run, so a boot never rescans existing rows.
+DATA_MIGRATIONS = (
+    lambda: compress_existing_rows(engine, Base.metadata),
+)
+
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _create_missing_indexes()
+    _drop_obsolete_indexes()
+    _run_data_migrations()
+
+def _add_missing_columns():
+    """Add columns declared since a table was created.
+
+    A column may carry ``info={'backfill': '<SQL>'}``; that statement runs
+    once, right after the column is added, to populate existing rows.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            default = f" DEFAULT {column.server_default.arg}" if column.server_default is not None else ""
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}{default}'))
+                    if column.info.get('backfill'):
+                        conn.execute(text(column.info['backfill']))
+            except OperationalError as e:
+                # Another process (web master or queue worker) added it first
+                if 'duplicate column' not in str(e):
+                    raise
+                continue
+            print(f"🔧 Added column {table.name}.{column.name}")
+
+def _create_missing_indexes():
+    """create_all() only builds indexes with new tables; add ones declared since"""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine, checkfirst=True)
+
+def _drop_obsolete_indexes():
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+def _run_data_migrations():
+    with engine.connect() as conn:
+        done = conn.exec_driver_sql('PRAGMA user_version').scalar() or 0
+    for number, migration in enumerate(DATA_MIGRATIONS[done:], start=done + 1):
+        migration()  # Idempotent: two processes booting at once may both run it
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'PRAGMA user_version = {number}')
+
+def dispose_engine():
+    """Drop pooled connections inherited from a parent process (call after fork)"""
+    engine.dispose(close=False)
 
 def get_db():
     """Dependency for getting database session"""
@@ -0,0 +1,150 @@
+"""Append-only email delivery log
+
+Replaces the old ``data/email_log.json`` file, which was read and rewritten
+in full for every email. Each delivery outcome becomes one row in the
+``email_deliveries`` table:
+
+- ``record()`` only appends to an in-memory buffer, so logging costs the
+  same per email no matter how long the history is. It never touches the
+  database on the send path.
+- A background thread writes the buffer in batches (every
+  EMAIL_LOG_FLUSH_INTERVAL seconds, or sooner once a batch is full).
+  Rows are only ever inserted, so any number of processes can log at once.
+- Rotation drops rows older than EMAIL_LOG_RETENTION_DAYS and keeps at
+  most EMAIL_LOG_MAX_ROWS rows.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from database import SessionLocal
+from models import EmailDelivery
+import metrics
+
+FLUSH_INTERVAL = float(os.getenv('EMAIL_LOG_FLUSH_INTERVAL', '1'))
+BATCH_SIZE = 200
+MAX_BUFFER = 10000
+RETENTION_DAYS = int(os.getenv('EMAIL_LOG_RETENTION_DAYS', '90'))
+MAX_ROWS = int(os.getenv('EMAIL_LOG_MAX_ROWS', '1000000'))
+ROTATE_INTERVAL = 3600
+
+_buffer = deque()
+_lock = threading.Lock()
+_wake = threading.Event()
+_flush_lock = threading.Lock()
+_writer = None
+_last_rotate = 0.0
+
+def record(task_type, recipients, status, document_id=None, user_id=None, attempt=0, error=None):
+    """Log one delivery outcome per recipient (buffered, never blocks on I/O)"""
+    now = datetime.utcnow()
+    rows = [{
+        'document_id': document_id,
+        'user_id': user_id,
+        'task_type': task_type,
+        'recipient_email': recipient,
+        'status': status,
+        'attempt': attempt,
+        'error': error[:1000] if error else None,
+        'created_at': now,
+    } for recipient in (recipients or [None])]
+
+    with _lock:
+        dropped = len(_buffer) + len(rows) - MAX_BUFFER
+        for _ in range(max(0, dropped)):
+            _buffer.popleft()
+        _buffer.extend(rows)
+        full = len(_buffer) >= BATCH_SIZE
+    if dropped > 0:
+        metrics.inc('email_log_dropped_total', dropped)
+    _ensure_writer()
+    if full:
+        _wake.set()
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, daemon=True)
+            _writer.start()
+
+def _writer_loop():
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            flush()
+            _maybe_rotate()
+        except Exception as e:
+            print(f"⚠️  Email delivery log write failed: {e}")
+
+def flush():
+    """Write everything buffered so far in one transaction per batch"""
+    with _flush_lock:
+        while True:
+            with _lock:
+                batch = [_buffer.popleft() for _ in range(min(BATCH_SIZE, len(_buffer)))]
+            if not batch:
+                return
+            db = SessionLocal()
+            try:
+                db.execute(insert(EmailDelivery), batch)
+                db.commit()
+            except Exception:
+                db.rollback()
+                # Keep the entries for the next attempt
+                with _lock:
+                    _buffer.extendleft(reversed(batch))
+                raise
+            finally:
+                db.close()
+
+def _maybe_rotate():
+    global _last_rotate
+    if time.monotonic() - _last_rotate < ROTATE_INTERVAL:
+        return
+    _last_rotate = time.monotonic()
+    rotate()
+
+def rotate():
+    """Drop entries past the retention window or beyond the row cap"""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+        db.query(EmailDelivery).filter(EmailDelivery.created_at < cutoff).delete(synchronize_session=False)
+        max_id = db.query(func.max(EmailDelivery.id)).scalar()
+        if max_id is not None and max_id > MAX_ROWS:
+            db.query(EmailDelivery).filter(EmailDelivery.id <= max_id - MAX_ROWS).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def query(db, document_id, recipient=None, status=None, limit=100):
+    """Newest-first log entries of one document, optionally filtered"""
+    q = db.query(EmailDelivery).filter(EmailDelivery.document_id == document_id)
+    if recipient:
+        q = q.filter(EmailDelivery.recipient_email == recipient)
+    if status:
+        q = q.filter(EmailDelivery.status == status)
+    return q.order_by(EmailDelivery.id.desc()).limit(limit).all()
+
+def latest_by_recipient(db, document_id):
+    """{recipient_email: latest status} for one document"""
+    latest = db.query(func.max(EmailDelivery.id)) \
+        .filter(EmailDelivery.document_id == document_id) \
+        .group_by(EmailDelivery.recipient_email)
+    rows = db.query(EmailDelivery.recipient_email, EmailDelivery.status) \
+        .filter(EmailDelivery.id.in_(latest))
+    return {email: status for email, status in rows}
+
+def buffered_count():
+    return len(_buffer)
+
+atexit.register(flush)
+metrics.register_gauge('email_log_buffered', 'Delivery log entries waiting to be written', buffered_count,
+                       per_process=True)
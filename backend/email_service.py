@@ -1,5 +1,6 @@
 import smtplib
 import os
+import tracing
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
@@ -11,8 +12,10 @@ class EmailService:
     def __init__(self):
         self.sender_email = os.getenv("GMAIL_ADDRESS", "zazashaik5@gmail.com")
         self.sender_password = os.getenv("GMAIL_APP_PASSWORD", "aksk wpad nuna ybaa")
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
+        self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
+        # Set SMTP_USE_TLS=0 for a local plaintext relay or test sink (skips STARTTLS and login)
+        self.smtp_use_tls = os.getenv("SMTP_USE_TLS", "1") != "0"
         self.brand_color = "#1E90FF"  # Dodgerblue
         self.hover_color = "#275082"  # Dark blue
 
@@ -48,6 +51,17 @@ class EmailService:
         </table>
         """
 
+    def _send(self, recipient_email, message):
+        """Deliver one message over SMTP"""
+        attributes = {'net.peer.name': self.smtp_server, 'net.peer.port': self.smtp_port,
+                      'messaging.destination': recipient_email}
+        with tracing.span('smtp.send', kind=tracing.CLIENT, attributes=attributes), \
+                smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+            if self.smtp_use_tls:
+                server.starttls()
+                server.login(self.sender_email, self.sender_password)
+            server.sendmail(self.sender_email, recipient_email, message.as_string())
+
     def send_signing_link(self, recipient_email, recipient_name, signing_link, document_name, sender_name="Document Signer"):
         """Send beautiful signing link to recipient via Gmail SMTP"""
         try:
@@ -129,10 +143,91 @@ class EmailService:
             part = MIMEText(email_body, "html")
             message.attach(part)
 
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.sendmail(self.sender_email, recipient_email, message.as_string())
+            self._send(recipient_email, message)
+
+            return {"success": True, "message": f"Email sent to {recipient_email}"}
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def send_reminder(self, recipient_email, recipient_name, signing_link, document_name, expires_on,
+                      sender_name="Document Signer"):
+        """Remind a signer who has not signed yet"""
+        try:
+            message = MIMEMultipart("alternative")
+            message["Subject"] = f"⏰ Reminder: Please Sign {document_name}"
+            message["From"] = self.sender_email
+            message["To"] = recipient_email
+
+            expiry = f"This link expires on {expires_on}." if expires_on else "This link will expire soon."
+            email_body = f"""
+            <!DOCTYPE html>
+            <html>
+            <head>
+              <meta charset="UTF-8">
+              <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            </head>
+            <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Helvetica, Arial, sans-serif; background-color: #FFFFFF; color: #333333;">
+              {self._get_header_html()}
+
+              <table width="100%" cellpadding="0" cellspacing="0" style="max-width: 600px; margin: 32px auto; padding: 0 20px;">
+                <tr>
+                  <td style="padding: 32px; background-color: #FFFFFF; border: 1px solid #E5E5E5;">
+                    <h2 style="margin: 0 0 16px 0; color: #333333; font-size: 20px; font-weight: 700;">
+                      A document is still waiting for your signature
+                    </h2>
+
+                    <p style="margin: 0 0 24px 0; color: #666666; font-size: 14px; line-height: 1.6;">
+                      Hi <strong>{recipient_name}</strong>,
+                    </p>
+
+                    <p style="margin: 0 0 24px 0; color: #666666; font-size: 14px; line-height: 1.6;">
+                      {sender_name} is still waiting for your signature on:
+                    </p>
+
+                    <div style="background-color: #F7F7F7; padding: 16px; margin: 0 0 24px 0; border-left: 4px solid {self.brand_color};">
+                      <p style="margin: 0; color: #333333; font-size: 16px; font-weight: 600;">
+                        📋 {document_name}
+                      </p>
+                    </div>
+
+                    <table width="100%" cellpadding="0" cellspacing="0">
+                      <tr>
+                        <td align="center" style="padding: 0 0 24px 0;">
+                          <a href="{signing_link}"
+                             style="background-color: {self.brand_color}; color: white; padding: 14px 32px; text-decoration: none; border-radius: 0; display: inline-block; font-weight: 600; font-size: 14px; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;">
+                            Sign Document Now
+                          </a>
+                        </td>
+                      </tr>
+                    </table>
+
+                    <p style="margin: 0 0 16px 0; color: #999999; font-size: 12px; text-align: center;">
+                      Or copy this link:
+                    </p>
+
+                    <p style="margin: 0 0 24px 0; color: {self.brand_color}; font-size: 12px; word-break: break-all; text-align: center; font-family: 'Courier New', monospace;">
+                      {signing_link}
+                    </p>
+
+                    <div style="background-color: #F0F8FF; padding: 16px; border-radius: 0; border: 1px solid #E5E5E5;">
+                      <p style="margin: 0; color: #666666; font-size: 12px; line-height: 1.6;">
+                        <strong>⏱️ {expiry}</strong> Please complete your signature before then.
+                      </p>
+                    </div>
+                  </td>
+                </tr>
+              </table>
+
+              {self._get_footer_html()}
+            </body>
+            </html>
+            """
+
+            part = MIMEText(email_body, "html")
+            message.attach(part)
+
+            self._send(recipient_email, message)
 
             return {"success": True, "message": f"Email sent to {recipient_email}"}
 
@@ -230,10 +325,7 @@ class EmailService:
             part = MIMEText(email_body, "html")
             message.attach(part)
 
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.sendmail(self.sender_email, recipient_email, message.as_string())
+            self._send(recipient_email, message)
 
             return {"success": True, "message": f"Email sent to {recipient_email}"}
 
@@ -324,10 +416,7 @@ class EmailService:
                     pdf_part.add_header('Content-Disposition', 'attachment', filename=f"{document_name}_signed.pdf")
                     message.attach(pdf_part)
 
-                with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                    server.starttls()
-                    server.login(self.sender_email, self.sender_password)
-                    server.sendmail(self.sender_email, recipient_email, message.as_string())
+                self._send(recipient_email, message)
 
             return {"success": True, "message": "Final PDF emails sent"}
 
@@ -335,25 +424,13 @@ class EmailService:
             return {"success": False, "error": str(e)}
 
     def log_email(self, log_data):
-        """Log email send attempt"""
-        import json
-        try:
-            log_file = os.path.join(os.path.dirname(__file__), 'data', 'email_log.json')
-
-            with open(log_file, 'r') as f:
-                email_log = json.load(f)
-
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                **log_data
-            }
-
-            email_log["emails"].append(log_entry)
-
-            with open(log_file, 'w') as f:
-                json.dump(email_log, f, indent=2)
-
-            return True
-        except Exception as e:
-            print(f"Failed to log email: {e}")
-            return False
+        """Log email send attempt to the append-only delivery log"""
+        import delivery_log
+        delivery_log.record(
+            log_data.get('task_type', 'email'),
+            [log_data.get('recipient_email')],
+            log_data.get('status', 'sent'),
+            document_id=log_data.get('document_id'),
+            error=log_data.get('error')
+        )
+        return True
@@ -0,0 +1,188 @@
+"""In-process pub/sub feeding the Server-Sent Events stream
+
+``publish(user_id, type, data)`` fans an event out to every open
+``/api/events`` stream of that user. Each subscriber has a bounded buffer;
+when a slow client falls behind, the oldest events are dropped and the
+client is sent a ``resync`` event telling it to reload once.
+
+With several processes (Gunicorn workers plus worker.py) an event may be
+published in a different process from the one holding the stream. In that
+case EVENTS_BRIDGE=database (the default when TASK_QUEUE_BACKEND=database)
+also appends events to the ``event_log`` table. A single poller thread per
+web process relays rows written by other processes to its local subscribers.
+
+Every open stream holds a server thread (gthread worker) for its lifetime, so
+each process accepts at most EVENTS_MAX_STREAMS streams (default half of
+GUNICORN_THREADS); ``subscribe`` returns None past that and the caller
+answers 503. EventSource cannot send headers, so streams are opened with a
+short-lived ``events`` ticket (tickets.py) instead of the bearer token.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+import metrics
+
+BUFFER_SIZE = int(os.getenv('EVENTS_BUFFER_SIZE', '100'))
+HEARTBEAT_SECONDS = 15
+BRIDGE = os.getenv('EVENTS_BRIDGE', 'database' if os.getenv('TASK_QUEUE_BACKEND') == 'database' else 'none')
+BRIDGE_POLL_INTERVAL = float(os.getenv('EVENTS_BRIDGE_POLL_INTERVAL', '0.5'))
+BRIDGE_RETENTION = timedelta(minutes=5)
+MAX_STREAMS = int(os.getenv('EVENTS_MAX_STREAMS', str(max(1, int(os.getenv('GUNICORN_THREADS', '16')) // 2))))
+
+_lock = threading.Lock()
+_subscribers = defaultdict(set)  # user_id -> {Subscriber}
+_stream_count = 0
+_poller = None
+
+class Subscriber:
+    """One open event stream with a bounded backlog"""
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.buffer = deque(maxlen=BUFFER_SIZE)
+        self.overflowed = False
+        self.cond = threading.Condition()
+
+    def push(self, event):
+        with self.cond:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.overflowed = True
+            self.buffer.append(event)
+            self.cond.notify()
+
+    def drain(self, timeout):
+        """Wait up to ``timeout`` seconds; return (events, overflowed)"""
+        with self.cond:
+            if not self.buffer:
+                self.cond.wait(timeout)
+            events = list(self.buffer)
+            self.buffer.clear()
+            overflowed, self.overflowed = self.overflowed, False
+        return events, overflowed
+
+def _origin():
+    # Evaluated per call: Gunicorn forks after import, so the pid changes
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def subscribe(user_id):
+    """New subscriber, or None when this process already has MAX_STREAMS"""
+    global _stream_count
+    sub = Subscriber(user_id)
+    with _lock:
+        if _stream_count >= MAX_STREAMS:
+            return None
+        _subscribers[user_id].add(sub)
+        _stream_count += 1
+    if BRIDGE == 'database':
+        _ensure_poller()
+    return sub
+
+def unsubscribe(sub):
+    global _stream_count
+    with _lock:
+        subs = _subscribers.get(sub.user_id)
+        if subs is not None and sub in subs:
+            subs.discard(sub)
+            _stream_count -= 1
+            if not subs:
+                del _subscribers[sub.user_id]
+
+def subscriber_count():
+    return _stream_count
+
+metrics.register_gauge('event_streams_open', 'Open /api/events streams', subscriber_count,
+                       per_process=True)
+
+def _dispatch(user_id, event):
+    with _lock:
+        subs = list(_subscribers.get(user_id, ()))
+    for sub in subs:
+        sub.push(event)
+
+def publish(user_id, event_type, data):
+    """Send an event to every stream of ``user_id`` (never raises)"""
+    if user_id is None:
+        return
+    event = {'type': event_type, 'data': data, 'at': datetime.utcnow().isoformat()}
+    _dispatch(user_id, event)
+    if BRIDGE == 'database':
+        try:
+            _persist(user_id, event)
+        except Exception as e:
+            print(f"⚠️  Failed to bridge event {event_type}: {e}")
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def stream(sub):
+    """Generator of SSE frames for one subscriber; unsubscribes on disconnect"""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            events, overflowed = sub.drain(HEARTBEAT_SECONDS)
+            if overflowed:
+                yield format_sse({'type': 'resync', 'data': {}, 'at': datetime.utcnow().isoformat()})
+            for event in events:
+                yield format_sse(event)
+            if not events and not overflowed:
+                yield ": keepalive\n\n"
+    finally:
+        unsubscribe(sub)
+
+# ============ CROSS-PROCESS BRIDGE ============
+
+def _persist(user_id, event):
+    from database import SessionLocal
+    from models import EventLog
+    db = SessionLocal()
+    try:
+        db.add(EventLog(user_id=user_id, event_type=event['type'], payload=event, origin=_origin()))
+        db.commit()
+    finally:
+        db.close()
+
+def _ensure_poller():
+    global _poller
+    with _lock:
+        if _poller is not None and _poller.is_alive():
+            return
+        _poller = threading.Thread(target=_poll_event_log, daemon=True)
+        _poller.start()
+
+def _poll_event_log():
+    """Relay events persisted by other processes to local subscribers"""
+    from sqlalchemy import func
+    from database import SessionLocal
+    from models import EventLog
+
+    db = SessionLocal()
+    try:
+        last_id = db.query(func.max(EventLog.id)).scalar() or 0
+    finally:
+        db.close()
+    last_prune = time.monotonic()
+
+    while True:
+        time.sleep(BRIDGE_POLL_INTERVAL)
+        db = SessionLocal()
+        try:
+            rows = db.query(EventLog).filter(EventLog.id > last_id).order_by(EventLog.id).limit(500).all()
+            origin = _origin()
+            for row in rows:
+                last_id = row.id
+                if row.origin != origin:
+                    _dispatch(row.user_id, row.payload)
+            if time.monotonic() - last_prune > 60:
+                db.query(EventLog).filter(
+                    EventLog.created_at < datetime.utcnow() - BRIDGE_RETENTION
+                ).delete(synchronize_session=False)
+                db.commit()
+                last_prune = time.monotonic()
+        except Exception as e:
+            print(f"⚠️  Event bridge poll failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
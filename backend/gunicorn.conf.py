@@ -0,0 +1,32 @@
+"""Gunicorn settings for multi-worker production serving"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+# Each open /api/events stream holds a thread for its whole lifetime; at most
+# EVENTS_MAX_STREAMS (default half of these) are accepted per worker
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Build the app (schema + seed) once in the master, then fork
+preload_app = True
+
+# Workers share /metrics on the bind above, so they merge their totals
+# through per-pid snapshot files in this directory
+metrics_dir = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'docsigner-metrics'))
+
+def on_starting(server):
+    """Start every server run from zero"""
+    import metrics
+    metrics.clear_multiprocess_dir(metrics_dir)
+
+def post_fork(server, worker):
+    """Each worker opens its own SQLite connections and counts only its own requests"""
+    from database import dispose_engine
+    import metrics
+    dispose_engine()
+    metrics.reset_after_fork()
+    metrics.enable_multiprocess(metrics_dir)
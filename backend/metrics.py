@@ -0,0 +1,347 @@
+"""Prometheus-text metrics for the backend
+
+Recording is lock-free on the hot path: every thread writes into its own
+shard (a plain dict only that thread mutates), and the ``/metrics`` scrape
+sums the shards. The registry lock is only taken the first time a thread
+records anything. Shards of threads that have exited are folded into one
+retired total, so short-lived threads (the threaded dev server starts one
+per request) do not pile up.
+
+Under Gunicorn the workers share one ``/metrics`` on the common bind, so a
+scrape may land on any of them. With METRICS_DIR set (gunicorn.conf.py does),
+each worker writes its totals to ``<pid>.json`` in that directory every
+METRICS_SNAPSHOT_SECONDS, and a scrape merges every file. Counters and
+histograms of exited workers stay in the sum, so totals never go backwards;
+per-process gauges are summed over live workers only. Shared gauges such as
+queue depth are computed by whichever worker answers. worker.py, where every
+email is sent and the reminder and archive jobs run, serves its own metrics
+on WORKER_METRICS_PORT (``serve``).
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import contextmanager
+from flask import Response, request, g
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+QUEUE_WAIT_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+_registry_lock = threading.Lock()
+_shards = []  # [(thread, shard)]
+_retired = {}  # Merged shards of exited threads
+_local = threading.local()
+_metrics = {}  # name -> (kind, help, buckets)
+_gauges = {}  # name -> callable returning a number
+_process_gauges = set()  # Gauges summed over live workers in multiprocess mode
+_multiprocess_dir = None
+_snapshot_lock = threading.Lock()
+
+def _shard():
+    """This thread's private {(name, labels): value} dict"""
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = {}
+        with _registry_lock:
+            _retire_dead_shards()
+            _shards.append((threading.current_thread(), shard))
+        _local.shard = shard
+    return shard
+
+def _merge(into, shard):
+    for key, value in dict(shard).items():
+        if isinstance(value, list):
+            total = into.setdefault(key, [0] * len(value))
+            for i, v in enumerate(value):
+                total[i] += v
+        else:
+            into[key] = into.get(key, 0) + value
+
+def _retire_dead_shards():
+    """Fold shards of exited threads into _retired (caller holds the registry lock)"""
+    alive = []
+    for thread, shard in _shards:
+        if thread.is_alive():
+            alive.append((thread, shard))
+        else:
+            _merge(_retired, shard)
+    _shards[:] = alive
+
+def define(name, kind, help_text, buckets=None):
+    """Declare a metric so it appears in the output with HELP/TYPE lines"""
+    _metrics[name] = (kind, help_text, buckets)
+
+def register_gauge(name, help_text, func, per_process=False):
+    """Declare a gauge whose value is computed at scrape time
+
+    ``per_process`` gauges measure state private to this process (open
+    streams, cache memory) and are summed over live workers in multiprocess
+    mode; the others read shared state and are reported as computed.
+    """
+    _metrics[name] = ('gauge', help_text, None)
+    _gauges[name] = func
+    if per_process:
+        _process_gauges.add(name)
+
+def inc(name, amount=1, **labels):
+    """Increment a counter"""
+    shard = _shard()
+    key = (name, tuple(sorted(labels.items())))
+    shard[key] = shard.get(key, 0) + amount
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram"""
+    buckets = _metrics[name][2]
+    shard = _shard()
+    key = (name, tuple(sorted(labels.items())))
+    state = shard.get(key)
+    if state is None:
+        # Per-bucket counts, then sum, then count
+        state = [0] * (len(buckets) + 2)
+        shard[key] = state
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            state[i] += 1
+            break
+    state[-2] += value
+    state[-1] += 1
+
+@contextmanager
+def timed(name, **labels):
+    """Observe the duration of the wrapped block in a histogram"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+def _collect_local():
+    """Merge every thread's shard into one {(name, labels): value} dict"""
+    merged = {}
+    with _registry_lock:
+        _retire_dead_shards()
+        shards = [shard for _, shard in _shards]
+        _merge(merged, _retired)
+    for shard in shards:
+        _merge(merged, shard)
+    return merged
+
+def _gauge_values(names):
+    values = {}
+    for name in names:
+        try:
+            values[name] = _gauges[name]()
+        except Exception:
+            pass
+    return values
+
+def _write_snapshot():
+    """Atomically replace this process's ``<pid>.json`` with its current totals"""
+    pid = os.getpid()
+    snapshot = {
+        'samples': [[name, [list(item) for item in labels], value]
+                    for (name, labels), value in _collect_local().items()],
+        'gauges': _gauge_values(_process_gauges),
+    }
+    path = os.path.join(_multiprocess_dir, f'{pid}.json')
+    tmp = f'{path}.tmp'
+    with _snapshot_lock:
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _collect_multiprocess():
+    """Merge the snapshots of every worker, including this one's current totals"""
+    _write_snapshot()
+    merged, gauges = {}, {}
+    for filename in os.listdir(_multiprocess_dir):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(_multiprocess_dir, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        _merge(merged, {(name, tuple(tuple(item) for item in labels)): value
+                        for name, labels, value in snapshot['samples']})
+        if _pid_alive(int(filename[:-5])):
+            for name, value in snapshot['gauges'].items():
+                gauges[name] = gauges.get(name, 0) + value
+    return merged, gauges
+
+def _snapshot_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            _write_snapshot()
+        except OSError as e:
+            print(f"⚠️  Metrics snapshot failed: {e}")
+
+def reset_after_fork():
+    """Drop totals inherited from the parent so each worker counts only its own work"""
+    global _local
+    with _registry_lock:
+        _shards.clear()
+        _retired.clear()
+    _local = threading.local()
+
+def enable_multiprocess(directory, interval=None):
+    """Share this process's totals through ``directory`` (call once per worker, after fork)"""
+    global _multiprocess_dir
+    os.makedirs(directory, exist_ok=True)
+    _multiprocess_dir = directory
+    if interval is None:
+        interval = float(os.getenv('METRICS_SNAPSHOT_SECONDS', '1'))
+    _write_snapshot()
+    threading.Thread(target=_snapshot_loop, args=(interval,), daemon=True).start()
+
+def clear_multiprocess_dir(directory):
+    """Remove snapshots left by a previous server run (call once, in the master)"""
+    os.makedirs(directory, exist_ok=True)
+    for filename in os.listdir(directory):
+        if filename.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(directory, filename))
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (extra or [])
+    if not items:
+        return ''
+    body = ','.join(f'{k}="{_escape_label(v)}"' for k, v in items)
+    return '{' + body + '}'
+
+def render():
+    """Render all metrics in the Prometheus text exposition format"""
+    if _multiprocess_dir:
+        merged, process_gauges = _collect_multiprocess()
+    else:
+        merged, process_gauges = _collect_local(), {}
+    lines = []
+    for name, (kind, help_text, buckets) in sorted(_metrics.items()):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if name in process_gauges:
+            lines.append(f'{name} {process_gauges[name]}')
+            continue
+        if name in _gauges:
+            try:
+                lines.append(f'{name} {_gauges[name]()}')
+            except Exception as e:
+                lines.append(f'# {name} unavailable: {e}')
+            continue
+        for (metric, labels), value in sorted(merged.items()):
+            if metric != name:
+                continue
+            if kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(buckets, value):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {value[-1]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value[-2]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+            else:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+# ============ METRIC DEFINITIONS ============
+
+define('http_request_duration_seconds', 'histogram', 'HTTP request latency by route', LATENCY_BUCKETS)
+define('http_requests_total', 'counter', 'HTTP requests by route and status code')
+define('task_queue_sent_total', 'counter', 'Email tasks sent successfully')
+define('task_queue_retries_total', 'counter', 'Email task retries')
+define('task_queue_wait_seconds', 'histogram', 'Time an email task waited in the queue before each send attempt',
+       QUEUE_WAIT_BUCKETS)
+define('task_queue_failures_total', 'counter', 'Email tasks that exhausted their retries')
+define('send_rejected_total', 'counter', 'Send requests refused with 429 by reason (rate_limit, queue_full)')
+define('email_log_dropped_total', 'counter', 'Delivery log entries dropped because the write buffer was full')
+define('smtp_send_seconds', 'histogram', 'Time spent sending one email task over SMTP', LATENCY_BUCKETS)
+define('pdf_generation_seconds', 'histogram', 'generate_pdf_from_pages duration', LATENCY_BUCKETS)
+define('pdf_generation_pages', 'histogram', 'Pages per generated PDF', PAGE_BUCKETS)
+define('archive_documents_total', 'counter', 'Completed documents moved to the cold store')
+define('archive_reads_total', 'counter', 'Archived document payloads read back from the cold store')
+define('export_documents_total', 'counter', 'PDFs written into bulk export archives')
+define('signature_reminders_total', 'counter', 'Scheduled signing actions by kind (reminded, expired)')
+define('signature_images_total', 'counter', 'Submitted signature images by store result (stored, reused)')
+define('thumbnail_cache_total', 'counter', 'Page thumbnail requests by disk cache result (hit, miss)')
+define('signing_view_cache_total', 'counter', 'Signing view requests by memory cache result (hit, miss)')
+define('event_streams_rejected_total', 'counter', 'Event stream requests refused with 503 because EVENTS_MAX_STREAMS were open')
+define('db_sessions_total', 'counter', 'Database transactions begun by ORM sessions')
+define('db_queries_total', 'counter', 'SQL statements executed')
+
+_engine_instrumented = False
+
+def instrument_engine(engine, session_factory):
+    """Count SQL statements and session transactions (idempotent)"""
+    global _engine_instrumented
+    if _engine_instrumented:
+        return
+    _engine_instrumented = True
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        inc('db_queries_total')
+
+    @event.listens_for(session_factory, 'after_begin')
+    def _count_session(session, transaction, connection):
+        inc('db_sessions_total')
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the log
+
+def serve(port, host='0.0.0.0'):
+    """Serve GET /metrics on ``port`` from a daemon thread (processes without Flask routes)"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📊 Metrics on http://{host}:{port}/metrics")
+    return server
+
+def init_app(app):
+    """Time every request and expose GET /metrics"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Use the URL rule, not the raw path, to keep label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            observe('http_request_duration_seconds', time.perf_counter() - started,
+                    route=route, method=request.method)
+            inc('http_requests_total', route=route, method=request.method, status=response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
@@ -1,9 +1,17 @@
 """SQLAlchemy ORM models for Document Signer"""
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, JSON, ForeignKey, Index, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Float, DateTime, JSON, ForeignKey, Index, Boolean, LargeBinary
+from sqlalchemy.orm import deferred, relationship, validates
+from compressed_json import CompressedJSON
+import cold_store
 from database import Base
 
+def page_hashes_of(pages):
+    """{page number (str): content hash} of the pages with an image data URL"""
+    from thumbnails import page_hash
+    return {str(p.get('pageNumber')): page_hash(p['imageUrl']) for p in pages or []
+            if isinstance(p, dict) and str(p.get('imageUrl', '')).startswith('data:')}
+
 class User(Base):
     __tablename__ = "users"
 
@@ -26,11 +34,12 @@ class Document(Base):
     __tablename__ = "documents"
 
     id = Column(String(255), primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Leads idx_user_id_status
     name = Column(String(255), nullable=False)
-    pages = Column(JSON, nullable=False, default=list)
-    fields = Column(JSON, nullable=False, default=list)
-    recipients = Column(JSON, nullable=False, default=list)
+    # Compressed on disk; pages/fields are only read and inflated when accessed
+    pages = deferred(Column(CompressedJSON, nullable=False, default=list))
+    fields = deferred(Column(CompressedJSON, nullable=False, default=list))
+    recipients = Column(CompressedJSON, nullable=False, default=list)
     status = Column(String(50), nullable=False, default="draft")  # draft, sent, completed
     is_template = Column(Boolean, default=False)
     template_id = Column(String(255), nullable=True)
@@ -39,20 +48,134 @@ class Document(Base):
     sent_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
 
+    # Signing progress, maintained in the same transaction as each signature
+    # request insert/transition so progress and completion never load the rows
+    signer_count = Column(Integer, nullable=False, default=0, server_default='0', info={'backfill': (
+        "UPDATE documents SET signer_count = "
+        "(SELECT count(*) FROM signature_requests WHERE document_id = documents.id)"
+    )})
+    viewed_count = Column(Integer, nullable=False, default=0, server_default='0', info={'backfill': (
+        "UPDATE documents SET viewed_count = "
+        "(SELECT count(*) FROM signature_requests WHERE document_id = documents.id AND status = 'viewed')"
+    )})
+    signed_count = Column(Integer, nullable=False, default=0, server_default='0', info={'backfill': (
+        "UPDATE documents SET signed_count = "
+        "(SELECT count(*) FROM signature_requests WHERE document_id = documents.id AND status = 'signed')"
+    )})
+    # Unsigned requests the scheduler expired; the document cannot complete while any exist
+    expired_count = Column(Integer, nullable=False, default=0, server_default='0', info={'backfill': (
+        "UPDATE documents SET expired_count = "
+        "(SELECT count(*) FROM signature_requests WHERE document_id = documents.id AND status = 'expired')"
+    )})
+
+    # Kept in step with ``pages`` so list views never read the page images
+    page_count = Column(Integer, nullable=False, default=0, server_default='0', info={'backfill': (
+        "UPDATE documents SET page_count = json_array_length(pages) WHERE typeof(pages) = 'text'"
+    )})
+
+    # Per-page content hashes, kept in step with ``pages`` like page_count, so
+    # thumbnail ETags and cache keys never read the page images. NULL on rows
+    # written before the column existed; the thumbnail endpoint fills it in.
+    page_hashes = deferred(Column(CompressedJSON, nullable=True))
+
+    # Optimistic-locking version: every ORM UPDATE checks and bumps it
+    version = Column(Integer, nullable=False, default=0, server_default='0')
+
+    # Copy-on-write template instances: page images and field layout stay in
+    # a shared TemplateSnapshot and the row keeps only this recipient's
+    # overlay (recipient binding in ``recipients``, values in field_values).
+    # Own ``pages`` (e.g. the signer's rendered pages) take precedence.
+    snapshot_id = Column(Integer, ForeignKey("template_snapshots.id"), nullable=True)
+    field_values = Column(CompressedJSON, nullable=True)  # {field id: value}
+
+    # Set once archive.py has moved ``pages``/``fields`` to the cold store
+    # (the row then holds empty lists; page_count is kept)
+    archived_at = Column(DateTime, nullable=True)
+
     user = relationship("User", back_populates="documents")
     signature_requests = relationship("SignatureRequest", back_populates="document")
+    snapshot = relationship("TemplateSnapshot")
+
+    __mapper_args__ = {'version_id_col': version}
 
     __table_args__ = (
         Index('idx_user_id_status', 'user_id', 'status'),
+        Index('idx_user_id_template_status', 'user_id', 'is_template', 'status'),
+        Index('idx_documents_status_completed_at', 'status', 'completed_at'),
+        Index('idx_documents_user_status_completed_at', 'user_id', 'status', 'completed_at'),
     )
 
-    def to_dict(self, include_requests=False):
+    @validates('pages')
+    def _track_page_count(self, key, pages):
+        self.page_count = len(pages or [])
+        self.page_hashes = page_hashes_of(pages)
+        return pages
+
+    def archived_payload(self):
+        """The cold-store payload of an archived document, read once per instance"""
+        payload = getattr(self, '_archived_payload', None)
+        if payload is None:
+            payload = self._archived_payload = cold_store.read_payload(self.id)
+        return payload
+
+    @property
+    def stored_pages(self):
+        """This row's own pages, from the cold store if archived"""
+        return self.archived_payload()['pages'] if self.archived_at is not None else self.pages
+
+    @property
+    def stored_fields(self):
+        """This row's own fields, from the cold store if archived"""
+        return self.archived_payload()['fields'] if self.archived_at is not None else self.fields
+
+    @property
+    def content_pages(self):
+        """Page list with copy-on-write template pages resolved"""
+        pages = self.stored_pages
+        if self.snapshot_id is not None and not pages:
+            return self.snapshot.pages
+        return pages
+
+    @property
+    def content_fields(self):
+        """Field list with the template layout bound to this document's recipient"""
+        if self.snapshot_id is None:
+            return self.stored_fields
+        recipient_id = self.recipients[0]['id'] if self.recipients else None
+        values = self.field_values or {}
+        fields = []
+        for field in self.snapshot.fields:
+            field = dict(field, recipientId=recipient_id)
+            if field['id'] in values:
+                field['value'] = values[field['id']]
+            fields.append(field)
+        return fields
+
+    def rehydrate(self):
+        """Move an archived payload back into the row before editing it.
+
+        The cold-store files are left behind; archive.py sweeps them.
+        """
+        if self.archived_at is None:
+            return
+        payload = self.archived_payload()
+        self.pages, self.fields = payload['pages'], payload['fields']
+        self.archived_at = None
+        self._archived_payload = None
+
+    def materialize(self):
+        """Give a copy-on-write instance its own pages and fields before editing them"""
+        if self.snapshot_id is None:
+            return
+        self.pages, self.fields = list(self.content_pages), self.content_fields
+        self.snapshot_id = None
+        self.field_values = None
+
+    def to_dict(self, include_requests=False, include_content=True):
         data = {
             'id': self.id,
             'userId': self.user.email if self.user else None,
             'name': self.name,
-            'pages': self.pages,
-            'fields': self.fields,
             'recipients': self.recipients,
             'status': self.status,
             'isTemplate': self.is_template,
@@ -61,29 +184,129 @@ class Document(Base):
             'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
             'sentAt': self.sent_at.isoformat() if self.sent_at else None,
             'completedAt': self.completed_at.isoformat() if self.completed_at else None,
+            'version': self.version,
+            'archivedAt': self.archived_at.isoformat() if self.archived_at else None,
         }
+        if include_content:
+            data['pages'] = self.content_pages
+            data['fields'] = self.content_fields
         if include_requests:
             data['signatureRequests'] = [r.to_dict() for r in self.signature_requests]
         return data
 
+    def to_summary_dict(self, page_count):
+        """List-view fields only: no page images or fields (see thumbnails.py)"""
+        data = self.to_dict(include_requests=True, include_content=False)
+        data['pageCount'] = page_count
+        return data
+
+
+def signing_progress(doc):
+    """Signing progress from the denormalized counters.
+
+    Accepts a Document or any row with the same attribute names, so callers
+    can select just the counter columns.
+    """
+    total = doc.signer_count or 0
+    signed = doc.signed_count or 0
+    viewed = doc.viewed_count or 0
+    expired = doc.expired_count or 0
+    return {
+        'documentId': doc.id,
+        'status': doc.status,
+        'total': total,
+        'signed': signed,
+        'viewed': viewed,
+        'expired': expired,
+        'pending': total - signed - viewed - expired,
+        'percent': round(signed / total * 100, 1) if total else 0,
+        'allSigned': total > 0 and signed >= total,
+        'canComplete': expired == 0,
+    }
+
+def document_status(doc, signers):
+    """Compact status record of a document and its signers (batch status API).
+
+    Like signing_progress(), accepts rows with the same attribute names as
+    Document and SignatureRequest, so no payload columns are loaded.
+    """
+    return {
+        'documentId': doc.id,
+        'name': doc.name,
+        'status': doc.status,
+        'version': doc.version,
+        'createdAt': doc.created_at.isoformat() if doc.created_at else None,
+        'updatedAt': doc.updated_at.isoformat() if doc.updated_at else None,
+        'sentAt': doc.sent_at.isoformat() if doc.sent_at else None,
+        'completedAt': doc.completed_at.isoformat() if doc.completed_at else None,
+        'archivedAt': doc.archived_at.isoformat() if doc.archived_at else None,
+        'signed': doc.signed_count or 0,
+        'expired': doc.expired_count or 0,
+        'total': doc.signer_count or 0,
+        'signers': [{
+            'id': r.id,
+            'email': r.signer_email,
+            'name': r.signer_name,
+            'order': r.order,
+            'status': r.status,
+            'signedAt': r.signed_at.isoformat() if r.signed_at else None,
+            'expiresAt': r.expires_at.isoformat() if r.expires_at else None,
+        } for r in sorted(signers, key=lambda r: r.order)],
+    }
+
+
+class TemplateSnapshot(Base):
+    """A template's pages and field layout as of one template version.
+
+    Immutable and shared by every document sent from that version, so later
+    template edits never change documents already sent.
+    """
+    __tablename__ = "template_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    template_id = Column(String(255), nullable=False)
+    template_version = Column(Integer, nullable=False)
+    pages = Column(CompressedJSON, nullable=False, default=list)
+    fields = Column(CompressedJSON, nullable=False, default=list)  # Role-free layout; recipientId bound on read
+    page_count = Column(Integer, nullable=False, default=0)
+    page_hashes = Column(CompressedJSON, nullable=True)  # See Document.page_hashes
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_template_snapshots_template_version', 'template_id', 'template_version'),
+    )
+
 
 class SignatureRequest(Base):
     __tablename__ = "signature_requests"
 
     id = Column(String(255), primary_key=True, index=True)
-    document_id = Column(String(255), ForeignKey("documents.id"), nullable=False, index=True)
+    document_id = Column(String(255), ForeignKey("documents.id"), nullable=False)  # Leads idx_document_id_status
     signer_email = Column(String(255), nullable=False, index=True)
     signer_name = Column(String(255), nullable=False)
     access_token = Column(String(255), unique=True, nullable=False, index=True)
-    status = Column(String(50), nullable=False, default="pending")  # pending, viewed, signed
+    status = Column(String(50), nullable=False, default="pending")  # pending, viewed, signed, expired
     order = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     signed_at = Column(DateTime, nullable=True)
 
+    # Reminder and expiry schedule (see reminders.py). Existing requests keep
+    # the 30 days their email promised and get no reminders.
+    expires_at = Column(DateTime, nullable=True, info={'backfill': (
+        "UPDATE signature_requests SET expires_at = datetime(created_at, '+30 days')"
+    )})
+    # When the scheduler next looks at this request; NULL once signed or expired
+    next_action_at = Column(DateTime, nullable=True, info={'backfill': (
+        "UPDATE signature_requests SET next_action_at = expires_at WHERE status IN ('pending', 'viewed')"
+    )})
+    reminders_sent = Column(Integer, nullable=False, default=0, server_default='0')
+
     document = relationship("Document", back_populates="signature_requests")
 
     __table_args__ = (
         Index('idx_document_id_status', 'document_id', 'status'),
+        # The scheduler's range scan reads only due rows
+        Index('idx_signature_requests_next_action_at', 'next_action_at'),
     )
 
     def to_dict(self):
@@ -97,4 +320,108 @@ class SignatureRequest(Base):
             'accessToken': self.access_token,
             'createdAt': self.created_at.isoformat() if self.created_at else None,
             'signedAt': self.signed_at.isoformat() if self.signed_at else None,
+            'expiresAt': self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+
+class SignatureImage(Base):
+    """A signer's normalized signature/initials image (see signatures.py)"""
+    __tablename__ = "signature_images"
+
+    id = Column(Integer, primary_key=True)
+    signer_email = Column(String(255), nullable=False)
+    digest = Column(String(64), nullable=False, index=True)  # SHA-256 of data
+    kind = Column(String(20), nullable=False)  # SIGNATURE or INITIALS, as last used
+    data = Column(LargeBinary, nullable=False)  # Optimized PNG
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_signature_images_signer_digest', 'signer_email', 'digest', unique=True),
+        Index('idx_signature_images_signer_used', 'signer_email', 'last_used_at'),
+    )
+
+
+class EmailJob(Base):
+    """Persisted email task, shared between web processes and the queue worker"""
+    __tablename__ = "email_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_type = Column(String(50), nullable=False)  # signing_link, final_pdf
+    payload = Column(JSON, nullable=False, default=dict)
+    pdf_data = Column(LargeBinary, nullable=True)
+    status = Column(String(50), nullable=False, default="pending")  # pending, processing, sent, failed
+    retries = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(String(1000), nullable=True)
+    # Owner user id (or sender email) the worker round-robins over
+    sender_key = Column(String(255), nullable=False, default='', server_default="''", info={'backfill': (
+        "UPDATE email_jobs SET sender_key = COALESCE("
+        "CAST(json_extract(payload, '$.user_id') AS TEXT), json_extract(payload, '$.sender_email'), '')"
+    )})
+
+    __table_args__ = (
+        Index('idx_email_jobs_status_available', 'status', 'available_at'),
+        Index('idx_email_jobs_status_sender_available', 'status', 'sender_key', 'available_at'),
+    )
+
+class EventLog(Base):
+    """Recent status events, relayed between processes for the SSE stream"""
+    __tablename__ = "event_log"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    origin = Column(String(255), nullable=False)  # hostname:pid of the publisher
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class EmailDelivery(Base):
+    """Append-only email delivery log (one row per recipient per attempt)"""
+    __tablename__ = "email_deliveries"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(String(50), nullable=True)
+    user_id = Column(Integer, nullable=True)
+    task_type = Column(String(50), nullable=False)
+    recipient_email = Column(String(255), nullable=True)
+    status = Column(String(20), nullable=False)  # queued, sent, retrying, failed
+    attempt = Column(Integer, nullable=False, default=0)
+    error = Column(String(1000), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        Index('idx_email_deliveries_document_id', 'document_id', 'id'),
+        Index('idx_email_deliveries_recipient', 'recipient_email', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'documentId': self.document_id,
+            'taskType': self.task_type,
+            'recipientEmail': self.recipient_email,
+            'status': self.status,
+            'attempt': self.attempt,
+            'error': self.error,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
         }
+
+class RateLimitBucket(Base):
+    """Token bucket state, shared by all web processes"""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(100), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # time.time() of the last refill
+
+class RedeemedTicket(Base):
+    """Nonces of consumed single-use tickets (tickets.py), kept until they expire"""
+    __tablename__ = "redeemed_tickets"
+
+    nonce = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
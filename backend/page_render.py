@@ -0,0 +1,64 @@
+"""Server-side page image rendering helpers"""
+import base64
+from io import BytesIO
+
+IMAGE_FIELD_TYPES = ('SIGNATURE', 'INITIALS')
+
+def decode_data_url(data_url):
+    """Return the raw bytes of a base64 data URL"""
+    return base64.b64decode(data_url.split(',', 1)[1])
+
+def encode_png_data_url(img):
+    buf = BytesIO()
+    img.save(buf, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode()
+
+def burn_fields_into_pages(pages, fields, load_image=None):
+    """Draw field values onto page images, mirroring the signer UI.
+
+    Used when a signer's submitted pages are stale (another signer committed
+    in between): their values are drawn onto the current stored pages instead
+    of replacing them. Positions follow the canvas code in sign.ts: x/y are
+    percentages of the page and text is offset (5, 10) px at 28 px. Images
+    are scaled to fit a ``width * 2`` by ``height * 2`` px box, keeping their
+    aspect ratio, and centred in it. Only pages that receive a value are
+    re-encoded. ``load_image(value)`` returns the bytes of an image value; by
+    default only data URLs are drawn.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    by_page = {}
+    for field in fields:
+        if field.get('value'):
+            by_page.setdefault(field.get('pageNumber'), []).append(field)
+
+    result = []
+    for page in pages:
+        page_fields = by_page.get(page.get('pageNumber'))
+        if not page_fields:
+            result.append(page)
+            continue
+
+        img = Image.open(BytesIO(decode_data_url(page['imageUrl']))).convert('RGBA')
+        draw = ImageDraw.Draw(img)
+        width, height = img.size
+        for field in page_fields:
+            x = field.get('x', 0) / 100 * width
+            y = field.get('y', 0) / 100 * height
+            value = str(field['value'])
+            if field.get('type') in IMAGE_FIELD_TYPES:
+                try:
+                    data = load_image(value) if load_image else decode_data_url(value)
+                    sig = Image.open(BytesIO(data)).convert('RGBA')
+                except Exception:
+                    continue
+                box_w, box_h = max(1, int(field.get('width', 0) * 2)), max(1, int(field.get('height', 0) * 2))
+                scale = min(box_w / sig.width, box_h / sig.height)
+                sig = sig.resize((max(1, int(sig.width * scale)), max(1, int(sig.height * scale))))
+                img.alpha_composite(sig, (int(x + (box_w - sig.width) / 2), int(y + (box_h - sig.height) / 2)))
+            else:
+                font = ImageFont.load_default(size=28)
+                draw.text((x + 5, y + 10), value, fill='#000', font=font)
+
+        result.append(dict(page, imageUrl=encode_png_data_url(img)))
+    return result
@@ -0,0 +1,98 @@
+"""Incremental image-per-page PDF writer
+
+Writes the PDF objects straight to a file-like object as it goes. Only one
+page image is decoded at a time, and its pixels are deflated in chunks into
+the output. Peak memory is therefore about one decoded page, whatever the
+page count. Stream lengths are written as indirect objects after each
+stream, and the page tree after the last page, so nothing has to be known
+up front.
+"""
+import zlib
+from io import BytesIO
+from page_render import decode_data_url
+
+CHUNK_SIZE = 1024 * 1024
+
+CATALOG_ID = 1
+PAGES_ID = 2
+
+class _Writer:
+    def __init__(self, out):
+        self.out = out
+        self.position = 0
+        self.offsets = {}  # object number -> byte offset
+
+    def write(self, data):
+        self.out.write(data)
+        self.position += len(data)
+
+    def begin(self, obj_id):
+        self.offsets[obj_id] = self.position
+        self.write(b'%d 0 obj\n' % obj_id)
+
+    def obj(self, obj_id, body):
+        self.begin(obj_id)
+        self.write(body + b'\nendobj\n')
+
+def _page_image(image_url):
+    """Decode one page to an opaque RGB/grayscale PIL image"""
+    from PIL import Image
+
+    img = Image.open(BytesIO(decode_data_url(image_url)))
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, 'white')
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    if img.mode not in ('RGB', 'L'):
+        return img.convert('RGB')
+    return img
+
+def write_pdf(pages, out):
+    """Write a PDF with one full-bleed image per page to ``out``"""
+    w = _Writer(out)
+    w.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    next_id = PAGES_ID + 1
+    page_ids = []
+    for page in pages:
+        image_id, length_id, content_id, page_id = range(next_id, next_id + 4)
+        next_id += 4
+
+        img = _page_image(page['imageUrl'])
+        width, height = img.size
+        color_space = b'/DeviceGray' if img.mode == 'L' else b'/DeviceRGB'
+        raw = img.tobytes()
+        del img
+
+        w.begin(image_id)
+        w.write(b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s '
+                b'/BitsPerComponent 8 /Filter /FlateDecode /Length %d 0 R >>\nstream\n'
+                % (width, height, color_space, length_id))
+        start = w.position
+        compressor = zlib.compressobj(6)
+        view = memoryview(raw)
+        for i in range(0, len(view), CHUNK_SIZE):
+            w.write(compressor.compress(view[i:i + CHUNK_SIZE]))
+        w.write(compressor.flush())
+        length = w.position - start
+        del view, raw
+        w.write(b'\nendstream\nendobj\n')
+        w.obj(length_id, b'%d' % length)
+
+        content = b'q %d 0 0 %d 0 0 cm /Im0 Do Q' % (width, height)
+        w.obj(content_id, b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content))
+        w.obj(page_id, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+                       b'/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>'
+                       % (PAGES_ID, width, height, image_id, content_id))
+        page_ids.append(page_id)
+
+    kids = b' '.join(b'%d 0 R' % pid for pid in page_ids)
+    w.obj(PAGES_ID, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_ids)))
+    w.obj(CATALOG_ID, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES_ID)
+
+    xref_at = w.position
+    w.write(b'xref\n0 %d\n0000000000 65535 f \n' % next_id)
+    for obj_id in range(1, next_id):
+        w.write(b'%010d 00000 n \n' % w.offsets[obj_id])
+    w.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (next_id, CATALOG_ID, xref_at))
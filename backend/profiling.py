@@ -0,0 +1,138 @@
+"""Opt-in per-request profiling and SQL query accounting
+
+Controlled by the PROFILE_MODE env var:
+
+- ``off`` (default): nothing is recorded.
+- ``header``: only requests carrying ``X-Profile: 1`` are instrumented.
+- ``all``: every request is instrumented.
+
+An instrumented request runs under cProfile (the stats are dumped to
+PROFILE_DIR) and has every SQL statement counted and timed. Statement shapes
+that repeat more than PROFILE_N_PLUS_ONE_THRESHOLD times are flagged as
+likely N+1 patterns. The summary goes into an ``X-Profile-Summary`` response
+header and one log line.
+"""
+import cProfile
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import request, g
+
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'off')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+N_PLUS_ONE_THRESHOLD = int(os.getenv('PROFILE_N_PLUS_ONE_THRESHOLD', '5'))
+
+_local = threading.local()
+_engine_instrumented = False
+
+# Expanded IN-lists differ only in their number of placeholders
+_IN_LIST = re.compile(r'\((?:\s*\?\s*,)*\s*\?\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+class QueryStats:
+    """SQL statements issued while handling one request"""
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold=None):
+        """Statement shapes executed more than ``threshold`` times"""
+        threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+def statement_shape(statement):
+    """Normalize a SQL statement so repeated executions compare equal"""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    return _IN_LIST.sub('(?...)', shape)
+
+def current_stats():
+    """QueryStats for the request being handled on this thread, if any"""
+    return getattr(_local, 'stats', None)
+
+def instrument_engine(engine):
+    """Time SQL statements for instrumented requests (idempotent)"""
+    global _engine_instrumented
+    if _engine_instrumented:
+        return
+    _engine_instrumented = True
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if current_stats() is not None:
+            conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = current_stats()
+        started = conn.info.get('profile_started')
+        if stats is not None and started:
+            stats.record(statement, time.perf_counter() - started.pop())
+
+def _should_profile():
+    if PROFILE_MODE == 'all':
+        return True
+    return PROFILE_MODE == 'header' and request.headers.get('X-Profile') == '1'
+
+def _dump_profile(profiler):
+    """Write cProfile stats to PROFILE_DIR and return the file path"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    route = (request.url_rule.rule if request.url_rule else request.path).strip('/')
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', route) or 'root'
+    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{request.method}_{slug}.prof"
+    path = os.path.join(PROFILE_DIR, filename)
+    profiler.dump_stats(path)
+    return path
+
+def init_app(app):
+    """Attach profiling hooks to the app when PROFILE_MODE is not 'off'"""
+    if PROFILE_MODE == 'off':
+        return
+
+    @app.before_request
+    def _start_profile():
+        if not _should_profile():
+            return
+        _local.stats = QueryStats()
+        g.profile_started = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    @app.after_request
+    def _finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        total_ms = (time.perf_counter() - g.pop('profile_started')) * 1000
+        stats = current_stats()
+        _local.stats = None
+
+        path = _dump_profile(profiler)
+        repeated = stats.repeated()
+        summary = (
+            f"total_ms={total_ms:.1f};sql={stats.count};sql_ms={stats.seconds * 1000:.1f};"
+            f"n_plus_one={len(repeated)};profile={os.path.basename(path)}"
+        )
+        response.headers['X-Profile-Summary'] = summary
+        print(f"🔬 {request.method} {request.path} {summary}")
+        for shape, n in repeated:
+            print(f"   ⚠️  N+1 suspect ({n}x): {shape[:200]}")
+        return response
+
+    @app.teardown_request
+    def _clear_profile(exception=None):
+        # after_request is skipped on unhandled errors; never leak state to the next request
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+        _local.stats = None
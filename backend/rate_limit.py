@@ -0,0 +1,54 @@
+"""Token-bucket rate limits shared by all web processes
+
+Bucket state lives in the ``rate_limit_buckets`` table. A take is one
+conditional UPDATE that refills and debits in the same statement, so
+concurrent requests in different Gunicorn workers can never overspend.
+
+A take larger than the burst is allowed once the bucket is full. The bucket
+then goes negative, and the debt delays the key's next take. A large blast
+is admitted, and the average rate still holds. SEND_RATE_PER_MINUTE=0
+disables the limit.
+"""
+import math
+import os
+import time
+from sqlalchemy import func, update
+from sqlalchemy.dialects.sqlite import insert
+from database import SessionLocal
+from models import RateLimitBucket
+
+# Emails a user may queue per minute, and how many at once after idling
+SEND_RATE_PER_MINUTE = float(os.getenv('SEND_RATE_PER_MINUTE', '60'))
+SEND_BURST = int(os.getenv('SEND_BURST', '200'))
+
+def take(key, cost, rate_per_minute=SEND_RATE_PER_MINUTE, burst=SEND_BURST, now=None):
+    """Debit ``cost`` tokens from ``key``'s bucket.
+
+    Returns 0 if allowed, else the whole seconds until the bucket holds
+    ``cost`` tokens, or is full for a cost above the burst (nothing is
+    debited then). ``now`` (a ``time.time()`` value) defaults to the clock.
+    """
+    if rate_per_minute <= 0:
+        return 0
+    rate = rate_per_minute / 60.0
+    needed = min(cost, burst)
+    now = time.time() if now is None else now
+    available = func.min(burst, RateLimitBucket.tokens + (now - RateLimitBucket.updated_at) * rate)
+
+    db = SessionLocal()
+    try:
+        db.execute(insert(RateLimitBucket).values(key=key, tokens=burst, updated_at=now)
+                   .on_conflict_do_nothing(index_elements=['key']))
+        taken = db.execute(
+            update(RateLimitBucket)
+            .where(RateLimitBucket.key == key, available >= needed)
+            .values(tokens=available - cost, updated_at=now)
+        ).rowcount
+        if taken:
+            db.commit()
+            return 0
+        tokens = db.query(available).filter(RateLimitBucket.key == key).scalar()
+        db.commit()
+        return max(1, math.ceil((needed - tokens) / rate))
+    finally:
+        db.close()
@@ -0,0 +1,184 @@
+"""Reminder emails and link expiry for pending signature requests
+
+Each pending request carries ``next_action_at``: the time the scheduler
+should next look at it. That is the next reminder, or the link's expiry
+once the reminders are used up. Signing or expiring a request clears it.
+A pass reads only the due rows through the ``next_action_at`` index, in
+due order and in small batches, so its cost follows the work that is due,
+not the size of ``signature_requests``. Between passes the scheduler sleeps
+until the earliest due time (one index lookup), at most POLL_INTERVAL.
+
+For each due request one of two things happens:
+
+- it is past ``expires_at``: the request becomes ``expired``. Its token
+  stops working, and the owner gets a ``signature.expired`` event.
+- otherwise a reminder email is queued through task_queue, and the next
+  reminder (or the expiry) is scheduled.
+
+Every row is claimed with a conditional UPDATE (still due, same status),
+so schedulers in several processes never act on the same row twice.
+
+Settings (env vars):
+
+- SIGNING_LINK_TTL_DAYS (30): how long a signing link stays valid.
+- REMINDER_AFTER_DAYS (3): days between the invitation and each reminder;
+  0 disables reminders.
+- REMINDER_MAX (2): reminders per request.
+- REMINDER_POLL_INTERVAL (60): longest sleep between passes, in seconds;
+  0 disables the scheduler.
+
+The scheduler runs next to the email queue (worker.py, or the in-process
+queue in development).
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import func, update
+from database import SessionLocal
+from models import Document, SignatureRequest, User
+import events
+import metrics
+import signing_cache
+import task_queue
+
+LINK_TTL_DAYS = float(os.getenv('SIGNING_LINK_TTL_DAYS', '30'))
+REMINDER_AFTER_DAYS = float(os.getenv('REMINDER_AFTER_DAYS', '3'))
+REMINDER_MAX = int(os.getenv('REMINDER_MAX', '2'))
+POLL_INTERVAL = float(os.getenv('REMINDER_POLL_INTERVAL', '60'))
+BATCH_SIZE = 100
+
+_thread = None
+_stop = threading.Event()
+
+def schedule(now, reminders_sent, expires_at):
+    """``next_action_at`` after ``reminders_sent`` reminders: the next reminder, else the expiry"""
+    if REMINDER_AFTER_DAYS > 0 and reminders_sent < REMINDER_MAX:
+        reminder_at = now + timedelta(days=REMINDER_AFTER_DAYS)
+        if expires_at is None or reminder_at < expires_at:
+            return reminder_at
+    return expires_at
+
+def new_request_schedule(now=None):
+    """(expires_at, next_action_at) of a request created ``now``"""
+    now = now or datetime.utcnow()
+    expires_at = now + timedelta(days=LINK_TTL_DAYS)
+    return expires_at, schedule(now, 0, expires_at)
+
+def run_once(now=None):
+    """Act on every due request; returns (reminded, expired)"""
+    now = now or datetime.utcnow()
+    reminded = expired = 0
+    while True:
+        db = SessionLocal()
+        try:
+            due = db.query(
+                SignatureRequest.id, SignatureRequest.document_id, SignatureRequest.signer_email,
+                SignatureRequest.signer_name, SignatureRequest.access_token, SignatureRequest.status,
+                SignatureRequest.expires_at, SignatureRequest.next_action_at, SignatureRequest.reminders_sent,
+                Document.name.label('doc_name'), Document.user_id, User.email.label('owner_email')
+            ).join(Document, Document.id == SignatureRequest.document_id) \
+                .outerjoin(User, User.id == Document.user_id) \
+                .filter(SignatureRequest.next_action_at <= now) \
+                .order_by(SignatureRequest.next_action_at).limit(BATCH_SIZE).all()
+        finally:
+            db.close()
+        for row in due:
+            outcome = _act(row, now)
+            reminded += outcome == 'reminded'
+            expired += outcome == 'expired'
+        if len(due) < BATCH_SIZE:
+            break
+    if reminded or expired:
+        print(f"⏰ Sent {reminded} signing reminders, expired {expired} signing links")
+    return reminded, expired
+
+def _act(row, now):
+    """Remind or expire one due request; None if there was nothing to do or another scheduler did it"""
+    if row.status not in ('pending', 'viewed'):
+        values, outcome = {'next_action_at': None}, None
+    elif row.expires_at is not None and row.expires_at <= now:
+        values, outcome = {'status': 'expired', 'next_action_at': None}, 'expired'
+    else:
+        sent = row.reminders_sent + 1
+        values, outcome = {'reminders_sent': sent, 'next_action_at': schedule(now, sent, row.expires_at)}, 'reminded'
+
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(SignatureRequest)
+            .where(SignatureRequest.id == row.id,
+                   SignatureRequest.status == row.status,
+                   SignatureRequest.next_action_at <= now)
+            .values(**values)
+        ).rowcount
+        if claimed and outcome == 'expired':
+            # Move the request from its pending/viewed share into expired_count
+            deltas = {'expired_count': Document.expired_count + 1}
+            if row.status == 'viewed':
+                deltas['viewed_count'] = Document.viewed_count - 1
+            db.execute(update(Document).where(Document.id == row.document_id).values(**deltas))
+        db.commit()
+    finally:
+        db.close()
+    if not claimed or outcome is None:
+        return None
+
+    metrics.inc('signature_reminders_total', action=outcome)
+    if outcome == 'expired':
+        signing_cache.invalidate(row.document_id)
+        events.publish(row.user_id, 'signature.expired', {
+            'documentId': row.document_id,
+            'signatureRequestId': row.id,
+            'signerEmail': row.signer_email,
+            'signerName': row.signer_name,
+        })
+    else:
+        frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:4200')
+        task_queue.enqueue_reminder(
+            row.signer_email,
+            row.signer_name,
+            f"{frontend_url}/sign/{row.access_token}",
+            row.doc_name,
+            row.owner_email,
+            row.expires_at.strftime('%B %d, %Y') if row.expires_at else None,
+            user_id=row.user_id,
+            document_id=row.document_id
+        )
+    return outcome
+
+def next_due_at():
+    """Earliest ``next_action_at`` (an index lookup), or None"""
+    db = SessionLocal()
+    try:
+        return db.query(func.min(SignatureRequest.next_action_at)).scalar()
+    finally:
+        db.close()
+
+def _loop():
+    while not _stop.is_set():
+        try:
+            run_once()
+            due = next_due_at()
+        except Exception as e:
+            print(f"⚠️  Reminder pass failed: {e}")
+            due = None
+        wait = POLL_INTERVAL
+        if due is not None:
+            wait = min(wait, max(0.0, (due - datetime.utcnow()).total_seconds()))
+        _stop.wait(max(wait, 1.0))
+
+def start():
+    """Run reminder/expiry passes in a daemon thread"""
+    global _thread
+    if POLL_INTERVAL <= 0 or (_thread is not None and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, daemon=True)
+    _thread.start()
+
+def stop():
+    _stop.set()
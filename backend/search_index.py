@@ -0,0 +1,160 @@
+"""SQLite FTS5 full-text index over documents
+
+Indexes each document's name, recipient names/emails and text field values
+in the ``documents_fts`` virtual table. Rows are maintained by ORM mapper
+events inside the same transaction as the document write, so the index can
+never drift from the table.
+
+Every lookup goes through an FTS index, never a scan of the table:
+
+- The FTS rowid is a 63-bit hash of the document id (``fts_rowid``), so
+  updates and deletes address their row by rowid. The documents table's own
+  rowid is not used because a full VACUUM may renumber it.
+- The owner is the indexed ``owner`` column (``u<user id>``) and is part of
+  every MATCH, so a search only reads that user's postings. The user's terms
+  are restricted to the text columns, so they never match the owner itself.
+
+The ``snippet`` of a search result is HTML: the document text is escaped
+and the matched terms are wrapped in ``<mark>``.
+"""
+import hashlib
+import html
+import re
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import undefer
+from models import Document
+import signatures
+
+# bm25 column weights: document_id, owner, name, recipients, field_values
+RANK = "bm25(documents_fts, 0.0, 0.0, 10.0, 5.0, 1.0)"
+# Columns a snippet may come from, in weight order
+SNIPPET_COLUMNS = (2, 3, 4)
+# Highlight markers; SQLite inserts them into raw text, which is escaped afterwards
+_OPEN, _CLOSE = '\x02', '\x03'
+
+_enabled = False
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+def init(engine):
+    """Create the FTS table (backfilling it on first run) and start syncing"""
+    global _enabled
+    with engine.begin() as conn:
+        try:
+            existing = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type='table' AND name='documents_fts'"
+            )).scalar()
+            if existing and 'owner' not in existing:
+                # Older layout: rowids and owners were not indexed
+                conn.execute(text("DROP TABLE documents_fts"))
+                existing = None
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+                "document_id UNINDEXED, owner, name, recipients, field_values, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+        except Exception as e:
+            print(f"⚠️  Full-text search disabled (FTS5 unavailable): {e}")
+            return
+    if not existing:
+        rebuild(engine)
+    if not _enabled:
+        event.listen(Document, 'after_insert', _after_insert)
+        event.listen(Document, 'after_update', _after_update)
+        event.listen(Document, 'after_delete', _after_delete)
+    _enabled = True
+
+def is_enabled():
+    return _enabled
+
+def fts_rowid(doc_id):
+    """Stable FTS rowid of a document id"""
+    return int.from_bytes(hashlib.blake2b(doc_id.encode(), digest_size=8).digest(), 'big') >> 1
+
+def owner_token(user_id):
+    return f'u{user_id}'
+
+def _row(doc):
+    recipients = ' '.join(
+        f"{r.get('name', '')} {r.get('email', '')}" for r in (doc.recipients or []) if isinstance(r, dict)
+    )
+    # Text-like values only; signatures/initials are data: URLs or references. Copy-on-write
+    # template instances keep their values in the field_values overlay.
+    raw_values = [f.get('value') for f in (doc.stored_fields or []) if isinstance(f, dict)]
+    raw_values += list((doc.field_values or {}).values())
+    values = ' '.join(
+        str(v) for v in raw_values if v not in (None, '') and not signatures.is_image_value(str(v))
+    )
+    return {
+        'rowid': fts_rowid(doc.id),
+        'document_id': doc.id,
+        'owner': owner_token(doc.user_id),
+        'name': doc.name or '',
+        'recipients': recipients,
+        'field_values': values,
+    }
+
+def _insert(connection, doc):
+    connection.execute(text(
+        "INSERT INTO documents_fts (rowid, document_id, owner, name, recipients, field_values) "
+        "VALUES (:rowid, :document_id, :owner, :name, :recipients, :field_values)"
+    ), _row(doc))
+
+def _delete(connection, doc_id):
+    connection.execute(text("DELETE FROM documents_fts WHERE rowid = :rowid"), {'rowid': fts_rowid(doc_id)})
+
+def _after_insert(mapper, connection, target):
+    _insert(connection, target)
+
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    # Status/timestamp-only updates do not change indexed text
+    if any(state.attrs[attr].history.has_changes() for attr in ('name', 'recipients', 'fields', 'field_values', 'user_id')):
+        _delete(connection, target.id)
+        _insert(connection, target)
+
+def _after_delete(mapper, connection, target):
+    _delete(connection, target.id)
+
+def rebuild(engine):
+    """Re-index every document (used on first run and for repairs)"""
+    from database import SessionLocal
+    db = SessionLocal(bind=engine)
+    try:
+        conn = db.connection()
+        conn.execute(text("DELETE FROM documents_fts"))
+        for doc in db.query(Document).options(undefer(Document.fields)).yield_per(200):
+            _insert(conn, doc)
+        db.commit()
+    finally:
+        db.close()
+
+def to_match_query(query):
+    """Turn free text into a safe FTS5 query: every word is a prefix term"""
+    tokens = _TOKEN.findall(query or '')
+    return ' '.join(f'"{t}"*' for t in tokens)
+
+def _highlight(snippet):
+    return html.escape(snippet).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+def search(db, user_id, query, limit=20, offset=0):
+    """Return (total, [(document_id, rank, snippet HTML), ...]) for one user"""
+    terms = to_match_query(query)
+    if not terms:
+        return 0, []
+    # The terms are confined to the text columns so they never match the owner token
+    match = f'owner : "{owner_token(user_id)}" AND {{name recipients field_values}} : ({terms})'
+    params = {'match': match, 'limit': limit, 'offset': offset, 'open': _OPEN, 'close': _CLOSE}
+    total = db.execute(text("SELECT count(*) FROM documents_fts WHERE documents_fts MATCH :match"),
+                       params).scalar()
+    snippets = ', '.join(f"snippet(documents_fts, {column}, :open, :close, '…', 12)" for column in SNIPPET_COLUMNS)
+    rows = db.execute(text(
+        f"SELECT document_id, {RANK} AS rank, {snippets} "
+        "FROM documents_fts WHERE documents_fts MATCH :match "
+        "ORDER BY rank LIMIT :limit OFFSET :offset"
+    ), params).all()
+    hits = []
+    for doc_id, rank, *candidates in rows:
+        # The best-weighted column with a highlighted term (the owner column never shows)
+        snippet = next((c for c in candidates if c and _OPEN in c), candidates[0] or '')
+        hits.append((doc_id, rank, _highlight(snippet)))
+    return total, hits
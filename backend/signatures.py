@@ -0,0 +1,163 @@
+"""Normalized, deduplicated signature and initials images
+
+The signature modal uploads the whole 500x200 canvas (or an arbitrary
+uploaded photo) as a PNG data URL, mostly transparent or white padding.
+On submit each image is:
+
+- trimmed to the ink plus a small margin,
+- scaled down to fit MAX_WIDTH x MAX_HEIGHT,
+- re-encoded as an optimized palette PNG.
+
+It is then stored once per signer email in ``signature_images``, keyed by
+the SHA-256 of the normalized bytes. The field value becomes a reference
+URL, ``/api/signatures/<digest>.png``, in place of the data URL. A signer
+who signs again with the same image reuses the stored row. The signing view
+also offers the signer's latest signature and initials, which are submitted
+back as references and never re-uploaded.
+"""
+import hashlib
+import re
+from collections import namedtuple
+from datetime import datetime
+from io import BytesIO
+from models import SignatureImage
+from page_render import IMAGE_FIELD_TYPES, decode_data_url
+import metrics
+
+URL_PREFIX = '/api/signatures/'
+MAX_WIDTH = 600
+MAX_HEIGHT = 240
+MARGIN = 4
+# Pixels lighter than this (0-255) count as background, e.g. typed signatures' white fill
+INK_THRESHOLD = 235
+PALETTE_COLORS = 64
+
+_REFERENCE = re.compile(r'^/api/signatures/([0-9a-f]{64})\.png$')
+
+NormalizedImage = namedtuple('NormalizedImage', 'digest data width height')
+
+class ForeignReference(ValueError):
+    """A submitted signature reference that is not one of the signer's stored images"""
+
+def reference(digest):
+    return f'{URL_PREFIX}{digest}.png'
+
+def parse_reference(value):
+    """Digest of a signature reference URL, else None"""
+    match = _REFERENCE.match(value) if isinstance(value, str) else None
+    return match.group(1) if match else None
+
+def is_image_value(value):
+    """True for data URLs and signature references (not searchable text)"""
+    return isinstance(value, str) and (value.startswith('data:') or parse_reference(value) is not None)
+
+def normalize(data_url):
+    """NormalizedImage of a signature data URL, or None if it is not an image with ink"""
+    from PIL import Image, ImageChops
+
+    try:
+        img = Image.open(BytesIO(decode_data_url(data_url)))
+        img.load()
+    except Exception:
+        return None
+    img = img.convert('RGBA')
+
+    # Ink: visible and darker than the background
+    dark = img.convert('L').point(lambda v: 255 if v < INK_THRESHOLD else 0)
+    ink = ImageChops.multiply(dark, img.getchannel('A').point(lambda a: 255 if a > 16 else 0))
+    bbox = ink.getbbox()
+    if bbox is None:
+        return None
+    left, top, right, bottom = bbox
+    img = img.crop((max(0, left - MARGIN), max(0, top - MARGIN),
+                    min(img.width, right + MARGIN), min(img.height, bottom + MARGIN)))
+    img.thumbnail((MAX_WIDTH, MAX_HEIGHT), Image.LANCZOS)
+
+    buf = BytesIO()
+    img.quantize(colors=PALETTE_COLORS, method=Image.Quantize.FASTOCTREE).save(buf, format='PNG', optimize=True)
+    data = buf.getvalue()
+    return NormalizedImage(hashlib.sha256(data).hexdigest(), data, img.width, img.height)
+
+def normalize_submitted(fields):
+    """{field id: NormalizedImage} for the image data URLs among submitted fields.
+
+    Runs before the submit transaction so retries do not redo the image work.
+    """
+    images = {}
+    by_value = {}  # The UI puts one image into every field of the same type
+    for field in fields:
+        value = field.get('value')
+        if 'id' in field and isinstance(value, str) and value.startswith('data:image/'):
+            if value not in by_value:
+                by_value[value] = normalize(value)
+            if by_value[value] is not None:
+                images[field['id']] = by_value[value]
+    return images
+
+def save(db, signer_email, kind, image):
+    """Store (or reuse) the signer's copy of a normalized image; returns its reference"""
+    saved = db.info.setdefault('saved_signatures', set())  # Rows added but not yet flushed
+    if (signer_email, image.digest) in saved:
+        return reference(image.digest)
+    saved.add((signer_email, image.digest))
+    now = datetime.utcnow()
+    row = db.query(SignatureImage).filter(SignatureImage.signer_email == signer_email,
+                                          SignatureImage.digest == image.digest).first()
+    if row is None:
+        db.add(SignatureImage(signer_email=signer_email, digest=image.digest, kind=kind, data=image.data,
+                              width=image.width, height=image.height, created_at=now, last_used_at=now))
+        metrics.inc('signature_images_total', result='stored')
+    else:
+        row.kind = kind
+        row.last_used_at = now
+        metrics.inc('signature_images_total', result='reused')
+    return reference(image.digest)
+
+def owned_reference(db, signer_email, kind, value):
+    """``value`` if it references one of the signer's stored images (marking it used), else None"""
+    digest = parse_reference(value)
+    if digest is None:
+        return None
+    row = db.query(SignatureImage).filter(SignatureImage.signer_email == signer_email,
+                                          SignatureImage.digest == digest).first()
+    if row is None:
+        return None
+    row.kind = kind
+    row.last_used_at = datetime.utcnow()
+    metrics.inc('signature_images_total', result='reused')
+    return value
+
+def resolve_submitted(db, signer_email, field, value, images):
+    """Final stored value of one submitted field value (see module docstring)"""
+    if field.get('type') not in IMAGE_FIELD_TYPES:
+        return value
+    if field['id'] in images:
+        return save(db, signer_email, field['type'], images[field['id']])
+    if parse_reference(value) is not None:
+        # Only the signer's own saved images may be referenced; never store a blank instead
+        if owned_reference(db, signer_email, field['type'], value) is None:
+            raise ForeignReference(field['id'])
+    return value
+
+def saved_for_signer(db, signer_email):
+    """{kind: reference} of the signer's most recently used signature and initials"""
+    saved = {}
+    rows = db.query(SignatureImage.kind, SignatureImage.digest) \
+        .filter(SignatureImage.signer_email == signer_email) \
+        .order_by(SignatureImage.last_used_at.desc())
+    for kind, digest in rows:
+        saved.setdefault(kind, reference(digest))
+        if len(saved) == len(IMAGE_FIELD_TYPES):
+            break
+    return saved
+
+def load(db, digest):
+    """PNG bytes of a stored image, or None"""
+    return db.query(SignatureImage.data).filter(SignatureImage.digest == digest).limit(1).scalar()
+
+def image_bytes(db, value):
+    """Raw image bytes of a field value (data URL or reference), or None"""
+    if value.startswith('data:'):
+        return decode_data_url(value)
+    digest = parse_reference(value)
+    return load(db, digest) if digest else None
@@ -0,0 +1,138 @@
+"""In-memory LRU cache of the public signing view
+
+``GET /api/sign/<token>`` is opened again and again for the same link:
+phone and desktop, refreshes, email clients prefetching links. The cache
+keeps the serialized JSON response per access token, tagged with its
+document and signer and with the state it was rendered from: the signing
+request's status and the document's version. A repeat open reads just that
+state (one lookup on the token index and the documents primary key, see
+app.py) and is answered from memory when it still matches, without loading
+or serializing the document.
+
+Every document write bumps its version and every signing step changes the
+request status, so a write made in any process (another Gunicorn worker,
+worker.py's reminder scheduler) makes the entry miss on its next open.
+Writes in this process also drop the affected entries at once
+(``invalidate``): a submitted signature, an edited, sent or deleted
+document, and any signing request status change. A submission also drops
+the signer's views of other documents, since those offer their latest
+saved signature. A view is not stored if its document or signer was
+invalidated while it was rendered, so a slow reader cannot put back what a
+writer just dropped. Generations are counted per document and per signer,
+so writes elsewhere never keep a view from being cached. A link's expiry is
+checked against the cached ``expires_at`` on every hit. The TTL only bounds
+how long an unused entry holds memory (and how long another process's new
+saved signature may be missing from the list a view offers).
+
+Settings (env vars):
+
+- SIGNING_VIEW_CACHE_MB (32): memory budget for cached responses; 0
+  disables the cache. Views larger than a quarter of it are not cached.
+- SIGNING_VIEW_CACHE_TTL (300): longest age of an entry, in seconds.
+
+Counted in ``signing_view_cache_total`` (hit, miss); the
+``signing_view_cache_bytes`` gauge shows the memory in use.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+import metrics
+
+MAX_BYTES = int(float(os.getenv('SIGNING_VIEW_CACHE_MB', '32')) * 1024 * 1024)
+TTL = float(os.getenv('SIGNING_VIEW_CACHE_TTL', '300'))
+
+Entry = namedtuple('Entry', 'body document_id signer_email expires_at state stored_at')
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # access token -> Entry, least recently used first
+# Secondary indexes, so invalidation only touches the affected entries
+_tokens_by_document = {}  # document id -> {access token}
+_tokens_by_signer = {}  # signer email -> {access token}
+_bytes = 0
+# Invalidation counts per document id and signer email. Past MAX_TRACKED keys
+# both are cleared and the epoch bumped, which voids every outstanding ticket.
+_document_generations = {}
+_signer_generations = {}
+_epoch = 0
+MAX_TRACKED = 10000
+
+def enabled():
+    return MAX_BYTES > 0 and TTL > 0
+
+def generation(document_id, signer_email):
+    """Ticket to pass to store(); taken before the view is read from the database"""
+    return _epoch, _document_generations.get(document_id, 0), _signer_generations.get(signer_email, 0)
+
+def _remove(access_token):
+    """Drop one entry and its index references (caller holds the lock)"""
+    global _bytes
+    entry = _entries.pop(access_token)
+    _bytes -= len(entry.body)
+    for index, key in ((_tokens_by_document, entry.document_id), (_tokens_by_signer, entry.signer_email)):
+        tokens = index.get(key)
+        if tokens is not None:
+            tokens.discard(access_token)
+            if not tokens:
+                del index[key]
+
+def get(access_token, state):
+    """Cached response body for the token if it was rendered from ``state``, or None
+
+    ``state`` is the current (request status, document version) of the link.
+    """
+    if not enabled():
+        return None
+    with _lock:
+        entry = _entries.get(access_token)
+        if entry is not None:
+            stale = entry.state != state or time.monotonic() - entry.stored_at > TTL or (
+                entry.expires_at is not None and entry.expires_at <= datetime.utcnow())
+            if stale:
+                _remove(access_token)
+                entry = None
+            else:
+                _entries.move_to_end(access_token)
+    metrics.inc('signing_view_cache_total', result='hit' if entry else 'miss')
+    return entry.body if entry else None
+
+def store(access_token, body, document_id, signer_email, expires_at, state, generation):
+    """Cache a view rendered from ``state``, unless its document or signer was invalidated since ``generation``"""
+    if not enabled() or len(body) > MAX_BYTES // 4:
+        return
+    global _bytes
+    with _lock:
+        if generation != (_epoch, _document_generations.get(document_id, 0),
+                          _signer_generations.get(signer_email, 0)):
+            return
+        if access_token in _entries:
+            _remove(access_token)
+        _entries[access_token] = Entry(body, document_id, signer_email, expires_at, state, time.monotonic())
+        _tokens_by_document.setdefault(document_id, set()).add(access_token)
+        _tokens_by_signer.setdefault(signer_email, set()).add(access_token)
+        _bytes += len(body)
+        while _bytes > MAX_BYTES:
+            _remove(next(iter(_entries)))
+
+def invalidate(document_id=None, signer_email=None):
+    """Drop the views of a document and/or every view of a signer"""
+    global _epoch
+    with _lock:
+        if len(_document_generations) + len(_signer_generations) >= MAX_TRACKED:
+            _document_generations.clear()
+            _signer_generations.clear()
+            _epoch += 1
+        if document_id is not None:
+            _document_generations[document_id] = _document_generations.get(document_id, 0) + 1
+        if signer_email is not None:
+            _signer_generations[signer_email] = _signer_generations.get(signer_email, 0) + 1
+        stale = set(_tokens_by_document.get(document_id, ())) | set(_tokens_by_signer.get(signer_email, ()))
+        for token in stale:
+            _remove(token)
+
+def cached_bytes():
+    return _bytes
+
+metrics.register_gauge('signing_view_cache_bytes', 'Memory used by cached signing views', cached_bytes,
+                       per_process=True)
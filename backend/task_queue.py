@@ -1,23 +1,111 @@
-"""Async task queue for background email sending"""
+"""Async task queue for background email sending
+
+Two backends are supported, selected with the TASK_QUEUE_BACKEND env var:
+
+- ``memory`` (default): an in-process ``queue.Queue`` drained by a daemon
+  thread. Suitable for the single-process development server.
+- ``database``: tasks are persisted to the ``email_jobs`` table and drained by
+  the standalone ``worker.py`` process, so any number of WSGI workers can
+  enqueue without each running its own competing email thread.
+
+Both backends serve senders round-robin, so one user's large blast cannot
+delay another user's signing links by more than one email per active
+sender. Callers check ``retry_after_for(count)`` before enqueuing: past the
+TASK_QUEUE_HIGH_WATER mark, new sends are refused instead of growing the
+queue without bound.
+"""
+import os
 import queue
 import threading
 import time
-from datetime import datetime
-from email_service import EmailService
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from database import SessionLocal
+from models import EmailJob
+import delivery_log
+import events
+import metrics
+import tracing
+
+BACKEND = os.getenv('TASK_QUEUE_BACKEND', 'memory')
+
+# Database backend tuning
+POLL_INTERVAL = float(os.getenv('TASK_QUEUE_POLL_INTERVAL', '1'))
+LEASE_SECONDS = int(os.getenv('TASK_QUEUE_LEASE_SECONDS', '300'))
+RETRY_BACKOFF_SECONDS = 5
+
+# Backpressure: queued emails above which sends are refused, and the
+# Retry-After sent with the refusal
+HIGH_WATER = int(os.getenv('TASK_QUEUE_HIGH_WATER', '5000'))
+FULL_RETRY_AFTER = int(os.getenv('TASK_QUEUE_FULL_RETRY_AFTER', '30'))
+
+class FairQueue:
+    """Per-sender FIFO queues served round-robin (memory backend)
+
+    Drop-in for the ``queue.Queue`` calls the worker uses: ``put``,
+    ``get(timeout)`` raising ``queue.Empty`` and ``qsize``.
+    """
+    def __init__(self):
+        self._queues = OrderedDict()  # sender_key -> deque of tasks
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def put(self, task):
+        # None is the shutdown signal; it gets its own slot in the rotation
+        key = task.sender_key if task is not None else None
+        with self._cond:
+            self._queues.setdefault(key, deque()).append(task)
+            self._size += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._size and not self._cond.wait_for(lambda: self._size, timeout):
+                raise queue.Empty
+            key, tasks = next(iter(self._queues.items()))
+            task = tasks.popleft()
+            if tasks:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self._size -= 1
+            return task
+
+    def qsize(self):
+        return self._size
+
+    def clear(self):
+        """Drop every queued task; returns how many were dropped"""
+        with self._cond:
+            dropped = self._size
+            self._queues.clear()
+            self._size = 0
+            return dropped
 
 # Global task queue
-_task_queue = queue.Queue()
+_task_queue = FairQueue()
+_sender_cursor = ''  # Last sender_key served by this worker (database backend)
 _worker_thread = None
 _running = False
 
-email_service = EmailService()
+_email_service = None
+
+def get_email_service():
+    """Create the EmailService on first send (keeps smtplib/MIME out of boot)"""
+    global _email_service
+    if _email_service is None:
+        from email_service import EmailService
+        _email_service = EmailService()
+    return _email_service
 
 class EmailTask:
     """Represents an email task to be sent"""
     def __init__(self, task_type, recipient_email=None, recipient_name=None,
                  signing_link=None, doc_name=None, sender_email=None,
-                 all_emails=None, pdf_data=None):
-        self.task_type = task_type  # 'signing_link' or 'final_pdf'
+                 all_emails=None, pdf_data=None, user_id=None, document_id=None, traceparent=None,
+                 expires_on=None):
+        self.task_type = task_type  # 'signing_link', 'reminder' or 'final_pdf'
         self.recipient_email = recipient_email
         self.recipient_name = recipient_name
         self.signing_link = signing_link
@@ -25,46 +113,238 @@ class EmailTask:
         self.sender_email = sender_email
         self.all_emails = all_emails  # For final_pdf
         self.pdf_data = pdf_data
+        self.user_id = user_id  # Document owner, notified of the delivery outcome
+        self.document_id = document_id
+        self.traceparent = traceparent  # Span that queued the task, continued by the worker
+        self.expires_on = expires_on  # Reminders: the link's expiry date, as shown in the email
+        self.queued_at = time.time()  # When the task last became ready to send
         self.created_at = datetime.now()
         self.retries = 0
         self.max_retries = 3
+        self.job_id = None  # Set when loaded from the email_jobs table
+
+    @property
+    def sender_key(self):
+        """Fair-scheduling key: the owning user, else the sender address"""
+        return str(self.user_id) if self.user_id is not None else (self.sender_email or '')
+
+    def to_payload(self):
+        """Serializable task arguments (everything except the PDF bytes)"""
+        return {
+            'recipient_email': self.recipient_email,
+            'recipient_name': self.recipient_name,
+            'signing_link': self.signing_link,
+            'doc_name': self.doc_name,
+            'sender_email': self.sender_email,
+            'all_emails': self.all_emails,
+            'user_id': self.user_id,
+            'document_id': self.document_id,
+            'traceparent': self.traceparent,
+            'expires_on': self.expires_on,
+        }
+
+    @classmethod
+    def from_job(cls, job):
+        """Rebuild a task from an EmailJob row"""
+        task = cls(job.task_type, pdf_data=job.pdf_data, **(job.payload or {}))
+        task.created_at = job.created_at
+        task.retries = job.retries
+        task.job_id = job.id
+        task.queued_at = job.available_at.replace(tzinfo=timezone.utc).timestamp()
+        return task
 
 def process_email_task(task):
     """Process a single email task with retry logic"""
+    picked_up = time.time()
+    wait = max(0.0, picked_up - task.queued_at)
+    metrics.observe('task_queue_wait_seconds', wait, task_type=task.task_type)
+    attributes = {
+        'email.task_type': task.task_type,
+        'email.attempt': task.retries,
+        'email.job_id': task.job_id,
+        'document.id': task.document_id,
+    }
+    tracing.record_span('queue.wait', int(task.queued_at * 1e9), int(picked_up * 1e9), task.traceparent,
+                        tracing.CONSUMER, attributes)
+    with tracing.span('email.send', task.traceparent, tracing.CONSUMER, attributes=attributes):
+        _send_task(task)
+
+def _send_task(task):
+    email_service = get_email_service()
     try:
         if task.task_type == 'signing_link':
-            result = email_service.send_signing_link(
-                task.recipient_email,
-                task.recipient_name,
-                task.signing_link,
-                task.doc_name,
-                task.sender_email
-            )
+            with metrics.timed('smtp_send_seconds', task_type=task.task_type):
+                result = email_service.send_signing_link(
+                    task.recipient_email,
+                    task.recipient_name,
+                    task.signing_link,
+                    task.doc_name,
+                    task.sender_email
+                )
+        elif task.task_type == 'reminder':
+            with metrics.timed('smtp_send_seconds', task_type=task.task_type):
+                result = email_service.send_reminder(
+                    task.recipient_email,
+                    task.recipient_name,
+                    task.signing_link,
+                    task.doc_name,
+                    task.expires_on,
+                    task.sender_email
+                )
         elif task.task_type == 'final_pdf':
-            result = email_service.send_final_pdf(
-                task.all_emails,
-                task.doc_name,
-                task.pdf_data,
-                task.sender_email
-            )
+            with metrics.timed('smtp_send_seconds', task_type=task.task_type):
+                result = email_service.send_final_pdf(
+                    task.all_emails,
+                    task.doc_name,
+                    task.pdf_data,
+                    task.sender_email
+                )
         else:
             print(f"⚠️  Unknown task type: {task.task_type}")
+            _finish(task, 'failed', 'Unknown task type')
             return
 
         if result.get('success'):
             print(f"✅ Email sent: {task.task_type} to {task.recipient_email or 'multiple'}")
+            metrics.inc('task_queue_sent_total', task_type=task.task_type)
+            _finish(task, 'sent')
+            _log_delivery(task, 'sent')
+            _publish_outcome(task, 'email.delivered')
         else:
             raise Exception(f"Email service error: {result.get('error')}")
 
     except Exception as e:
         print(f"❌ Email task failed: {e}")
+        span = tracing.current_span()
+        if span is not None:
+            span.error = str(e)
         if task.retries < task.max_retries:
             task.retries += 1
             print(f"   Retrying ({task.retries}/{task.max_retries})...")
+            metrics.inc('task_queue_retries_total', task_type=task.task_type)
+            _log_delivery(task, 'retrying', str(e))
             # Re-queue the task
-            _task_queue.put(task)
+            _retry(task, str(e))
         else:
             print(f"   Max retries reached for {task.task_type}")
+            metrics.inc('task_queue_failures_total', task_type=task.task_type)
+            _finish(task, 'failed', str(e))
+            _log_delivery(task, 'failed', str(e))
+            _publish_outcome(task, 'email.failed', str(e))
+
+def _recipients(task):
+    return task.all_emails if task.task_type == 'final_pdf' else [task.recipient_email]
+
+def _log_delivery(task, status, error=None):
+    delivery_log.record(task.task_type, _recipients(task), status, document_id=task.document_id,
+                        user_id=task.user_id, attempt=task.retries, error=error)
+
+def _publish_outcome(task, event_type, error=None):
+    events.publish(task.user_id, event_type, {
+        'documentId': task.document_id,
+        'taskType': task.task_type,
+        'recipients': _recipients(task),
+        'error': error,
+    })
+
+def _retry(task, error):
+    """Put a failed task back on the queue"""
+    if task.job_id is None:
+        task.queued_at = time.time()
+        _task_queue.put(task)
+        return
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(EmailJob)
+            .where(EmailJob.id == task.job_id)
+            .values(
+                status='pending',
+                retries=task.retries,
+                claimed_at=None,
+                last_error=error[:1000],
+                available_at=datetime.utcnow() + timedelta(seconds=RETRY_BACKOFF_SECONDS * task.retries),
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def _finish(task, status, error=None):
+    """Record the final outcome of a persisted task"""
+    if task.job_id is None:
+        return
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(EmailJob)
+            .where(EmailJob.id == task.job_id)
+            .values(status=status, last_error=error[:1000] if error else None, pdf_data=None)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def _next_sender(db, now):
+    """The sender after the round-robin cursor that has a due job (wrapping)"""
+    global _sender_cursor
+    due = db.query(EmailJob.sender_key).filter(EmailJob.status == 'pending', EmailJob.available_at <= now)
+    sender = due.filter(EmailJob.sender_key > _sender_cursor).order_by(EmailJob.sender_key).limit(1).scalar()
+    if sender is None:
+        sender = due.order_by(EmailJob.sender_key).limit(1).scalar()
+    if sender is not None:
+        _sender_cursor = sender
+    return sender
+
+def _claim_next_job():
+    """Atomically claim the next due job, or return None if there is none.
+
+    Expired leases are reclaimed first; otherwise the oldest due job of the
+    next sender in round-robin order is taken. The claim is a conditional
+    UPDATE, so when several worker processes race for the same row exactly
+    one of them wins.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=LEASE_SECONDS)
+        candidates = (
+            db.query(EmailJob.id)
+            .filter(EmailJob.status == 'processing', EmailJob.claimed_at < stale)
+            .order_by(EmailJob.claimed_at)
+            .limit(5)
+            .all()
+        )
+        if not candidates:
+            sender = _next_sender(db, now)
+            if sender is None:
+                return None
+            candidates = (
+                db.query(EmailJob.id)
+                .filter(EmailJob.status == 'pending', EmailJob.sender_key == sender, EmailJob.available_at <= now)
+                .order_by(EmailJob.available_at, EmailJob.id)
+                .limit(5)
+                .all()
+            )
+        for (job_id,) in candidates:
+            claimed = db.execute(
+                update(EmailJob)
+                .where(EmailJob.id == job_id)
+                .where(
+                    (EmailJob.status == 'pending') |
+                    ((EmailJob.status == 'processing') & (EmailJob.claimed_at < stale))
+                )
+                .values(status='processing', claimed_at=now)
+            )
+            db.commit()
+            if claimed.rowcount == 1:
+                job = db.get(EmailJob, job_id)
+                return EmailTask.from_job(job)
+        return None
+    finally:
+        db.close()
 
 def worker_thread_func():
     """Background worker thread that processes email tasks"""
@@ -81,9 +361,29 @@ def worker_thread_func():
         except Exception as e:
             print(f"❌ Worker thread error: {e}")
 
+def run_worker():
+    """Drain the email_jobs table until stop() is called (database backend)"""
+    global _running
+    _running = True
+    print(f"📧 Email queue worker started (pid {os.getpid()})")
+    while _running:
+        try:
+            task = _claim_next_job()
+            if task is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            process_email_task(task)
+        except Exception as e:
+            print(f"❌ Queue worker error: {e}")
+            time.sleep(POLL_INTERVAL)
+    print("Email queue worker stopped")
+
 def start():
     """Start the background email worker thread"""
     global _worker_thread, _running
+    if BACKEND != 'memory':
+        print(f"ℹ️  Task queue backend is '{BACKEND}'; run worker.py to send emails")
+        return
     if _running:
         print("⚠️  Task queue already running")
         return
@@ -101,12 +401,33 @@ def stop():
 
     print("Stopping task queue...")
     _running = False
-    _task_queue.put(None)  # Shutdown signal
-    if _worker_thread:
-        _worker_thread.join(timeout=5)
+    if BACKEND == 'memory':
+        _task_queue.put(None)  # Shutdown signal
+        if _worker_thread:
+            _worker_thread.join(timeout=5)
     print("Task queue stopped")
 
-def enqueue_signing_link(recipient_email, recipient_name, signing_link, doc_name, sender_email):
+def _enqueue(task):
+    """Hand a task to the configured backend"""
+    with tracing.span('queue.enqueue', kind=tracing.PRODUCER, attributes={
+        'email.task_type': task.task_type, 'document.id': task.document_id, 'queue.backend': BACKEND,
+    }):
+        task.traceparent = tracing.current_traceparent()
+        _log_delivery(task, 'queued')
+        if BACKEND == 'memory':
+            _task_queue.put(task)
+            return
+
+        db = SessionLocal()
+        try:
+            db.add(EmailJob(task_type=task.task_type, payload=task.to_payload(), pdf_data=task.pdf_data,
+                            sender_key=task.sender_key))
+            db.commit()
+        finally:
+            db.close()
+
+def enqueue_signing_link(recipient_email, recipient_name, signing_link, doc_name, sender_email,
+                         user_id=None, document_id=None):
     """Queue a signing link email to be sent asynchronously"""
     task = EmailTask(
         task_type='signing_link',
@@ -114,23 +435,75 @@ def enqueue_signing_link(recipient_email, recipient_name, signing_link, doc_name
         recipient_name=recipient_name,
         signing_link=signing_link,
         doc_name=doc_name,
-        sender_email=sender_email
+        sender_email=sender_email,
+        user_id=user_id,
+        document_id=document_id
     )
-    _task_queue.put(task)
+    _enqueue(task)
     print(f"📨 Queued signing link email for {recipient_email}")
 
-def enqueue_final_pdf(all_emails, doc_name, pdf_data, sender_email):
+def enqueue_reminder(recipient_email, recipient_name, signing_link, doc_name, sender_email, expires_on,
+                     user_id=None, document_id=None):
+    """Queue a reminder for a signing link that has not been used yet"""
+    task = EmailTask(
+        task_type='reminder',
+        recipient_email=recipient_email,
+        recipient_name=recipient_name,
+        signing_link=signing_link,
+        doc_name=doc_name,
+        sender_email=sender_email,
+        user_id=user_id,
+        document_id=document_id,
+        expires_on=expires_on
+    )
+    _enqueue(task)
+    print(f"📨 Queued signing reminder for {recipient_email}")
+
+def enqueue_final_pdf(all_emails, doc_name, pdf_data, sender_email, user_id=None, document_id=None):
     """Queue a final PDF email to be sent asynchronously"""
     task = EmailTask(
         task_type='final_pdf',
         all_emails=all_emails,
         doc_name=doc_name,
         pdf_data=pdf_data,
-        sender_email=sender_email
+        sender_email=sender_email,
+        user_id=user_id,
+        document_id=document_id
     )
-    _task_queue.put(task)
+    _enqueue(task)
     print(f"📨 Queued final PDF email for {len(all_emails)} recipients")
 
 def get_queue_size():
     """Get current queue size"""
-    return _task_queue.qsize()
+    if BACKEND == 'memory':
+        return _task_queue.qsize()
+
+    db = SessionLocal()
+    try:
+        return db.query(EmailJob).filter(EmailJob.status.in_(('pending', 'processing'))).count()
+    finally:
+        db.close()
+
+def discard_pending():
+    """Drop every email not yet picked up (benchmarks and maintenance); returns the count"""
+    if BACKEND == 'memory':
+        return _task_queue.clear()
+
+    db = SessionLocal()
+    try:
+        dropped = db.query(EmailJob).filter(EmailJob.status == 'pending').delete(synchronize_session=False)
+        db.commit()
+        return dropped
+    finally:
+        db.close()
+
+def retry_after_for(count):
+    """Seconds to wait before queuing ``count`` more emails, or 0 if there is room.
+
+    A batch larger than the high-water mark is admitted into an empty queue.
+    """
+    if get_queue_size() + min(count, HIGH_WATER) > HIGH_WATER:
+        return FULL_RETRY_AFTER
+    return 0
+
+metrics.register_gauge('task_queue_depth', 'Email tasks waiting to be sent', get_queue_size)
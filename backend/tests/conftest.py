@@ -0,0 +1,49 @@
+"""Shared fixtures: the app on a throwaway SQLite database in a temp directory"""
+import os
+import sys
+import tempfile
+import uuid
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_WORK_DIR = tempfile.mkdtemp(prefix='docsigner-tests-')
+
+# Read at import by database.py, so set before the app is imported
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_WORK_DIR, 'test.db')}"
+sys.path.insert(0, BACKEND_DIR)
+
+AUTH = {'Authorization': 'Bearer demo-token'}
+
+@pytest.fixture(scope='session')
+def app():
+    # uploads/ and data/ are relative to the working directory
+    os.chdir(_WORK_DIR)
+    from app import create_app
+    return create_app(start_queue=False)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def register_user(client):
+    """Register a fresh user; returns their Authorization headers"""
+    response = client.post('/api/register', json={'email': f'{uuid.uuid4().hex[:8]}@example.com', 'password': 'pw'})
+    assert response.status_code == 200
+    return {'Authorization': f"Bearer {response.json['token']}"}
+
+def blank_page(number=1):
+    """A small white page image, as the editor stores pages"""
+    import base64
+    from io import BytesIO
+    from PIL import Image
+    buf = BytesIO()
+    Image.new('RGB', (60, 80), 'white').save(buf, format='PNG')
+    return {'pageNumber': number, 'width': 60, 'height': 80,
+            'imageUrl': 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode()}
+
+def create_document(client, name, headers=AUTH, **fields):
+    """POST a new document (owned by the demo user unless ``headers`` say otherwise); returns its id"""
+    doc_id = uuid.uuid4().hex[:12]
+    response = client.post('/api/documents', headers=headers, json={'id': doc_id, 'name': name, **fields})
+    assert response.status_code == 200
+    return doc_id
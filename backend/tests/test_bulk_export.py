@@ -0,0 +1,37 @@
+import json
+import zipfile
+from io import BytesIO
+from conftest import AUTH, blank_page, create_document, register_user
+import bulk_export
+
+def _manifest(response):
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(BytesIO(response.get_data()))
+    return json.loads(archive.read(bulk_export.MANIFEST_NAME)), archive.namelist()
+
+def test_export_streams_only_the_callers_completed_documents(client):
+    owner = register_user(client)
+    other = register_user(client)
+    completed = create_document(client, 'Done.pdf', headers=owner, pages=[blank_page()], status='completed')
+    create_document(client, 'Draft.pdf', headers=owner, pages=[blank_page()])
+    create_document(client, 'Theirs.pdf', headers=other, pages=[blank_page()], status='completed')
+
+    manifest, names = _manifest(client.get('/api/documents/export', headers=owner))
+    assert [entry['documentId'] for entry in manifest['documents']] == [completed]
+    assert sorted(names) == sorted([manifest['documents'][0]['file'], bulk_export.MANIFEST_NAME])
+
+def test_export_ticket_is_single_use_and_scoped_to_its_user(client):
+    owner = register_user(client)
+    mine = create_document(client, 'Mine.pdf', headers=owner, pages=[blank_page()], status='completed')
+    create_document(client, 'Demo.pdf', headers=AUTH, pages=[blank_page()], status='completed')
+
+    ticket = client.post('/api/downloads/ticket', headers=owner, json={'path': '/api/documents/export'}).json['ticket']
+    manifest, _ = _manifest(client.get(f'/api/documents/export?ticket={ticket}'))
+    assert [entry['documentId'] for entry in manifest['documents']] == [mine]
+    assert client.get(f'/api/documents/export?ticket={ticket}').status_code == 401
+
+def test_export_requires_a_ticket_for_this_path(client):
+    doc_id = create_document(client, 'Other.pdf', pages=[blank_page()])
+    ticket = client.post('/api/downloads/ticket', headers=AUTH, json={'path': f'/api/documents/{doc_id}/pdf'}).json['ticket']
+    assert client.get(f'/api/documents/export?ticket={ticket}').status_code == 401
+    assert client.get('/api/documents/export?token=demo-token').status_code == 401
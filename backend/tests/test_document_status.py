@@ -0,0 +1,32 @@
+from conftest import AUTH, create_document, register_user
+import app as app_module
+
+def test_other_users_documents_and_tokens_are_left_out(client):
+    mine = create_document(client, 'Mine')
+    other = register_user(client)
+    theirs = create_document(client, 'Theirs', headers=other)
+    response = client.post(f'/api/documents/{theirs}/send-for-signature', headers=other, json={
+        'recipients': [{'email': 's@example.com', 'name': 'S'}],
+    })
+    their_token = response.json['signatureRequests'][0]['accessToken']
+
+    response = client.post('/api/documents/status', headers=AUTH,
+                           json={'ids': [mine, theirs], 'tokens': [their_token]})
+    assert response.status_code == 200
+    assert [d['documentId'] for d in response.json['documents']] == [mine]
+    assert response.json['tokens'] == {}
+    assert response.json['notFound'] == [theirs, their_token]
+
+def test_oversized_batch_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'STATUS_BATCH_MAX', 3)
+    response = client.post('/api/documents/status', headers=AUTH,
+                           json={'ids': ['a', 'b'], 'tokens': ['c', 'd']})
+    assert response.status_code == 400
+    # Duplicates are collapsed before the limit is applied
+    response = client.post('/api/documents/status', headers=AUTH,
+                           json={'ids': ['a', 'a', 'b'], 'tokens': ['c', 'c']})
+    assert response.status_code == 200
+
+def test_default_batch_limit(client):
+    ids = [f'id-{i}' for i in range(app_module.STATUS_BATCH_MAX + 1)]
+    assert client.post('/api/documents/status', headers=AUTH, json={'ids': ids}).status_code == 400
@@ -0,0 +1,61 @@
+import time
+import uuid
+from conftest import create_document, register_user
+import rate_limit
+import task_queue
+
+def _key():
+    return f'test:{uuid.uuid4().hex}'
+
+def _user_id(headers):
+    from app import get_user_from_token
+    return get_user_from_token(headers['Authorization'].replace('Bearer ', '')).id
+
+def test_burst_is_allowed_then_refused_until_refilled(app):
+    key = _key()
+    # 60 per minute is one token per second
+    assert rate_limit.take(key, 10, rate_per_minute=60, burst=10, now=1000.0) == 0
+    assert rate_limit.take(key, 1, rate_per_minute=60, burst=10, now=1000.0) == 1
+    assert rate_limit.take(key, 3, rate_per_minute=60, burst=10, now=1000.5) == 3
+    assert rate_limit.take(key, 3, rate_per_minute=60, burst=10, now=1003.0) == 0
+    assert rate_limit.take(key, 1, rate_per_minute=60, burst=10, now=1003.0) == 1
+
+def test_refill_stops_at_the_burst(app):
+    key = _key()
+    assert rate_limit.take(key, 10, rate_per_minute=60, burst=10, now=0.0) == 0
+    assert rate_limit.take(key, 10, rate_per_minute=60, burst=10, now=3600.0) == 0
+    assert rate_limit.take(key, 1, rate_per_minute=60, burst=10, now=3600.0) == 1
+
+def test_take_above_the_burst_waits_for_a_full_bucket_and_leaves_debt(app):
+    key = _key()
+    assert rate_limit.take(key, 1, rate_per_minute=60, burst=10, now=0.0) == 0
+    # Needs a full bucket: 1 token short
+    assert rate_limit.take(key, 25, rate_per_minute=60, burst=10, now=0.0) == 1
+    assert rate_limit.take(key, 25, rate_per_minute=60, burst=10, now=1.0) == 0
+    # 15 tokens of debt plus the one wanted, 5 already repaid
+    assert rate_limit.take(key, 1, rate_per_minute=60, burst=10, now=6.0) == 11
+
+def test_send_past_the_limit_gets_429_with_retry_after(client):
+    owner = register_user(client)
+    doc_id = create_document(client, 'Rate limited', headers=owner)
+    user_id = _user_id(owner)
+    # Spend the whole burst just now
+    rate_limit.take(f'send:{user_id}', rate_limit.SEND_BURST, now=time.time())
+    response = client.post(f'/api/documents/{doc_id}/send-for-signature', headers=owner, json={
+        'recipients': [{'email': 'x@example.com', 'name': 'X'}],
+    })
+    assert response.status_code == 429
+    expected = max(1, round(60 / rate_limit.SEND_RATE_PER_MINUTE))
+    assert response.headers['Retry-After'] == str(expected)
+    assert response.json['retryAfter'] == expected
+
+def test_queue_high_water_mark(monkeypatch):
+    monkeypatch.setattr(task_queue, 'HIGH_WATER', 5)
+    monkeypatch.setattr(task_queue, 'get_queue_size', lambda: 5)
+    assert task_queue.retry_after_for(1) == task_queue.FULL_RETRY_AFTER
+    monkeypatch.setattr(task_queue, 'get_queue_size', lambda: 4)
+    assert task_queue.retry_after_for(1) == 0
+    # A batch above the mark is admitted into an empty queue only
+    assert task_queue.retry_after_for(50) == task_queue.FULL_RETRY_AFTER
+    monkeypatch.setattr(task_queue, 'get_queue_size', lambda: 0)
+    assert task_queue.retry_after_for(50) == 0
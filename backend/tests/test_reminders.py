@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from conftest import AUTH, create_document
+
+def test_expired_requests_leave_pending_and_block_completion(client):
+    import reminders
+    doc_id = create_document(client, 'Expiring contract')
+    response = client.post(f'/api/documents/{doc_id}/send-for-signature', headers=AUTH, json={'recipients': [
+        {'email': 'a@example.com', 'name': 'A'},
+        {'email': 'b@example.com', 'name': 'B'},
+        {'email': 'c@example.com', 'name': 'C'},
+    ]})
+    tokens = [r['accessToken'] for r in response.json['signatureRequests']]
+    assert client.get(f'/api/sign/{tokens[0]}').status_code == 200  # viewed
+
+    far_future = datetime.utcnow() + timedelta(days=reminders.LINK_TTL_DAYS + 1)
+    _, expired = reminders.run_once(now=far_future)
+    assert expired >= 3
+
+    progress = client.get(f'/api/documents/{doc_id}/signing-progress', headers=AUTH).json
+    assert progress['total'] == 3
+    assert progress['expired'] == 3
+    assert progress['viewed'] == 0
+    assert progress['pending'] == 0
+    assert progress['canComplete'] is False
+
+def _sent_document(client, name):
+    recipient = {'id': 'r1', 'name': 'A', 'email': 'a@example.com'}
+    fields = [{'id': 'f1', 'type': 'TEXT', 'pageNumber': 1, 'recipientId': 'r1', 'value': None}]
+    doc_id = create_document(client, name, fields=fields, recipients=[recipient])
+    response = client.post(f'/api/documents/{doc_id}/send-for-signature', headers=AUTH, json={
+        'recipients': [{'email': 'a@example.com', 'name': 'A'}],
+    })
+    return doc_id, response.json['signatureRequests'][0]['accessToken']
+
+def _expire_now(token):
+    from sqlalchemy import update
+    from database import SessionLocal
+    from models import SignatureRequest
+    db = SessionLocal()
+    db.execute(update(SignatureRequest).where(SignatureRequest.access_token == token)
+               .values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    db.close()
+
+def _assert_untouched(client, doc_id):
+    doc = client.get(f'/api/documents/{doc_id}', headers=AUTH).json
+    assert doc['fields'][0]['value'] is None
+    progress = client.get(f'/api/documents/{doc_id}/signing-progress', headers=AUTH).json
+    assert (progress['signed'], progress['pending']) == (0, 1)
+
+def test_submit_of_expired_token_is_rejected(client):
+    doc_id, token = _sent_document(client, 'Expired link')
+    _expire_now(token)
+    response = client.post(f'/api/sign/{token}/submit', json={'fields': [{'id': 'f1', 'value': 'late'}]})
+    assert response.status_code == 401
+    _assert_untouched(client, doc_id)
+
+def test_submit_expiring_after_token_lookup_is_rejected(client, monkeypatch):
+    import app as app_module
+    doc_id, token = _sent_document(client, 'Expires mid-submit')
+    looked_up = app_module.get_signature_request_by_token_db(token)
+    _expire_now(token)
+    # The lookup saw a live link; the transaction's own check must still refuse it
+    monkeypatch.setattr(app_module, 'get_signature_request_by_token_db', lambda access_token: looked_up)
+    response = client.post(f'/api/sign/{token}/submit', json={'fields': [{'id': 'f1', 'value': 'late'}]})
+    assert response.status_code == 401
+    _assert_untouched(client, doc_id)
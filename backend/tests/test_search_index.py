@@ -0,0 +1,21 @@
+from conftest import AUTH, create_document
+
+def _search(client, query):
+    response = client.get('/api/documents/search', headers=AUTH, query_string={'q': query})
+    assert response.status_code == 200
+    return response.json
+
+def test_search_matches_document_name(client):
+    doc_id = create_document(client, 'Quarterly lease renewal')
+    result = _search(client, 'lease')
+    assert [hit['id'] for hit in result['results']] == [doc_id]
+
+def test_query_matching_only_owner_token_returns_nothing(client):
+    import search_index
+    from app import get_user_from_token
+    create_document(client, 'Supplier agreement')
+    owner = search_index.owner_token(get_user_from_token('demo-token').id)
+    for query in (owner, owner[:1]):
+        result = _search(client, query)
+        assert result['total'] == 0
+        assert result['results'] == []
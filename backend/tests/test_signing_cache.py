@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from conftest import AUTH, create_document
+import signing_cache
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    with signing_cache._lock:
+        for token in list(signing_cache._entries):
+            signing_cache._remove(token)
+    yield
+
+def _store(token, document_id='d1', signer_email='a@example.com', body=b'{}', state=('viewed', 1)):
+    signing_cache.store(token, body, document_id, signer_email, None, state,
+                        signing_cache.generation(document_id, signer_email))
+
+def test_hit_needs_matching_state():
+    _store('t1')
+    assert signing_cache.get('t1', ('viewed', 1)) == b'{}'
+    # A write elsewhere changed the version: the entry misses and is dropped
+    assert signing_cache.get('t1', ('viewed', 2)) is None
+    assert signing_cache.get('t1', ('viewed', 1)) is None
+
+def test_invalidate_touches_only_affected_entries():
+    _store('t1', document_id='d1', signer_email='a@example.com')
+    _store('t2', document_id='d1', signer_email='b@example.com')
+    _store('t3', document_id='d2', signer_email='a@example.com')
+    _store('t4', document_id='d3', signer_email='c@example.com')
+    signing_cache.invalidate('d1')
+    assert set(signing_cache._entries) == {'t3', 't4'}
+    signing_cache.invalidate(signer_email='a@example.com')
+    assert set(signing_cache._entries) == {'t4'}
+    assert signing_cache._tokens_by_document == {'d3': {'t4'}}
+    assert signing_cache._tokens_by_signer == {'c@example.com': {'t4'}}
+
+def test_view_rendered_across_an_invalidation_is_not_stored():
+    ticket = signing_cache.generation('d1', 'a@example.com')
+    signing_cache.invalidate('d1')
+    signing_cache.store('t1', b'{}', 'd1', 'a@example.com', None, ('viewed', 1), ticket)
+    assert 't1' not in signing_cache._entries
+
+def test_byte_budget_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(signing_cache, 'MAX_BYTES', 400)
+    for token in ('t1', 't2', 't3'):
+        _store(token, document_id=token, body=b'x' * 100)
+    signing_cache.get('t1', ('viewed', 1))  # t2 is now the least recently used
+    _store('t4', document_id='t4', body=b'x' * 100)
+    _store('t5', document_id='t5', body=b'x' * 100)
+    assert list(signing_cache._entries) == ['t3', 't1', 't4', 't5']
+    assert signing_cache.cached_bytes() == 400
+    assert 't2' not in signing_cache._tokens_by_document
+
+def _sent_link(client):
+    recipient = {'id': 'r1', 'name': 'A', 'email': 'cache-signer@example.com'}
+    fields = [{'id': 'f1', 'type': 'TEXT', 'pageNumber': 1, 'recipientId': 'r1', 'value': None}]
+    doc_id = create_document(client, 'Cached view', fields=fields, recipients=[recipient])
+    response = client.post(f'/api/documents/{doc_id}/send-for-signature', headers=AUTH, json={
+        'recipients': [{'email': recipient['email'], 'name': 'A'}],
+    })
+    return doc_id, response.json['signatureRequests'][0]['accessToken']
+
+def test_repeat_open_is_served_from_cache(client):
+    _, token = _sent_link(client)
+    first = client.get(f'/api/sign/{token}')
+    assert token in signing_cache._entries
+    assert client.get(f'/api/sign/{token}').get_data() == first.get_data()
+
+def test_submit_drops_the_view(client):
+    _, token = _sent_link(client)
+    client.get(f'/api/sign/{token}')
+    client.post(f'/api/sign/{token}/submit', json={'fields': [{'id': 'f1', 'value': 'Signed'}]})
+    assert token not in signing_cache._entries
+    assert client.get(f'/api/sign/{token}').json['fields'][0]['value'] == 'Signed'
+
+def test_document_update_drops_the_view(client):
+    doc_id, token = _sent_link(client)
+    client.get(f'/api/sign/{token}')
+    client.put(f'/api/documents/{doc_id}', json={'name': 'Renamed'})
+    assert token not in signing_cache._entries
+    assert client.get(f'/api/sign/{token}').json['name'] == 'Renamed'
+
+def test_expiry_in_another_process_is_seen(client):
+    from database import SessionLocal
+    from models import SignatureRequest
+    _, token = _sent_link(client)
+    client.get(f'/api/sign/{token}')
+    # As reminders.py in worker.py would: the row changes, this process's cache is not told
+    db = SessionLocal()
+    db.execute(update(SignatureRequest).where(SignatureRequest.access_token == token)
+               .values(status='expired', expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    db.close()
+    assert client.get(f'/api/sign/{token}').status_code == 401
+
+def test_document_write_in_another_process_is_seen(client):
+    from database import SessionLocal
+    from models import Document
+    doc_id, token = _sent_link(client)
+    client.get(f'/api/sign/{token}')
+    db = SessionLocal()
+    doc = db.query(Document).filter(Document.id == doc_id).first()
+    doc.name = 'Edited by another worker'
+    db.commit()
+    db.close()
+    assert client.get(f'/api/sign/{token}').json['name'] == 'Edited by another worker'
@@ -0,0 +1,84 @@
+import threading
+from conftest import AUTH, create_document
+
+def _fields():
+    # Legacy layout: no recipients on the document, so signers cannot be matched to fields
+    return [{'id': f'f{i}', 'type': 'TEXT', 'pageNumber': 1, 'value': None} for i in range(2)]
+
+def test_concurrent_unmatched_signers_keep_each_others_values(app):
+    doc_id = create_document(app.test_client(), 'Legacy agreement', fields=_fields(), recipients=[])
+    response = app.test_client().post(f'/api/documents/{doc_id}/send-for-signature', headers=AUTH, json={
+        'recipients': [{'email': 'a@example.com', 'name': 'A'}, {'email': 'b@example.com', 'name': 'B'}],
+    })
+    tokens = [r['accessToken'] for r in response.json['signatureRequests']]
+    views = [app.test_client().get(f'/api/sign/{token}').json for token in tokens]
+
+    barrier = threading.Barrier(len(tokens))
+    statuses = []
+
+    def submit(index):
+        # Each signer fills one field and sends back the blank it was served for the other
+        fields = [{'id': f['id'], 'value': f'signer {index}' if f['id'] == f'f{index}' else None}
+                  for f in views[index]['fields']]
+        barrier.wait()
+        response = app.test_client().post(f'/api/sign/{tokens[index]}/submit', json={
+            'fields': fields, 'version': views[index]['version'],
+        })
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(tokens))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200, 200]
+
+    doc = app.test_client().get(f'/api/documents/{doc_id}', headers=AUTH).json
+    assert {f['id']: f['value'] for f in doc['fields']} == {'f0': 'signer 0', 'f1': 'signer 1'}
+    assert doc['status'] == 'completed'
+
+def test_concurrent_submits_of_one_token_sign_once(app, monkeypatch):
+    import events
+    published = []
+    monkeypatch.setattr(events, 'publish', lambda user_id, event_type, data: published.append(event_type))
+
+    recipient = {'id': 'r1', 'name': 'A', 'email': 'a@example.com'}
+    fields = [{'id': 'sig', 'type': 'TEXT', 'pageNumber': 1, 'recipientId': 'r1', 'value': None}]
+    doc_id = create_document(app.test_client(), 'Single signer', fields=fields, recipients=[recipient])
+    response = app.test_client().post(f'/api/documents/{doc_id}/send-for-signature', headers=AUTH, json={
+        'recipients': [{'email': 'a@example.com', 'name': 'A'}],
+    })
+    token = response.json['signatureRequests'][0]['accessToken']
+    version = app.test_client().get(f'/api/sign/{token}').json['version']
+
+    barrier = threading.Barrier(2)
+    outcomes = {}
+
+    def submit(value):
+        barrier.wait()
+        response = app.test_client().post(f'/api/sign/{token}/submit', json={
+            'fields': [{'id': 'sig', 'value': value}], 'version': version,
+        })
+        outcomes[value] = response.status_code
+
+    threads = [threading.Thread(target=submit, args=(value,)) for value in ('first', 'second')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes.values()) == [200, 409]
+    winner = next(value for value, status in outcomes.items() if status == 200)
+
+    doc = app.test_client().get(f'/api/documents/{doc_id}', headers=AUTH).json
+    assert doc['fields'][0]['value'] == winner
+    progress = app.test_client().get(f'/api/documents/{doc_id}/signing-progress', headers=AUTH).json
+    assert progress['signed'] == 1
+    assert published.count('signature.signed') == 1
+    assert published.count('document.completed') == 1
+
+    # A later resubmit is refused and changes nothing
+    response = app.test_client().post(f'/api/sign/{token}/submit', json={'fields': [{'id': 'sig', 'value': 'late'}]})
+    assert response.status_code == 409
+    doc = app.test_client().get(f'/api/documents/{doc_id}', headers=AUTH).json
+    assert doc['fields'][0]['value'] == winner
+    assert published.count('document.completed') == 1
@@ -0,0 +1,47 @@
+import time
+from conftest import AUTH, blank_page, create_document, register_user
+import tickets
+
+def _download_ticket(client, path, headers=AUTH):
+    response = client.post('/api/downloads/ticket', headers=headers, json={'path': path})
+    assert response.status_code == 200
+    return response.json['ticket']
+
+def test_ticket_is_bound_to_purpose_and_resource():
+    ticket = tickets.issue(7, 'download', '/api/documents/a/pdf')
+    assert tickets.redeem(ticket, 'download', '/api/documents/a/pdf') == 7
+    assert tickets.redeem(ticket, 'download', '/api/documents/b/pdf') is None
+    assert tickets.redeem(ticket, 'events') is None
+
+def test_tampered_or_expired_ticket_is_refused(monkeypatch):
+    ticket = tickets.issue(7, 'events')
+    payload, _, signature = ticket.partition('.')
+    assert tickets.redeem(f'{payload}.{"0" * len(signature)}', 'events') is None
+    monkeypatch.setattr(time, 'time', lambda: 2 ** 40)
+    assert tickets.redeem(ticket, 'events') is None
+
+def test_single_use_ticket_is_redeemed_once(app):
+    ticket = tickets.issue(7, 'download', '/api/documents/export')
+    assert tickets.redeem(ticket, 'download', '/api/documents/export', once=True) == 7
+    assert tickets.redeem(ticket, 'download', '/api/documents/export', once=True) is None
+
+def test_pdf_ticket_opens_only_its_document_once(client):
+    doc_a = create_document(client, 'A.pdf', pages=[blank_page()])
+    doc_b = create_document(client, 'B.pdf', pages=[blank_page()])
+    ticket = _download_ticket(client, f'/api/documents/{doc_a}/pdf')
+    assert client.get(f'/api/documents/{doc_b}/pdf?ticket={ticket}').status_code == 401
+    response = client.get(f'/api/documents/{doc_a}/pdf?ticket={ticket}')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert client.get(f'/api/documents/{doc_a}/pdf?ticket={ticket}').status_code == 401
+
+def test_another_users_ticket_cannot_fetch_a_document(client):
+    doc_id = create_document(client, 'Private.pdf', pages=[blank_page()])
+    intruder = register_user(client)
+    ticket = _download_ticket(client, f'/api/documents/{doc_id}/pdf', headers=intruder)
+    assert client.get(f'/api/documents/{doc_id}/pdf?ticket={ticket}').status_code == 403
+
+def test_bearer_token_in_query_is_not_accepted(client):
+    doc_id = create_document(client, 'Token.pdf', pages=[blank_page()])
+    assert client.get(f'/api/documents/{doc_id}/pdf?token=demo-token').status_code == 401
+    assert client.get(f'/api/documents/{doc_id}/pdf', headers=AUTH).status_code == 200
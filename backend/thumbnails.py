@@ -0,0 +1,117 @@
+"""Page thumbnails with an LRU-capped disk cache
+
+Thumbnails are rendered with Pillow on first request and stored as
+``<page content hash>-<width>.jpg``. A page whose image changes gets a new
+hash, so stale thumbnails are never served and need no explicit
+invalidation. They simply age out of the cache. Hits touch the file's
+mtime; once the cache passes THUMBNAIL_CACHE_MAX_MB, the least recently
+used files are deleted.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from io import BytesIO
+import metrics
+from page_render import decode_data_url
+
+CACHE_DIR = os.getenv('THUMBNAIL_CACHE_DIR', 'data/thumbnails')
+CACHE_MAX_BYTES = int(os.getenv('THUMBNAIL_CACHE_MAX_MB', '100')) * 1024 * 1024
+DEFAULT_WIDTH = 200
+MIN_WIDTH = 50
+MAX_WIDTH = 800
+JPEG_QUALITY = 75
+
+_lock = threading.Lock()
+_cache_bytes = None  # Estimated cache size; rescanned on eviction
+
+def clamp_width(width):
+    return max(MIN_WIDTH, min(MAX_WIDTH, width or DEFAULT_WIDTH))
+
+def page_hash(image_url):
+    """Content hash of a page image (its data URL)"""
+    return hashlib.sha256(image_url.encode()).hexdigest()[:32]
+
+def get_thumbnail(digest, width, load_image_url):
+    """JPEG bytes of the page with content hash ``digest`` scaled to ``width`` px.
+
+    ``load_image_url()`` is only called on a cache miss; None if it returns None.
+    """
+    path = os.path.join(CACHE_DIR, f'{digest}-{width}.jpg')
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.utime(path)  # Mark as recently used
+        metrics.inc('thumbnail_cache_total', result='hit')
+        return data
+    except FileNotFoundError:
+        pass
+
+    metrics.inc('thumbnail_cache_total', result='miss')
+    image_url = load_image_url()
+    if image_url is None:
+        return None
+    data = render(image_url, width)
+    _store(path, data)
+    return data
+
+def render(image_url, width):
+    from PIL import Image
+
+    img = Image.open(BytesIO(decode_data_url(image_url)))
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # Flatten transparency onto white; JPEG has no alpha channel
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, 'white')
+        background.paste(img, mask=img.getchannel('A'))
+        img = background
+    else:
+        img = img.convert('RGB')
+    img.thumbnail((width, width * 4))
+    buf = BytesIO()
+    img.save(buf, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return buf.getvalue()
+
+def _store(path, data):
+    global _cache_bytes
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write-then-rename so concurrent readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+    with _lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, _, size in _entries())
+        else:
+            _cache_bytes += len(data)
+        if _cache_bytes > CACHE_MAX_BYTES:
+            _cache_bytes = _evict()
+
+def _entries():
+    """(mtime, path, size) of every cached thumbnail"""
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.endswith('.jpg'):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, entry.path, st.st_size))
+    return entries
+
+def _evict():
+    """Delete least recently used thumbnails down to 90% of the cap; return the new size"""
+    entries = sorted(_entries())
+    total = sum(size for _, _, size in entries)
+    target = CACHE_MAX_BYTES * 0.9
+    for _, path, size in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Another process evicted it
+        total -= size
+    return total
@@ -0,0 +1,73 @@
+"""Short-lived signed tickets that stand in for the bearer token in URLs
+
+EventSource and plain download links cannot send headers. Clients exchange
+their bearer token for a ticket and put that in the URL instead, so the token
+never reaches access logs, browser history or HTTP caches. A ticket names
+its purpose and, for downloads, the path it opens; a stream ticket cannot
+fetch a document and a ticket for one download cannot fetch another.
+
+Download tickets are single use. Redeeming one inserts its nonce into the
+``redeemed_tickets`` table, which every process shares, so a second redeem
+fails even in another Gunicorn worker. Tickets are HMAC-signed with
+TICKET_SECRET (EVENTS_TICKET_SECRET is still honoured), which defaults to a
+random key made at import; with ``preload_app`` every forked Gunicorn worker
+shares it, but separate hosts must set it.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+
+# Seconds a client has to use a ticket after fetching it
+TICKET_TTL = 60
+_SECRET = (os.getenv('TICKET_SECRET') or os.getenv('EVENTS_TICKET_SECRET') or secrets.token_hex(32)).encode()
+
+def _sign(payload):
+    return hmac.new(_SECRET, payload.encode(), hashlib.sha256).hexdigest()
+
+def issue(user_id, purpose, resource=None):
+    """Ticket for ``user_id`` to use ``resource`` for ``purpose``, valid for TICKET_TTL seconds"""
+    body = [user_id, purpose, resource, int(time.time()) + TICKET_TTL, secrets.token_hex(8)]
+    payload = base64.urlsafe_b64encode(json.dumps(body).encode()).decode()
+    return f"{payload}.{_sign(payload)}"
+
+def redeem(ticket, purpose, resource=None, once=False):
+    """User id of a valid, unexpired ticket for ``purpose``/``resource``, else None
+
+    With ``once`` the ticket is consumed, and later redeems return None.
+    """
+    payload, _, signature = (ticket or '').partition('.')
+    if not payload or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        user_id, ticket_purpose, ticket_resource, expires, nonce = json.loads(base64.urlsafe_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    if ticket_purpose != purpose or ticket_resource != resource or expires < time.time():
+        return None
+    if once and not _consume(nonce, expires):
+        return None
+    return user_id
+
+def _consume(nonce, expires):
+    """Record ``nonce`` as used; False if it already was"""
+    from database import SessionLocal
+    from models import RedeemedTicket
+    db = SessionLocal()
+    try:
+        # Expired tickets fail before reaching here, so their rows can go
+        db.query(RedeemedTicket).filter(RedeemedTicket.expires_at < datetime.utcnow()) \
+            .delete(synchronize_session=False)
+        db.add(RedeemedTicket(nonce=nonce, expires_at=datetime.utcfromtimestamp(expires)))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+    finally:
+        db.close()
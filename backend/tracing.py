@@ -0,0 +1,314 @@
+"""Lightweight tracing from HTTP request through the task queue to SMTP
+
+Spans follow the OpenTelemetry data model. A trace starts at an incoming
+request, or continues a W3C ``traceparent`` header sent by the caller. It
+covers the request's SQL statements and PDF generation. Email tasks carry
+the traceparent of the span that queued them, so the worker's spans join
+the same trace: one ``queue.wait`` per attempt (queued or due -> picked up),
+then ``email.send`` with ``smtp.send`` inside. Queue wait and send time can
+be read per email.
+
+Controlled by env vars:
+
+- TRACE_EXPORTER: ``off`` (default), ``file`` or ``otlp``.
+- TRACE_FILE (``data/traces.jsonl``): the ``file`` exporter appends one
+  OTLP/JSON ``ExportTraceServiceRequest`` per line, the same format as the
+  OpenTelemetry Collector's file exporter.
+- OTEL_EXPORTER_OTLP_ENDPOINT (``http://localhost:4318``): the ``otlp``
+  exporter POSTs the same JSON to ``<endpoint>/v1/traces``.
+- TRACE_SAMPLE_RATE (1.0): fraction of new traces recorded. Continued
+  traces follow the caller's sampled flag.
+
+Spans are buffered and written by a background thread, so requests never
+wait on the exporter.
+"""
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import random
+import secrets
+import socket
+import threading
+import time
+import urllib.request
+from collections import deque
+
+EXPORTER = os.getenv('TRACE_EXPORTER', 'off')
+TRACE_FILE = os.getenv('TRACE_FILE', 'data/traces.jsonl')
+OTLP_ENDPOINT = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318').rstrip('/')
+SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'document-signer')
+FLUSH_INTERVAL = 1.0
+BATCH_SIZE = 512
+MAX_BUFFER = 20000
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT, PRODUCER, CONSUMER = 1, 2, 3, 4, 5
+
+_current = contextvars.ContextVar('trace_span', default=None)
+_buffer = deque(maxlen=MAX_BUFFER)
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_writer = None
+_engine_instrumented = False
+
+class Span:
+    __slots__ = ('name', 'kind', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'attributes', 'error')
+
+    def __init__(self, name, trace_id, parent_id=None, kind=INTERNAL, start_ns=None, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    @property
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, end_ns=None):
+        if self.end_ns is None:
+            self.end_ns = end_ns or time.time_ns()
+            _export(self)
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            'status': {'code': 2, 'message': self.error} if self.error else {},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+def enabled():
+    return EXPORTER != 'off'
+
+def parse_traceparent(value):
+    """(trace_id, parent span id, sampled) from a W3C traceparent, or None"""
+    parts = (value or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = int(parts[3], 16) & 1
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(sampled)
+
+def current_span():
+    return _current.get()
+
+def current_traceparent():
+    """traceparent of the active span, to hand to work done elsewhere"""
+    span = _current.get()
+    return span.traceparent if span else None
+
+def start_span(name, parent=None, kind=INTERNAL, root=False, start_ns=None, attributes=None):
+    """Start a span; the caller must end() it. Returns None when not traced.
+
+    ``parent`` is a Span or a traceparent string; by default the active span.
+    Without a parent a new trace is only started when ``root`` is set (and
+    the trace is sampled), so untraced requests create no stray spans.
+    """
+    if not enabled():
+        return None
+    if parent is None:
+        parent = _current.get()
+    if isinstance(parent, Span):
+        return Span(name, parent.trace_id, parent.span_id, kind, start_ns, attributes)
+    if isinstance(parent, str):
+        parsed = parse_traceparent(parent)
+        if parsed:
+            trace_id, parent_id, sampled = parsed
+            return Span(name, trace_id, parent_id, kind, start_ns, attributes) if sampled else None
+    if root and random.random() < SAMPLE_RATE:
+        return Span(name, secrets.token_hex(16), None, kind, start_ns, attributes)
+    return None
+
+@contextlib.contextmanager
+def span(name, parent=None, kind=INTERNAL, root=False, attributes=None):
+    """Run the block inside a span (yields the Span, or None when not traced)"""
+    s = start_span(name, parent, kind, root, attributes=attributes)
+    if s is None:
+        yield None
+        return
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+def traced(name, kind=INTERNAL):
+    """Decorator form of span() for functions called inside a trace"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind=kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_span(name, start_ns, end_ns, parent, kind=INTERNAL, attributes=None):
+    """Record a span whose timing is already known (e.g. time spent queued)"""
+    s = start_span(name, parent, kind, start_ns=start_ns, attributes=attributes)
+    if s is not None:
+        s.end(end_ns)
+    return s
+
+# ---- Export ----
+
+def _export(s):
+    _buffer.append(s)  # deque(maxlen) drops the oldest spans if the exporter falls behind
+    _ensure_writer()
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, daemon=True)
+            _writer.start()
+
+def _writer_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception as e:
+            print(f"⚠️  Trace export failed: {e}")
+
+def flush():
+    """Export everything buffered so far"""
+    with _flush_lock:
+        while _buffer:
+            batch = [_buffer.popleft() for _ in range(min(BATCH_SIZE, len(_buffer)))]
+            body = json.dumps(_request_body(batch), separators=(',', ':'))
+            if EXPORTER == 'otlp':
+                _post(body)
+            else:
+                _append(body)
+
+def _request_body(spans):
+    resource = {'service.name': SERVICE_NAME, 'host.name': socket.gethostname(), 'process.pid': os.getpid()}
+    return {'resourceSpans': [{
+        'resource': {'attributes': [_attribute(k, v) for k, v in resource.items()]},
+        'scopeSpans': [{'scope': {'name': 'document-signer.tracing'}, 'spans': [s.to_otlp() for s in spans]}],
+    }]}
+
+def _append(body):
+    directory = os.path.dirname(TRACE_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # One write() per line; O_APPEND keeps lines from concurrent processes whole
+    with open(TRACE_FILE, 'a') as f:
+        f.write(body + '\n')
+
+def _post(body):
+    req = urllib.request.Request(f'{OTLP_ENDPOINT}/v1/traces', data=body.encode(),
+                                 headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        resp.read()
+
+atexit.register(lambda: enabled() and flush())
+
+# ---- Instrumentation ----
+
+def instrument_engine(engine):
+    """A ``db.query`` span for every SQL statement run inside a trace (idempotent)"""
+    global _engine_instrumented
+    if _engine_instrumented or not enabled():
+        return
+    _engine_instrumented = True
+    from sqlalchemy import event
+    from profiling import statement_shape
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        s = start_span('db.query', kind=CLIENT, attributes={
+            'db.system': engine.dialect.name,
+            'db.statement': statement_shape(statement)[:300],
+        })
+        conn.info.setdefault('trace_spans', []).append(s)
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get('trace_spans')
+        s = spans.pop() if spans else None
+        if s is not None:
+            s.end()
+
+    @event.listens_for(engine, 'handle_error')
+    def _error(context):
+        spans = context.connection.info.get('trace_spans') if context.connection else None
+        s = spans.pop() if spans else None
+        if s is not None:
+            s.error = str(context.original_exception)
+            s.end()
+
+def init_app(app):
+    """A server span per request (continuing an incoming traceparent)"""
+    if not enabled():
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_trace():
+        if request.path == '/metrics':
+            return
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        s = start_span(f'{request.method} {route}', request.headers.get('traceparent'), SERVER, root=True,
+                       attributes={'http.method': request.method, 'http.route': route, 'http.target': request.path})
+        if s is not None:
+            g.trace_span = s
+            g.trace_token = _current.set(s)
+
+    @app.after_request
+    def _tag_response(response):
+        s = g.get('trace_span')
+        if s is not None:
+            s.set('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                s.error = f'HTTP {response.status_code}'
+            response.headers['traceparent'] = s.traceparent
+        return response
+
+    @app.teardown_request
+    def _end_trace(exception=None):
+        s = g.pop('trace_span', None)
+        if s is None:
+            return
+        if exception is not None:
+            s.error = f'{type(exception).__name__}: {exception}'
+        _current.reset(g.pop('trace_token'))
+        s.end()
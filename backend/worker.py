@@ -0,0 +1,42 @@
+"""Standalone email queue worker
+
+Drains the ``email_jobs`` table written by the web workers. Run one (or more)
+of these next to ``gunicorn -c gunicorn.conf.py wsgi:app``::
+
+    python worker.py
+
+Every email is sent here, so the queue, SMTP, reminder and archive metrics
+are served from this process on WORKER_METRICS_PORT (9101; 0 disables).
+Give each worker process its own port.
+"""
+import os
+import signal
+from dotenv import load_dotenv
+
+load_dotenv()
+os.environ.setdefault('TASK_QUEUE_BACKEND', 'database')
+
+from database import SessionLocal, engine, init_db
+import models  # noqa: F401  (registers tables with Base.metadata)
+import archive
+import metrics
+import reminders
+import task_queue
+
+def _handle_signal(signum, frame):
+    """Finish the current email, then exit"""
+    task_queue.stop()
+    archive.stop()
+    reminders.stop()
+
+if __name__ == '__main__':
+    init_db()
+    metrics.instrument_engine(engine, SessionLocal)
+    port = int(os.getenv('WORKER_METRICS_PORT', '9101'))
+    if port:
+        metrics.serve(port)
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+    archive.start()
+    reminders.start()
+    task_queue.run_worker()
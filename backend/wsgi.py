@@ -0,0 +1,16 @@
+"""WSGI entry point for production serving
+
+Run with a pre-fork server, e.g.::
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Emails are persisted to the database and sent by ``python worker.py``, which
+must run alongside the web workers.
+"""
+import os
+
+os.environ.setdefault('TASK_QUEUE_BACKEND', 'database')
+
+from app import create_app
+
+app = create_app(start_queue=False)
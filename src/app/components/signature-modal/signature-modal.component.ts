@@ -1,6 +1,7 @@
 import { Component, ElementRef, ViewChild, Output, EventEmitter, Input } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms';
+import { ApiService } from '../../services/api.service';
 
 @Component({
   selector: 'app-signature-modal',
@@ -11,6 +12,14 @@ import { FormsModule } from '@angular/forms';
       <div class="modal-content" (click)="$event.stopPropagation()">
         <h3>{{ fieldType === 'INITIALS' ? 'Add Your Initials' : 'Add Your Signature' }}</h3>
 
+        <!-- Previously used signature -->
+        <div *ngIf="savedSignature" class="saved-signature">
+          <img [src]="savedSignatureUrl" alt="Saved signature" class="preview-image">
+          <button (click)="useSaved()" class="primary">
+            Use saved {{ fieldType === 'INITIALS' ? 'initials' : 'signature' }}
+          </button>
+        </div>
+
         <!-- Tabs -->
         <div class="tabs">
           <button
@@ -277,6 +286,23 @@ import { FormsModule } from '@angular/forms';
       margin: 0 auto;
     }
 
+    .saved-signature {
+      display: flex;
+      align-items: center;
+      justify-content: space-between;
+      gap: 12px;
+      margin-bottom: 16px;
+      padding: 12px;
+      border: 1px solid #E5E5E5;
+      border-radius: 4px;
+      background: #F7F7F7;
+    }
+
+    .saved-signature .preview-image {
+      max-height: 60px;
+      margin: 0;
+    }
+
     /* Type Mode */
     .type-controls {
       display: flex;
@@ -368,6 +394,8 @@ export class SignatureModalComponent {
   @Output() signatureSaved = new EventEmitter<string>();
   @Output() closed = new EventEmitter<void>();
   @Input() fieldType: 'SIGNATURE' | 'INITIALS' = 'SIGNATURE';
+  /** Reference to the signer's stored image of this type (/api/signatures/<hash>.png) */
+  @Input() savedSignature?: string;
 
   mode: 'draw' | 'upload' | 'type' = 'draw';
   uploadedImage: string | null = null;
@@ -388,6 +416,8 @@ export class SignatureModalComponent {
     script: "80px 'Homemade Apple', cursive"
   };
 
+  constructor(private apiService: ApiService) {}
+
   ngAfterViewInit() {
     const canvas = this.canvasRef.nativeElement;
     const ctx = canvas.getContext('2d');
@@ -490,6 +520,16 @@ export class SignatureModalComponent {
     this.signatureSaved.emit(dataUrl);
   }
 
+  get savedSignatureUrl(): string {
+    return this.savedSignature ? this.apiService.resolveAssetUrl(this.savedSignature) : '';
+  }
+
+  useSaved() {
+    if (this.savedSignature) {
+      this.signatureSaved.emit(this.savedSignature);
+    }
+  }
+
   saveUpload() {
     if (this.uploadedImage) {
       this.signatureSaved.emit(this.uploadedImage);
@@ -1,4 +1,4 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, NgZone, OnDestroy, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { Router } from '@angular/router';
 import { ApiService } from '../services/api.service';
@@ -12,10 +12,15 @@ import { DocumentState, DocumentType } from '../models/document.model';
   templateUrl: './dashboard.html',
   styleUrl: './dashboard.css'
 })
-export class DashboardComponent implements OnInit {
+export class DashboardComponent implements OnInit, OnDestroy {
   documents: DocumentState[] = [];
   userEmail: string = '';
   activeTab: 'documents' | 'templates' = 'documents';
+  private events?: EventSource;
+  private reconnectTimer?: ReturnType<typeof setTimeout>;
+  private destroyed = false;
+  // Object URLs of first-page previews, keyed by document id and version
+  private thumbnails = new Map<string, string>();
 
   stats = {
     total: 0,
@@ -27,19 +32,108 @@ export class DashboardComponent implements OnInit {
   constructor(
     private apiService: ApiService,
     private authService: AuthService,
-    private router: Router
+    private router: Router,
+    private zone: NgZone
   ) {}
 
   ngOnInit() {
     this.userEmail = localStorage.getItem('email') || '';
     this.loadDocuments();
+    this.loadStats();
+    this.listenForStatusEvents();
+  }
+
+  ngOnDestroy() {
+    this.destroyed = true;
+    clearTimeout(this.reconnectTimer);
+    this.events?.close();
+    this.thumbnails.forEach(url => URL.revokeObjectURL(url));
+    this.thumbnails.clear();
+  }
+
+  /**
+   * Apply pushed status changes in place instead of re-fetching documents
+   */
+  listenForStatusEvents(reconnecting = false) {
+    this.apiService.openEventStream().subscribe({
+      next: (events) => {
+        if (this.destroyed) {
+          events.close();
+          return;
+        }
+        this.events = events;
+        this.handleStatusEvents(events);
+        // Changes made while disconnected were not pushed
+        if (reconnecting) {
+          this.loadDocuments();
+          this.loadStats();
+        }
+      },
+      error: () => this.reconnectStatusEvents()
+    });
+  }
+
+  /**
+   * Tickets expire within a minute and a full server answers 503,
+   * so reconnect with a fresh ticket instead of EventSource's own retry
+   */
+  private reconnectStatusEvents() {
+    this.events?.close();
+    this.events = undefined;
+    if (this.destroyed) return;
+    clearTimeout(this.reconnectTimer);
+    this.reconnectTimer = setTimeout(() => this.listenForStatusEvents(true), 10000);
+  }
+
+  private handleStatusEvents(events: EventSource) {
+    events.onerror = () => this.reconnectStatusEvents();
+    const on = (type: string, handler: (data: any) => void) =>
+      events.addEventListener(type, (e: MessageEvent) =>
+        this.zone.run(() => handler(JSON.parse(e.data).data)));
+
+    on('signature.viewed', (data) => this.setRequestStatus(data, 'viewed'));
+    on('signature.signed', (data) => this.setRequestStatus(data, 'signed'));
+    on('signature.expired', (data) => this.setRequestStatus(data, 'expired'));
+    on('document.completed', (data) => {
+      const doc = this.documents.find(d => d.id === data.documentId);
+      if (doc) doc.status = 'completed';
+      this.loadStats();
+    });
+    // The server dropped events for this stream; reload once
+    on('resync', () => {
+      this.loadDocuments();
+      this.loadStats();
+    });
+  }
+
+  private setRequestStatus(data: any, status: 'viewed' | 'signed' | 'expired') {
+    const doc = this.documents.find(d => d.id === data.documentId);
+    const req = doc?.signatureRequests?.find(r => r.id === data.signatureRequestId);
+    if (req && req.status !== 'signed') req.status = status;
+  }
+
+  /**
+   * Load dashboard counters from the server-side aggregate endpoint
+   */
+  loadStats() {
+    this.apiService.getDocumentStats().subscribe({
+      next: (stats) => {
+        this.stats = {
+          total: stats.documents.total,
+          completed: stats.documents.completed,
+          sent: stats.documents.sent,
+          draft: stats.documents.draft + stats.templates
+        };
+      },
+      error: () => this.updateStats()
+    });
   }
 
   loadDocuments() {
-    this.apiService.getDocuments().subscribe({
+    this.apiService.getDocumentSummaries().subscribe({
       next: (docs) => {
         this.documents = docs;
-        this.updateStats();
+        this.loadThumbnails();
       },
       error: (err) => {
         console.error('Failed to load documents', err);
@@ -61,6 +155,45 @@ export class DashboardComponent implements OnInit {
     };
   }
 
+  /**
+   * Fetch previews for new or edited documents and release the rest
+   */
+  private loadThumbnails() {
+    const wanted = new Set(this.documents.filter(d => d.pageCount).map(d => this.thumbnailKey(d)));
+    this.thumbnails.forEach((url, key) => {
+      if (!wanted.has(key)) {
+        URL.revokeObjectURL(url);
+        this.thumbnails.delete(key);
+      }
+    });
+    for (const doc of this.documents) {
+      const key = this.thumbnailKey(doc);
+      if (!doc.pageCount || this.thumbnails.has(key)) continue;
+      this.thumbnails.set(key, '');
+      this.apiService.getThumbnail(doc, 1, 80).subscribe({
+        next: (url) => {
+          if (this.destroyed || !this.thumbnails.has(key)) {
+            URL.revokeObjectURL(url);
+            return;
+          }
+          this.thumbnails.set(key, url);
+        },
+        error: () => this.thumbnails.delete(key)
+      });
+    }
+  }
+
+  private thumbnailKey(doc: DocumentState): string {
+    return `${doc.id}:${doc.version ?? 0}`;
+  }
+
+  /**
+   * First-page preview, or null for documents without pages or still loading
+   */
+  getThumbnailUrl(doc: DocumentState): string | null {
+    return this.thumbnails.get(this.thumbnailKey(doc)) || null;
+  }
+
   /**
    * Get regular documents (not templates)
    */
@@ -120,6 +253,13 @@ export class DashboardComponent implements OnInit {
     this.router.navigate(['/editor']);
   }
 
+  /**
+   * Download every signed document as one streamed ZIP
+   */
+  exportCompleted() {
+    this.apiService.exportCompletedUrl().subscribe(url => window.location.href = url);
+  }
+
   openDocument(doc: DocumentState) {
     this.router.navigate(['/editor', doc.id]);
   }
@@ -130,6 +270,7 @@ export class DashboardComponent implements OnInit {
 
     this.apiService.deleteDocument(doc.id).subscribe(() => {
       this.loadDocuments();
+      this.loadStats();
     });
   }
 
@@ -64,6 +64,13 @@ export class Home implements OnInit {
     }
   }
 
+  /**
+   * Browser URL of a signature value (data URL or stored signature reference)
+   */
+  imageSrc(value: string): string {
+    return this.apiService.resolveAssetUrl(value);
+  }
+
   selectRecipient(recipient: Recipient) {
     this.selectedRecipient = recipient;
   }
@@ -187,7 +194,7 @@ export class Home implements OnInit {
       error: (err) => {
         this.sendingInProgress = false;
         console.error('Error sending template', err);
-        alert('Failed to send template. Please try again.');
+        alert(this.sendErrorMessage(err, 'Failed to send template. Please try again.'));
       }
     });
   }
@@ -418,11 +425,21 @@ export class Home implements OnInit {
       error: (err) => {
         this.sendingInProgress = false;
         console.error('Error sending links', err);
-        alert('Failed to send signing links. Please try again.');
+        alert(this.sendErrorMessage(err, 'Failed to send signing links. Please try again.'));
       }
     });
   }
 
+  /**
+   * Explain rate-limit and full-queue (429) send refusals
+   */
+  private sendErrorMessage(err: any, fallback: string): string {
+    if (err.status === 429) {
+      return `${err.error?.error || 'Too many emails'}. Please try again in ${err.error?.retryAfter ?? 30} seconds.`;
+    }
+    return fallback;
+  }
+
   /**
    * Close send modal
    */
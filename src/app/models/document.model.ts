@@ -12,11 +12,12 @@ export interface SignatureRequest {
   documentId: string;
   signerEmail: string;
   signerName: string;
-  status: 'pending' | 'viewed' | 'signed';
+  status: 'pending' | 'viewed' | 'signed' | 'expired';
   order: number;
   accessToken: string;
   createdAt: Date;
   signedAt?: Date;
+  expiresAt?: Date;
 }
 
 export interface Recipient {
@@ -56,6 +57,10 @@ export interface DocumentState {
   isTemplate: boolean;
   currentSigner?: any;
   filteredFields?: Field[];
+  version?: number;
+  pageCount?: number;
+  archivedAt?: string;
+  savedSignatures?: { SIGNATURE?: string; INITIALS?: string };
 }
 
 export interface Template {
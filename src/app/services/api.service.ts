@@ -1,6 +1,6 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpHeaders } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { Observable, map } from 'rxjs';
 import { DocumentState } from '../models/document.model';
 
 @Injectable({
@@ -20,6 +20,73 @@ export class ApiService {
     return this.http.get<DocumentState[]>(`${this.baseUrl}/documents`, { headers: this.getHeaders() });
   }
 
+  /**
+   * List-view documents: no page images or fields, plus pageCount
+   */
+  getDocumentSummaries(): Observable<DocumentState[]> {
+    return this.http.get<DocumentState[]>(`${this.baseUrl}/documents`, {
+      headers: this.getHeaders(),
+      params: { summary: '1' }
+    });
+  }
+
+  /**
+   * Preview image of one page as an object URL (versioned so edits bust the browser cache).
+   * Fetched with the Authorization header so the token stays out of image URLs;
+   * callers revoke the URL with URL.revokeObjectURL when done.
+   */
+  getThumbnail(doc: DocumentState, pageNumber: number = 1, width: number = 200): Observable<string> {
+    return this.http.get(`${this.baseUrl}/documents/${doc.id}/pages/${pageNumber}/thumbnail`, {
+      headers: this.getHeaders(),
+      params: { w: width, v: doc.version ?? 0 },
+      responseType: 'blob'
+    }).pipe(map(blob => URL.createObjectURL(blob)));
+  }
+
+  /**
+   * Browser URL of a field image: data URLs as-is, stored signatures (/api/...) on the API host
+   */
+  resolveAssetUrl(value: string): string {
+    return value.startsWith('/api/') ? this.baseUrl.replace(/\/api$/, '') + value : value;
+  }
+
+  /**
+   * Download link for a ZIP of all completed documents plus manifest.json
+   */
+  exportCompletedUrl(from?: string, to?: string): Observable<string> {
+    const params = new URLSearchParams();
+    if (from) params.set('from', from);
+    if (to) params.set('to', to);
+    return this.downloadUrl('/api/documents/export', params);
+  }
+
+  /**
+   * Plain links cannot send headers, so a single-use ticket for this path
+   * goes in the URL instead of the bearer token.
+   */
+  private downloadUrl(path: string, params: URLSearchParams = new URLSearchParams()): Observable<string> {
+    return this.http.post<{ ticket: string }>(`${this.baseUrl}/downloads/ticket`, { path }, { headers: this.getHeaders() }).pipe(
+      map(({ ticket }) => {
+        params.set('ticket', ticket);
+        return `${this.resolveAssetUrl(path)}?${params.toString()}`;
+      })
+    );
+  }
+
+  getDocumentStats(): Observable<any> {
+    return this.http.get<any>(`${this.baseUrl}/documents/stats`, { headers: this.getHeaders() });
+  }
+
+  /**
+   * Open the server-sent status event stream. EventSource cannot send headers,
+   * so a short-lived ticket goes in the URL instead of the bearer token.
+   */
+  openEventStream(): Observable<EventSource> {
+    return this.http.post<{ ticket: string }>(`${this.baseUrl}/events/ticket`, {}, { headers: this.getHeaders() }).pipe(
+      map(({ ticket }) => new EventSource(`${this.baseUrl}/events?ticket=${encodeURIComponent(ticket)}`))
+    );
+  }
+
   getDocument(id: string): Observable<DocumentState> {
     return this.http.get<DocumentState>(`${this.baseUrl}/documents/${id}`);
   }
@@ -70,10 +137,11 @@ export class ApiService {
   /**
    * Submit signature using access token
    */
-  submitSignature(accessToken: string, fields: any[], pages: any[]): Observable<any> {
+  submitSignature(accessToken: string, fields: any[], pages: any[], version?: number): Observable<any> {
     return this.http.post(`${this.baseUrl}/sign/${accessToken}/submit`, {
       fields: fields,
-      pages: pages
+      pages: pages,
+      version: version
     });
   }
 
@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpHeaders } from '@angular/common/http';
 import { Observable } from 'rxjs';
 import { ApiService } from './api.service';
 import { DocumentState, Recipient, DocumentType } from '../models/document.model';
@@ -24,10 +24,14 @@ export class EmailService {
   }
 
   /**
-   * Get email delivery status for a document
+   * Get email delivery status for a document (latest status per recipient plus log entries)
    */
-  getEmailStatus(docId: string): Observable<any> {
-    return this.http.get(`${this.apiService.baseUrl}/email-status/${docId}`);
+  getEmailStatus(docId: string, filters: { recipient?: string; status?: string } = {}): Observable<any> {
+    const headers = new HttpHeaders({ 'Authorization': `Bearer ${localStorage.getItem('token')}` });
+    const params: Record<string, string> = {};
+    if (filters.recipient) params['recipient'] = filters.recipient;
+    if (filters.status) params['status'] = filters.status;
+    return this.http.get(`${this.apiService.baseUrl}/email-status/${docId}`, { headers, params });
   }
 
   /**
@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpHeaders } from '@angular/common/http';
 import { Observable, BehaviorSubject } from 'rxjs';
 import { ApiService } from './api.service';
 import { DocumentState, Field, Recipient } from '../models/document.model';
@@ -34,7 +34,8 @@ export class SigningTokenService {
    * Get signing progress for a multi-sign document
    */
   getSigningProgress(docId: string): Observable<any> {
-    return this.http.get(`${this.apiService.baseUrl}/documents/${docId}/signing-progress`);
+    const headers = new HttpHeaders({ 'Authorization': `Bearer ${localStorage.getItem('token')}` });
+    return this.http.get(`${this.apiService.baseUrl}/documents/${docId}/signing-progress`, { headers });
   }
 
   /**
@@ -106,6 +106,21 @@ export class SignComponent implements OnInit {
     this.showSignatureModal = true;
   }
 
+  /**
+   * Browser URL of a signature value (data URL or stored signature reference)
+   */
+  imageSrc(value: string): string {
+    return this.apiService.resolveAssetUrl(value);
+  }
+
+  /**
+   * The signer's previously used signature or initials, if any
+   */
+  savedSignatureFor(field?: Field): string | undefined {
+    const type = field?.type === 'INITIALS' ? 'INITIALS' : 'SIGNATURE';
+    return this.document?.savedSignatures?.[type];
+  }
+
   /**
    * Handle signature saved from modal
    */
@@ -155,7 +170,8 @@ export class SignComponent implements OnInit {
     this.apiService.submitSignature(
       this.signingToken,
       this.document.fields,
-      this.document.pages
+      this.document.pages,
+      this.document.version
     ).subscribe({
       next: (result) => {
         this.completed = true;
@@ -219,7 +235,11 @@ export class SignComponent implements OnInit {
                 sigImg.onerror = () => {
                   imgResolve({ field, img: sigImg });
                 };
-                sigImg.src = field.value!;
+                // Stored signatures come from the API host; CORS keeps the canvas exportable
+                if (!field.value!.startsWith('data:')) {
+                  sigImg.crossOrigin = 'anonymous';
+                }
+                sigImg.src = this.imageSrc(field.value!);
               });
             });
 
@@ -230,7 +250,12 @@ export class SignComponent implements OnInit {
                 const y = (field.y / 100) * canvas.height;
                 const w = field.width * 2;
                 const h = field.height * 2;
-                ctx.drawImage(img, x, y, w, h);
+                if (!img.naturalWidth || !img.naturalHeight) return;
+                // Fit without stretching, centred in the field box (normalized images are trimmed)
+                const scale = Math.min(w / img.naturalWidth, h / img.naturalHeight);
+                const dw = img.naturalWidth * scale;
+                const dh = img.naturalHeight * scale;
+                ctx.drawImage(img, x + (w - dw) / 2, y + (h - dh) / 2, dw, dh);
               });
 
               page.imageUrl = canvas.toDataURL();